@@ -0,0 +1,93 @@
+### Motor de colisao AABB vetorizado com NumPy (opcional). Responsavel por:
+### - Montar as caixas de colisao de uma lista de entidades em um array contiguo (N x 4: left, top, right, bottom)
+### - Resolver tiros x alvos e jogadores x perigos em operacoes de array, devolvendo os pares de indices
+###
+### As regras sao as mesmas das hitbox das entidades (entities.py) e do Simulation.check_all_collisions:
+### intersecao estrita, entidades invisiveis nao colidem e cada tiro acerta o primeiro alvo da lista.
+### Um alvo destruido por um tiro nao pode ser acertado pelos tiros seguintes ('consume')
+###
+### O NumPy eh opcional: sem ele HAS_NUMPY eh False e o jogo usa as consultas em Python (spatial.py)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from config import *    # Importa constantes e configuracoes do arquivo "config.py"
+
+HAS_NUMPY = np is not None
+
+# Quantos pixels a hitbox de cada tipo fica para dentro do sprite (ver a propriedade hitbox de cada classe)
+TREE_INSET = 2          # Tree.hitbox
+BOAT_INSET = 1          # Boat.hitbox e GasolineBomb.hitbox
+SHOT_INSET = 0          # caixa do tiro (x, y, x + width, y + height)
+PLAYER_INSET = 0        # Player.hitbox (contra barcos e bombas)
+PLAYER_TREE_INSET = 2   # caixa do jogador em check_tree_collision
+
+
+def box_array(entities, inset=0, width=None, height=None):
+    """Caixas das entidades em um array (N, 4). Sem 'width'/'height', usa os atributos de cada entidade."""
+    n = len(entities)
+    boxes = np.empty((n, 4))
+    if n == 0:
+        return boxes
+    boxes[:, 0] = np.fromiter((e.x for e in entities), float, n)
+    boxes[:, 1] = np.fromiter((e.y for e in entities), float, n)
+    if width is None:
+        boxes[:, 2] = boxes[:, 0] + np.fromiter((e.width for e in entities), float, n)
+        boxes[:, 3] = boxes[:, 1] + np.fromiter((e.height for e in entities), float, n)
+    else:
+        boxes[:, 2] = boxes[:, 0] + width
+        boxes[:, 3] = boxes[:, 1] + height
+    if inset:
+        boxes[:, :2] += inset
+        boxes[:, 2:] -= inset
+    return boxes
+
+
+def visible_mask(entities):
+    return np.fromiter((e.visible for e in entities), bool, len(entities))
+
+
+def overlaps(a, b):
+    """Matriz (len(a), len(b)): True onde as caixas se cruzam (intersecao estrita, como nas hitbox)."""
+    return ((a[:, None, 2] > b[None, :, 0]) & (a[:, None, 0] < b[None, :, 2]) &
+            (a[:, None, 3] > b[None, :, 1]) & (a[:, None, 1] < b[None, :, 3]))
+
+
+def hit_pairs(a, b, b_alive=None):
+    """Todos os pares (i, j) em que a caixa a[i] cruza a caixa b[j] (viva)."""
+    matrix = overlaps(a, b)
+    if b_alive is not None:
+        matrix &= b_alive[None, :]
+    rows, cols = np.nonzero(matrix)
+    return list(zip(rows.tolist(), cols.tolist()))
+
+
+def first_hits(shots, targets, alive, consume=True):
+    """Para cada tiro (na ordem), o primeiro alvo vivo que ele toca: lista de (indice do tiro, indice do alvo).
+    Com 'consume', o alvo acertado morre para os tiros seguintes (o host destroi o que foi acertado)."""
+    if len(shots) == 0 or len(targets) == 0:
+        return []
+    matrix = overlaps(shots, targets) & alive[None, :]
+    rows = np.flatnonzero(matrix.any(axis=1))
+    if not consume:
+        return list(zip(rows.tolist(), matrix[rows].argmax(axis=1).tolist()))
+
+    # Poucos tiros acertam algo: resolve a disputa pelo mesmo alvo na ordem dos tiros
+    taken = set()
+    pairs = []
+    for row in rows.tolist():
+        for col in np.flatnonzero(matrix[row]).tolist():
+            if col not in taken:
+                taken.add(col)
+                pairs.append((row, col))
+                break
+    return pairs
+
+
+def any_hits(boxes, hazards, alive):
+    """Para cada caixa (jogador), se ela encosta em algum perigo vivo."""
+    if len(boxes) == 0 or len(hazards) == 0:
+        return np.zeros(len(boxes), bool)
+    return (overlaps(boxes, hazards) & alive[None, :]).any(axis=1)
@@ -0,0 +1,94 @@
+### Microbenchmark do motor de colisao NumPy (aabb.py) contra as regras em Python
+### Para N entidades (N tiros x N barcos e N jogadores x N barcos), mede os dois caminhos
+### e confere que os pares de indices devolvidos sao os mesmos
+###
+### Para executar:
+### python benchmarks/bench_aabb.py [repeticoes]
+
+import os
+import sys
+import time
+import random
+
+# Permite importar os modulos do jogo a partir da pasta "benchmarks"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import *
+from entities import *
+import aabb
+
+SIZES = (10, 100, 1000)
+
+
+def make_world(n, rng):
+    boats = [Boat(rng.randint(0, SCREEN_WIDTH - 16), rng.randint(0, SCREEN_HEIGHT - 16)) for _ in range(n)]
+    for boat in boats[::7]:
+        boat.visible = False    # alguns alvos ja destruidos
+    shots = [Shot(rng.randint(0, SCREEN_WIDTH - 2), rng.randint(0, SCREEN_HEIGHT - 8)) for _ in range(n)]
+    players = [Player(i % MAX_PLAYERS, rng.randint(0, SCREEN_WIDTH - PLAYER_WIDTH),
+                      rng.randint(0, SCREEN_HEIGHT - PLAYER_HEIGHT)) for i in range(n)]
+    return shots, boats, players
+
+
+def _touches(box, hitbox):
+    left, top, right, bottom = box
+    h_left, h_top, h_right, h_bottom = hitbox
+    return right > h_left and left < h_right and bottom > h_top and top < h_bottom
+
+
+def python_shot_hits(shots, targets):
+    """Como Simulation.check_all_collisions: cada tiro, na ordem, destroi o primeiro alvo visivel que toca."""
+    alive = [t.visible for t in targets]
+    pairs = []
+    for i, shot in enumerate(shots):
+        s_box = (shot.x, shot.y, shot.x + shot.width, shot.y + shot.height)
+        for j, target in enumerate(targets):
+            if alive[j] and _touches(s_box, target.hitbox):
+                alive[j] = False
+                pairs.append((i, j))
+                break
+    return pairs
+
+
+def python_player_hits(players, hazards):
+    return [any(h.visible and _touches(p.hitbox, h.hitbox) for h in hazards) for p in players]
+
+
+def numpy_shot_hits(shots, targets):
+    return aabb.first_hits(aabb.box_array(shots, aabb.SHOT_INSET), aabb.box_array(targets, aabb.BOAT_INSET),
+                           aabb.visible_mask(targets))
+
+
+def numpy_player_hits(players, hazards):
+    return aabb.any_hits(aabb.box_array(players, aabb.PLAYER_INSET, PLAYER_WIDTH, PLAYER_HEIGHT),
+                         aabb.box_array(hazards, aabb.BOAT_INSET), aabb.visible_mask(hazards)).tolist()
+
+
+def measure(func, repeat, *args):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(*args)
+    return (time.perf_counter() - start) / repeat * 1e6, result
+
+
+def main():
+    if not aabb.HAS_NUMPY:
+        print("NumPy nao esta instalado: nada a comparar")
+        return
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print(f"{repeat} repeticoes por medida")
+    print(f"{'N':>5} {'caso':>18} {'python us':>11} {'numpy us':>11} {'ganho':>7} {'pares':>6}")
+    for n in SIZES:
+        shots, boats, players = make_world(n, random.Random(n))
+        cases = (("tiros x barcos", python_shot_hits, numpy_shot_hits, shots, len),
+                 ("jogadores x barcos", python_player_hits, numpy_player_hits, players, sum))
+        for name, python_func, numpy_func, entities, count in cases:
+            python_us, expected = measure(python_func, repeat, entities, boats)
+            numpy_us, result = measure(numpy_func, repeat, entities, boats)
+            assert result == expected, f"{name} com N={n}: resultados diferentes"
+            hits = count(result)
+            print(f"{n:>5} {name:>18} {python_us:>11.1f} {numpy_us:>11.1f} {python_us / numpy_us:>6.1f}x {hits:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+### Benchmark do codec de rede (codec.py)
+### Compara o formato binario com o JSON em um snapshot tipico do host:
+### tempo de codificacao/decodificacao e bytes por snapshot, completo (keyframe) e delta
+###
+### Para executar:
+### python benchmarks/bench_codec.py [iteracoes]
+
+import os
+import sys
+import time
+import random
+import timeit
+
+# Permite importar os modulos do jogo a partir da pasta "benchmarks"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import codec
+import delta
+from config import *
+
+
+# Monta um snapshot do host com a mesma estrutura de GameState.send_data
+def build_snapshot(n_trees=20, n_boats=10, n_bombs=5, n_shots=8, n_explosions=3):
+    rng = random.Random(42)
+    ids = iter(range(1, 1000))
+    return {
+        'slot': 0,
+        'rio_centro': 80.5,
+        'rio_largura': 45.0,
+        'seed': 123456,
+        'type': 'game_update',
+        'arvores': [{'id': next(ids), 'x': rng.randint(0, 144), 'y': rng.randint(-180, 180), 'visible': True,
+                     'sprite_type': rng.choice([0, 1])} for _ in range(n_trees)],
+        'shots': [{'id': next(ids), 'x': rng.randint(0, 158), 'y': rng.randint(0, 150), 'vy': -2,
+                   'owner': rng.randint(0, 1)} for _ in range(n_shots)],
+        'explosions': [{'id': next(ids), 'x': rng.randint(0, 144), 'y': rng.randint(0, 150), 'tile_u': 16, 'tile_v': 16,
+                        'width': 16, 'height': 16, 'timer': 8} for _ in range(n_explosions)],
+        'boats': [{'id': next(ids), 'x': rng.randint(57, 86), 'y': rng.randint(-16, 180), 'vy': 1, 'visible': True}
+                  for _ in range(n_boats)],
+        'player_type': 'host',
+        'scroll': 1000,
+        'bombs': [{'id': next(ids), 'x': rng.randint(0, 144), 'y': rng.randint(-16, 180), 'vy': 1, 'visible': True}
+                  for _ in range(n_bombs)],
+        'players': [{'id': 0, 'x': 55, 'y': 130, 'lives': 3, 'fuel': 87.25, 'invincible': 0, 'score': 120, 'input_seq': 0},
+                    {'id': 1, 'x': 90, 'y': 130, 'lives': 2, 'fuel': 64.5, 'invincible': 12, 'score': 80, 'input_seq': 900}],
+        'sounds': [(0, 0), (2, 3)],
+    }
+
+
+# Snapshot do frame seguinte: cenario desce 1px, tiros sobem, explosoes envelhecem, gasolina cai
+def next_frame(snapshot):
+    nxt = dict(snapshot)
+    nxt['scroll'] = snapshot['scroll'] + 1
+    for key in ('arvores', 'boats', 'bombs'):
+        nxt[key] = [dict(item, y=item['y'] + 1) for item in snapshot[key]]
+    nxt['shots'] = [dict(shot, y=shot['y'] + shot['vy']) for shot in snapshot['shots']]
+    nxt['explosions'] = [dict(exp, timer=exp['timer'] - 1) for exp in snapshot['explosions']]
+    nxt['players'] = [dict(p, fuel=p['fuel'] - FUEL_CONSUMPTION_RATE / FPS) for p in snapshot['players']]
+    nxt['sounds'] = []
+    return nxt
+
+
+def bench(wire_format, packet, number):
+    raw = codec.encode_packet(packet, wire_format)
+    encode_s = timeit.timeit(lambda: codec.encode_packet(packet, wire_format), number=number)
+    decode_s = timeit.timeit(lambda: codec.decode_packet(raw), number=number)
+    return len(raw), encode_s / number * 1e6, decode_s / number * 1e6
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    base = build_snapshot()
+    current = next_frame(base)
+    keyframe = {'type': 'game_data', 'seq': 2, 'ack': 1, 'payload': current, 'timestamp': time.time()}
+    delta_packet = {'type': 'game_data', 'seq': 2, 'ack': 1, 'base': 1,
+                    'delta': delta.diff_snapshot(base, current), 'timestamp': time.time()}
+    diff_us = timeit.timeit(lambda: delta.diff_snapshot(base, current), number=number) / number * 1e6
+    apply_us = timeit.timeit(lambda: delta.apply_delta(base, delta_packet['delta']), number=number) / number * 1e6
+
+    print(f"Snapshot: 20 arvores, 10 barcos, 5 bombas, 8 tiros, 3 explosoes ({number} iteracoes)")
+    print(f"{'formato':<16} {'bytes':>6} {'encode (us)':>12} {'decode (us)':>12} {'bytes/s a ' + str(FPS) + ' FPS':>18}")
+    for label, packet in (("keyframe", keyframe), ("delta", delta_packet)):
+        for wire_format in (codec.WIRE_JSON, codec.WIRE_BINARY):
+            size, enc_us, dec_us = bench(wire_format, packet, number)
+            name = f"{wire_format}/{label}"
+            print(f"{name:<16} {size:>6} {enc_us:>12.2f} {dec_us:>12.2f} {size * FPS:>18}")
+    print(f"delta.diff_snapshot: {diff_us:.2f} us, delta.apply_delta: {apply_us:.2f} us")
+    print(f"Limite por pacote (MAX_PACKET_SIZE): {MAX_PACKET_SIZE} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+### Benchmark (modo stress) das colisoes com e sem a grade uniforme (spatial.py)
+### Enche a partida com N barcos e N tiros espalhados pela tela (repostos a cada tick, fora da medicao)
+### e mede o custo do tick da simulacao. Sem a grade, tiros x barcos cresce com N*N; com ela, perto de N
+###
+### Para executar:
+### python benchmarks/bench_collisions.py [ticks]
+###
+### A lista (sem a grade) so eh medida ate LIST_MAX_N: com 800 barcos e 800 tiros um tick dela passa de
+### meio segundo, e ela sozinha levaria minutos
+
+import os
+import sys
+import time
+import random
+
+# Permite importar os modulos do jogo a partir da pasta "benchmarks"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation import *
+from config import *
+
+SIZES = (50, 100, 200, 400, 800)
+LIST_MAX_N = 400    # Maior N medido sem a grade
+
+
+def refill(sim, rng, n):
+    """Repoe barcos e tiros ate haver n de cada na tela."""
+    store = sim.boat_manager.store
+    store.compact(SCREEN_HEIGHT, drop_hidden=True)
+    while len(store) < n:
+        Boat(rng.randint(0, SCREEN_WIDTH - 16), rng.randint(0, SCREEN_HEIGHT - 16), store=store)
+    while len(sim.shots) < n:
+        sim.shots.append(sim.shot_pool.acquire(rng.randint(0, SCREEN_WIDTH - 2), rng.randint(0, SCREEN_HEIGHT - 8)))
+
+
+def run(n, ticks, use_grid):
+    random.seed(n)
+    rng = random.Random(n)
+    sim = Simulation()
+    sim.spatial_hash = use_grid
+    sim.boat_manager.max_boats = 0   # so os barcos do stress
+    elapsed = 0.0
+    for _ in range(ticks):
+        refill(sim, rng, n)
+        sim.player.lives = MAX_LIVES
+        start = time.perf_counter()
+        sim.step()
+        elapsed += time.perf_counter() - start
+    return elapsed / ticks * 1e6
+
+
+def main():
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print(f"{ticks} ticks por medida, N barcos + N tiros")
+    print(f"{'N':>5} {'grade us/tick':>14} {'lista us/tick':>14} {'grade us/N':>11} {'lista us/N':>11}")
+    for n in SIZES:
+        grid_us = run(n, ticks, True)
+        if n > LIST_MAX_N:
+            print(f"{n:>5} {grid_us:>14.1f} {'-':>14} {grid_us / n:>11.2f} {'-':>11}")
+            continue
+        list_us = run(n, ticks, False)
+        print(f"{n:>5} {grid_us:>14.1f} {list_us:>14.1f} {grid_us / n:>11.2f} {list_us / n:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
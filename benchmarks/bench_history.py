@@ -0,0 +1,71 @@
+### Benchmark do historico do rio (map_generator.RiverHistory) contra as deques antigas
+### - "linha": margens de uma linha qualquer da tela (arvores, barcos); na deque o acesso ao meio eh O(n)
+### - "tela": margens de todas as linhas de uma vez (desenho, colisao com as margens)
+###
+### Para executar:
+### python benchmarks/bench_history.py [repeticoes]
+
+import os
+import sys
+import time
+import random
+from collections import deque
+
+# Permite importar os modulos do jogo a partir da pasta "benchmarks"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import *
+import map_generator
+from map_generator import RiverHistory
+
+
+def build(rng):
+    centros = deque([SCREEN_WIDTH / 2] * SCREEN_HEIGHT, maxlen=SCREEN_HEIGHT)
+    larguras = deque([45] * SCREEN_HEIGHT, maxlen=SCREEN_HEIGHT)
+    history = RiverHistory(SCREEN_HEIGHT, SCREEN_WIDTH / 2, 45)
+    for _ in range(3 * SCREEN_HEIGHT):
+        centro, largura = rng.uniform(40, 120), rng.uniform(20, 130)
+        centros.appendleft(centro)
+        larguras.appendleft(largura)
+        history.push(centro, largura)
+    return centros, larguras, history
+
+
+def deque_margins(centros, larguras, screen_y):
+    centro = centros[screen_y]
+    meia = larguras[screen_y] / 2
+    return centro - meia, centro + meia
+
+
+def measure(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = random.Random(1)
+    centros, larguras, history = build(rng)
+    rows = [rng.randrange(SCREEN_HEIGHT) for _ in range(1000)]
+
+    for y in range(SCREEN_HEIGHT):
+        assert history.margins(y) == deque_margins(centros, larguras, y)
+
+    cases = (
+        ("linha (1000 consultas)",
+         lambda: [deque_margins(centros, larguras, y) for y in rows],
+         lambda: [history.margins(y) for y in rows]),
+        ("tela (180 linhas)",
+         lambda: [deque_margins(centros, larguras, y) for y in range(SCREEN_HEIGHT)],
+         history.all_margins),
+    )
+    print(f"{repeat} repeticoes por medida (NumPy: {'sim' if map_generator.np is not None else 'nao'})")
+    print(f"{'caso':<24} {'deque us':>10} {'buffer us':>10}")
+    for name, old, new in cases:
+        print(f"{name:<24} {measure(old, repeat // 10):>10.1f} {measure(new, repeat // 10):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+### Benchmark da rede ruim simulada (network.ImpairedSocket) no loopback
+### Um host e um cliente (NetworkManager de verdade, com socket UDP) trocam mensagens de jogo a FPS por segundo.
+### So o cliente usa o cenario, nos dois sentidos, entao cada sentido passa uma vez pela rede simulada.
+### Para cada cenario mostra o que as estatisticas da conexao (ConnectionStats) mediram no host
+### (RTT, jitter, perdas, atrasados) contra o que o cenario injetou, e quantas vezes o cliente
+### perdeu a conexao e reconectou (cenario 'queda')
+###
+### Para executar:
+### python benchmarks/bench_impairment.py [--seconds S] [--scenarios a,b,...]
+
+import os
+import sys
+import time
+import argparse
+
+# Permite importar os modulos do jogo a partir da pasta "benchmarks"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from network import NetworkManager, IMPAIRMENT_SCENARIOS
+from config import *
+
+DEFAULT_SCENARIOS = ('lan', 'wifi_ruim', 'movel', 'perda_alta', 'rajadas')
+
+
+def run(scenario, seconds, port):
+    host = NetworkManager(port, impairment=None)
+    client = NetworkManager(port, impairment=scenario)
+    host.start_host()
+    client.connect("127.0.0.1", host.port)
+    drops = reconnects = 0
+    was_connected = client.connected
+    end = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < end:
+        n += 1
+        host.send({'type': 'bench', 'n': n})
+        client.send({'type': 'bench', 'n': n})
+        host.drain()
+        client.drain()
+        if was_connected and not client.connected:
+            drops += 1
+        elif client.connected and not was_connected:
+            reconnects += 1
+        was_connected = client.connected
+        time.sleep(1 / FPS)
+
+    stats = host.connection_stats().get(1)
+    shim = client.sock.stats() if client.sock is not None else {}
+    host.stop()
+    client.stop()
+    return stats, shim, drops, reconnects
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rede ruim simulada no loopback")
+    parser.add_argument("--seconds", type=float, default=4.0, help="duracao de cada cenario")
+    parser.add_argument("--scenarios", default=",".join(DEFAULT_SCENARIOS),
+                        help=f"cenarios separados por virgula ({', '.join(IMPAIRMENT_SCENARIOS)})")
+    args = parser.parse_args()
+
+    print(f"{args.seconds:.0f} s por cenario, {FPS} mensagens/s em cada sentido")
+    print(f"{'cenario':<11} {'atraso ms':>9} {'rtt ms':>7} {'+-':>6} {'jitter':>7} {'perda':>6} "
+          f"{'atras.':>6} {'descart.':>8} {'dupl.':>5} {'reord.':>6} {'quedas':>6} {'volta':>5}")
+    for i, scenario in enumerate(args.scenarios.split(",")):
+        delay = IMPAIRMENT_SCENARIOS[scenario][0][1].delay
+        stats, shim, drops, reconnects = run(scenario, args.seconds, NETWORK_PORT + 100 + i)
+        if stats is None:
+            print(f"{scenario:<11} {delay:>9} (cliente desconectado no fim)")
+            continue
+        rtt = stats['srtt_ms'] if stats['srtt_ms'] is not None else float('nan')
+        print(f"{scenario:<11} {delay:>9} {rtt:>7.1f} {stats['rtt_var_ms']:>6.1f} {stats['jitter_ms']:>7.1f} "
+              f"{stats['loss_rate']:>6.1%} {stats['late']:>6} {shim.get('dropped', 0):>8} "
+              f"{shim.get('duplicated', 0):>5} {shim.get('reordered', 0):>6} {drops:>6} {reconnects:>5}")
+
+
+if __name__ == "__main__":
+    main()
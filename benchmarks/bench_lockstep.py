@@ -0,0 +1,118 @@
+### Benchmark do multiplayer em lockstep (lockstep.py) comparado aos snapshots (bench_players.py)
+### Roda no mesmo processo um host e N-1 clientes em lockstep, trocando as mensagens de entradas pelo codec
+### binario (sem socket), com latencia e perda de pacotes simuladas, e mede:
+### - bytes por tick enviados pelo host (para todos os clientes) e por cada cliente, contra os dos snapshots
+### - frames parados esperando entradas (stalls) e checksums comparados / diferentes (dessincronizacao)
+###
+### Para executar:
+### python benchmarks/bench_lockstep.py [ticks]
+
+import os
+import sys
+import random
+
+# Permite importar os modulos do jogo a partir da pasta "benchmarks"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import codec
+from lockstep import Lockstep
+from simulation import *
+from config import *
+import bench_players
+
+
+class Link:
+    """Um sentido da conexao: entrega cada mensagem 'latency' frames depois, perdendo uma fracao 'loss'."""
+    def __init__(self, rng, latency, loss):
+        self.rng = rng
+        self.latency = latency
+        self.loss = loss
+        self.queue = []     # (frame de entrega, bytes)
+        self.bytes = 0
+        self.seq = 0
+
+    def send(self, frame, payload):
+        self.seq += 1
+        packet = {'type': 'game_data', 'seq': self.seq, 'ack': None, 'timestamp': 0.0, 'payload': payload}
+        raw = codec.encode_packet(packet, codec.WIRE_BINARY)
+        self.bytes += len(raw)
+        if self.rng.random() >= self.loss:
+            self.queue.append((frame + self.latency, raw))
+
+    def receive(self, frame):
+        ready = [raw for due, raw in self.queue if due <= frame]
+        self.queue = [(due, raw) for due, raw in self.queue if due > frame]
+        return [codec.decode_packet(raw)['payload'] for raw in ready]
+
+
+def random_input(rng):
+    return TickInput(PlayerInput(left=rng.random() < 0.4, right=rng.random() < 0.4, up=rng.random() < 0.2,
+                                 down=rng.random() < 0.2, fire=rng.random() < 0.1))
+
+
+def run(n_players, ticks, latency=2, loss=0.0):
+    rng = random.Random(n_players)
+    slots = list(range(n_players))
+    host = Simulation(is_multiplayer=True, is_host=True, lockstep_slots=slots)
+    sims = [host] + [Simulation(is_multiplayer=True, initial_seed=host.seed, local_slot=slot, lockstep_slots=slots)
+                     for slot in slots[1:]]
+    machines = [Lockstep(slot, slots, slot == 0) for slot in slots]
+    uplinks = {slot: Link(rng, latency, loss) for slot in slots[1:]}     # cliente -> host
+    downlinks = {slot: Link(rng, latency, loss) for slot in slots[1:]}   # host -> cliente
+
+    frame = 0
+    while min(m.tick for m in machines) < ticks:
+        frame += 1
+        # Mantem todos vivos para medir sempre com N jogadores
+        for sim in sims:
+            for p in sim.players:
+                p.lives = MAX_LIVES
+        for slot, (sim, lockstep) in enumerate(zip(sims, machines)):
+            links = [(peer, uplinks[peer]) for peer in slots[1:]] if slot == 0 else [(0, downlinks[slot])]
+            for sender, link in links:
+                for payload in link.receive(frame):
+                    lockstep.receive(sender, payload)
+            if lockstep.tick < ticks:
+                lockstep.add_local(random_input(rng))
+                lockstep.step(sim)
+            if slot == 0:
+                for peer in slots[1:]:
+                    downlinks[peer].send(frame, lockstep.message(peer))
+            else:
+                uplinks[slot].send(frame, lockstep.message(0))
+
+    n_clients = max(1, n_players - 1)
+    return {
+        'down_bytes': sum(link.bytes for link in downlinks.values()) / frame,
+        'up_bytes': sum(link.bytes for link in uplinks.values()) / frame / n_clients,
+        'stalls': sum(m.stalls for m in machines) / n_players,
+        'checks': sum(m.checks for m in machines),
+        'desyncs': sum(m.desyncs for m in machines),
+        'same_state': len({sim.checksum() for sim in sims}) == 1,
+        'frames': frame,
+    }
+
+
+def main():
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 1200
+    print(f"{ticks} ticks por partida, atraso de entrada {LOCKSTEP_INPUT_DELAY} ticks, "
+          f"checksum a cada {LOCKSTEP_HASH_INTERVAL} ticks")
+    print(f"{'jogadores':>9} {'snap host B/tick':>17} {'lock host B/tick':>17} {'snap cli B/tick':>16} "
+          f"{'lock cli B/tick':>16} {'checks':>7} {'desyncs':>8} {'iguais':>7}")
+    for n_players in (2, 4, 8):
+        snap = bench_players.run(n_players, ticks)
+        r = run(n_players, ticks)
+        print(f"{n_players:>9} {snap['down_bytes']:>17.1f} {r['down_bytes']:>17.1f} {snap['up_bytes']:>16.1f} "
+              f"{r['up_bytes']:>16.1f} {r['checks']:>7} {r['desyncs']:>8} {str(r['same_state']):>7}")
+
+    print()
+    print("Latencia e perda (4 jogadores): latencia em frames por sentido")
+    print(f"{'latencia':>9} {'perda':>6} {'stalls/maquina':>15} {'frames':>7} {'desyncs':>8} {'iguais':>7}")
+    for latency, loss in ((2, 0.0), (2, 0.1), (5, 0.0), (5, 0.2)):
+        r = run(4, ticks, latency, loss)
+        print(f"{latency:>9} {loss:>6.0%} {r['stalls']:>15.1f} {r['frames']:>7} {r['desyncs']:>8} "
+              f"{str(r['same_state']):>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+### Benchmark de partidas com varios jogadores (host + clientes)
+### Roda no mesmo processo um host e N-1 clientes trocando snapshots pelo mesmo caminho da rede
+### (delta.py + codec.py, sem socket) e mede, para cada quantidade de jogadores:
+### - custo por tick do host (aplicar os snapshots dos clientes, simular e montar o snapshot)
+### - bytes por tick enviados pelo host (para todos os clientes) e por cada cliente
+### - pacotes e bytes por segundo com taxas de envio diferentes (NETWORK_SEND_RATE) em uma partida de 4
+###
+### Para executar:
+### python benchmarks/bench_players.py [ticks]
+
+import os
+import sys
+import time
+import random
+
+# Permite importar os modulos do jogo a partir da pasta "benchmarks"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import codec
+import delta
+from network import SendTimer
+from simulation import *
+from config import *
+
+
+class Link:
+    """Um sentido da conexao: guarda o ultimo snapshot enviado (rede sem perdas, o ack eh imediato)."""
+    def __init__(self):
+        self.seq = 0
+        self.base = None
+        self.bytes = 0
+        self.packets = 0
+
+    def transmit(self, snapshot):
+        """Codifica o snapshot como o NetworkManager faria e retorna o que o outro lado reconstroi."""
+        self.seq += 1
+        packet = {'type': 'game_data', 'seq': self.seq, 'ack': self.seq - 1, 'timestamp': 0.0}
+        if self.base is None:
+            packet['payload'] = snapshot
+        else:
+            packet['base'] = self.seq - 1
+            packet['delta'] = delta.diff_snapshot(self.base, snapshot)
+        raw = codec.encode_packet(packet, codec.WIRE_BINARY)
+        self.bytes += len(raw)
+        self.packets += 1
+        decoded = codec.decode_packet(raw)
+        received = decoded['payload'] if self.base is None else delta.apply_delta(self.base, decoded['delta'])
+        self.base = snapshot
+        return received
+
+
+def run(n_players, ticks, send_rate=FPS):
+    rng = random.Random(n_players)
+    host = Simulation(is_multiplayer=True, is_host=True)
+    seed = host.seed
+    clients = [Simulation(is_multiplayer=True, is_host=False, initial_seed=seed, local_slot=slot)
+               for slot in range(1, n_players)]
+    uplinks = [Link() for _ in clients]
+    downlinks = [Link() for _ in clients]
+    inbox = [None] * len(clients)   # Ultimo snapshot de cada cliente recebido pelo host
+    host_timer = SendTimer(send_rate)
+    client_timers = [SendTimer(send_rate) for _ in clients]
+
+    host_time = 0.0
+    for tick in range(ticks):
+        # Mantem todos vivos para medir sempre com N jogadores
+        for p in host.players:
+            p.lives = MAX_LIVES
+
+        start = time.perf_counter()
+        for slot, data in enumerate(inbox, start=1):
+            if data is not None:
+                host.apply_snapshot(data, slot)
+                inbox[slot - 1] = None
+        host.step(TickInput(PlayerInput(fire=rng.random() < 0.1, left=rng.random() < 0.5, right=rng.random() < 0.5)))
+        snapshot = host.snapshot() if host_timer.due() else None
+        host_time += time.perf_counter() - start
+
+        for i, client in enumerate(clients):
+            if snapshot is not None:
+                client.apply_snapshot(downlinks[i].transmit(snapshot))
+            client.step(TickInput(PlayerInput(fire=rng.random() < 0.1, up=rng.random() < 0.3,
+                                              left=rng.random() < 0.5, right=rng.random() < 0.5)))
+            if client_timers[i].due():
+                inbox[i] = uplinks[i].transmit(client.snapshot())
+
+    seconds = ticks / FPS
+    return {
+        'host_us': host_time / ticks * 1e6,
+        'down_bytes': sum(link.bytes for link in downlinks) / ticks,
+        'up_bytes': sum(link.bytes for link in uplinks) / ticks / max(1, len(clients)),
+        'down_pps': sum(link.packets for link in downlinks) / seconds,
+        'down_bps': sum(link.bytes for link in downlinks) / seconds,
+        'up_pps': sum(link.packets for link in uplinks) / seconds / max(1, len(clients)),
+        'up_bps': sum(link.bytes for link in uplinks) / seconds / max(1, len(clients)),
+        'players': len(host.active_players),
+    }
+
+
+def main():
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 1200
+    print(f"{ticks} ticks por partida (binario + delta, rede sem perdas)")
+    print(f"{'jogadores':>9} {'host us/tick':>13} {'host B/tick':>12} {'cliente B/tick':>15} {'host kB/s':>10}")
+    for n_players in (2, 4, 8):
+        r = run(n_players, ticks)
+        print(f"{r['players']:>9} {r['host_us']:>13.1f} {r['down_bytes']:>12.1f} {r['up_bytes']:>15.1f} "
+              f"{r['down_bps'] / 1024:>10.1f}")
+
+    print()
+    print("Taxa de envio (4 jogadores): host = soma para os 3 clientes, cliente = cada um")
+    print(f"{'envios/s':>9} {'host pkt/s':>11} {'host kB/s':>10} {'cliente pkt/s':>14} {'cliente kB/s':>13}")
+    for send_rate in (20, 30, 60):
+        r = run(4, ticks, send_rate)
+        print(f"{send_rate:>9} {r['down_pps']:>11.1f} {r['down_bps'] / 1024:>10.1f} "
+              f"{r['up_pps']:>14.1f} {r['up_bps'] / 1024:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
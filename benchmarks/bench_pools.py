@@ -0,0 +1,51 @@
+### Benchmark dos pools de tiros e explosoes (entities.EntityPool) em uma partida de tiro pesado
+### O jogador atira em todo tick; compara o pool com tamanho 0 (toda entidade eh nova, como antes)
+### e com os tamanhos do config.py. Mostra entidades alocadas por tick, taxa de acerto e pico de uso
+###
+### Para executar:
+### python benchmarks/bench_pools.py [ticks]
+
+import os
+import sys
+import time
+import random
+
+# Permite importar os modulos do jogo a partir da pasta "benchmarks"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation import *
+from config import *
+
+
+def run(ticks, pooled):
+    random.seed(1)
+    sim = Simulation()
+    if not pooled:
+        sim.shot_pool.size = 0
+        sim.explosion_pool.size = 0
+    rng = random.Random(2)
+    reset_allocation_count()
+    start = time.perf_counter()
+    for _ in range(ticks):
+        sim.player.lives = MAX_LIVES
+        sim.step(TickInput(PlayerInput(left=rng.random() < 0.3, right=rng.random() < 0.3, fire=True)))
+    elapsed = time.perf_counter() - start
+    shots = entity_allocations['Shot'] / ticks
+    explosions = entity_allocations['Explosion'] / ticks
+    return elapsed / ticks * 1e6, shots, explosions, sim.pool_stats()
+
+
+def main():
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    print(f"{ticks} ticks atirando em todo tick")
+    print(f"{'modo':<8} {'us/tick':>8} {'tiros novos/tick':>17} {'explosoes novas/tick':>21} "
+          f"{'acerto tiros':>13} {'pico tiros':>11} {'acerto expl.':>13} {'pico expl.':>11}")
+    for name, pooled in (("sem pool", False), ("pool", True)):
+        us, shots, explosions, stats = run(ticks, pooled)
+        print(f"{name:<8} {us:>8.1f} {shots:>17.3f} {explosions:>21.3f} "
+              f"{stats['shots']['hit_rate']:>13.1%} {stats['shots']['peak']:>11} "
+              f"{stats['explosions']['hit_rate']:>13.1%} {stats['explosions']['peak']:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+### Benchmark do registro de entidades (entities.EntityRegistry)
+### Simula o cliente aplicando snapshots consecutivos do host e compara:
+### - reconstrucao das listas com from_dict a cada pacote (comportamento antigo)
+### - atualizacao no lugar pelo ID de rede (registro)
+### Mostra quantas entidades sao alocadas por frame e o tempo por snapshot
+###
+### Para executar:
+### python benchmarks/bench_registry.py [frames]
+
+import os
+import sys
+import time
+
+# Permite importar os modulos do jogo a partir da pasta "benchmarks"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from entities import *
+from bench_codec import build_snapshot, next_frame
+
+
+# Listas do snapshot e a classe de entidade correspondente
+ENTITY_TYPES = (('arvores', Tree), ('shots', Shot), ('explosions', Explosion),
+                ('boats', Boat), ('bombs', GasolineBomb))
+
+
+def run_rebuild(snapshots):
+    for snapshot in snapshots:
+        lists = [[cls.from_dict(d) for d in snapshot[key]] for key, cls in ENTITY_TYPES]
+    return lists
+
+
+def run_registry(snapshots):
+    registries = [(key, EntityRegistry(cls)) for key, cls in ENTITY_TYPES]
+    for snapshot in snapshots:
+        lists = [registry.apply(snapshot[key]) for key, registry in registries]
+    return lists
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    # Sequencia de snapshots em regime: mesmas entidades, posicoes mudando a cada frame
+    snapshots = [build_snapshot()]
+    for _ in range(frames - 1):
+        snapshots.append(next_frame(snapshots[-1]))
+    n_entities = sum(len(snapshots[0][key]) for key, _ in ENTITY_TYPES)
+
+    print(f"{frames} snapshots com {n_entities} entidades cada")
+    print(f"{'modo':<10} {'entidades alocadas/frame':>25} {'us/snapshot':>12}")
+    for name, run in (("rebuild", run_rebuild), ("registry", run_registry)):
+        reset_allocation_count()
+        start = time.perf_counter()
+        run(snapshots)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<10} {allocation_count() / frames:>25.3f} {elapsed / frames * 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+### Benchmark do desenho do rio (Background.draw)
+### Compara o desenho antigo (tela inteira, 9 linhas do pyxel por linha da tela) com a imagem do rio
+### guardada fora da tela, que so desenha as linhas novas do topo. Confere que os pixels sao os mesmos
+###
+### Precisa do pyxel com janela. Sem tela (servidor, CI), use o driver offscreen do SDL:
+### SDL_VIDEODRIVER=offscreen python benchmarks/bench_river.py [frames]
+
+import os
+import sys
+import time
+
+# Permite importar os modulos do jogo a partir da pasta "benchmarks"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyxel
+from config import *
+from map_generator import Background
+
+CHECK_EVERY = 100   # Frames entre as comparacoes de pixels
+
+
+def draw_full(bg):
+    """Desenho antigo do Background.draw: retorna o numero de chamadas de desenho."""
+    pyxel.rect(0, 0, pyxel.width, pyxel.height, 9)
+    for screen_y in range(pyxel.height):
+        esq, dir = bg.obter_margens_rio(screen_y)
+        for i in range(4):
+            pyxel.line(int(esq)-i, screen_y, int(esq), screen_y, bg.cor_borda)
+            pyxel.line(int(dir), screen_y, int(dir)+i, screen_y, bg.cor_borda)
+        pyxel.line(int(esq), screen_y, int(dir), screen_y, 12)
+    return 1 + 9 * pyxel.height
+
+
+def draw_cached(bg, rows):
+    """Desenho novo. 'rows' conta as linhas desenhadas: 4 chamadas por linha, mais os dois blt."""
+    before = rows[0]
+    bg.draw()
+    drawn = rows[0] - before
+    return 1 + (1 + 4 * drawn if drawn else 0)
+
+
+def screen_pixels():
+    return [pyxel.pget(x, y) for y in range(pyxel.height) for x in range(pyxel.width)]
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    pyxel.init(SCREEN_WIDTH, SCREEN_HEIGHT)
+
+    bg = Background()
+    bg.tree_manager.draw_arvores = lambda: None   # so o rio
+    rows = [0]
+    draw_row = bg._desenhar_linha_rio
+
+    def counted_row(*args):
+        rows[0] += 1
+        draw_row(*args)
+    bg._desenhar_linha_rio = counted_row
+
+    full_time = cached_time = 0.0
+    full_calls = cached_calls = 0
+    checks = 0
+    for frame in range(frames):
+        bg.update()
+
+        start = time.perf_counter()
+        full_calls += draw_full(bg)
+        full_time += time.perf_counter() - start
+        if frame % CHECK_EVERY == 0:
+            expected = screen_pixels()
+
+        start = time.perf_counter()
+        cached_calls += draw_cached(bg, rows)
+        cached_time += time.perf_counter() - start
+        if frame % CHECK_EVERY == 0:
+            assert screen_pixels() == expected, f"pixels diferentes no frame {frame}"
+            checks += 1
+
+    print(f"{frames} frames, {checks} comparacoes de pixels iguais")
+    print(f"{'modo':<10} {'chamadas/frame':>15} {'us/frame':>10}")
+    print(f"{'antigo':<10} {full_calls / frames:>15.1f} {full_time / frames * 1e6:>10.1f}")
+    print(f"{'imagem':<10} {cached_calls / frames:>15.1f} {cached_time / frames * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
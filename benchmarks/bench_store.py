@@ -0,0 +1,101 @@
+### Benchmark do armazenamento em colunas (entity_store.py) contra objetos comuns
+### Mede a memoria por entidade (tracemalloc) e o custo de mover e descartar N barcos por tick,
+### como o BoatManager fazia antes (um objeto com __dict__ por barco e uma lista refeita a cada frame)
+###
+### Para executar:
+### python benchmarks/bench_store.py [ticks]
+
+import os
+import sys
+import time
+import random
+import tracemalloc
+
+# Permite importar os modulos do jogo a partir da pasta "benchmarks"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import *
+from entities import Boat
+from entity_store import EntityStore
+
+SIZES = (100, 1000, 10000)
+
+
+class DictBoat:
+    """Barco como era antes do EntityStore: atributos no __dict__ de cada objeto."""
+    def __init__(self, x, y, vy=1, net_id=0):
+        self.net_id = net_id
+        self.x = x
+        self.y = y
+        self.vy = vy
+        self.width = 16
+        self.height = 16
+        self.visible = True
+
+    def update(self):
+        self.y += self.vy
+
+
+def bytes_per_entity(n, create):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    entities = create(n)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del entities
+    return (after - before) / n
+
+
+def create_objects(n):
+    rng = random.Random(n)
+    return [DictBoat(rng.randint(0, SCREEN_WIDTH - 16), rng.randint(-SCREEN_HEIGHT, SCREEN_HEIGHT), net_id=i)
+            for i in range(n)]
+
+
+def create_store(n):
+    rng = random.Random(n)
+    store = EntityStore()
+    for i in range(n):
+        Boat(rng.randint(0, SCREEN_WIDTH - 16), rng.randint(-SCREEN_HEIGHT, SCREEN_HEIGHT), net_id=i, store=store)
+    return store
+
+
+def tick_objects(boats, ticks):
+    """Um tick do BoatManager antigo: move um por um e refaz a lista sem os que sairam (repondo-os)."""
+    start = time.perf_counter()
+    for _ in range(ticks):
+        for b in boats:
+            b.update()
+        kept = [b for b in boats if b.y <= SCREEN_HEIGHT]
+        for _ in range(len(boats) - len(kept)):
+            kept.append(DictBoat(0, -SCREEN_HEIGHT))
+        boats = kept
+    return (time.perf_counter() - start) / ticks * 1e6
+
+
+def tick_store(store, ticks):
+    """O mesmo tick com o EntityStore: advance e compact, repondo os removidos."""
+    start = time.perf_counter()
+    for _ in range(ticks):
+        store.advance()
+        count = len(store)
+        store.compact(SCREEN_HEIGHT)
+        for _ in range(count - len(store)):
+            Boat(0, -SCREEN_HEIGHT, store=store)
+    return (time.perf_counter() - start) / ticks * 1e6
+
+
+def main():
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    print(f"{ticks} ticks por medida")
+    print(f"{'N':>6} {'objetos B/ent':>14} {'store B/ent':>12} {'objetos us/tick':>16} {'store us/tick':>14}")
+    for n in SIZES:
+        object_bytes = bytes_per_entity(n, create_objects)
+        store_bytes = bytes_per_entity(n, create_store)
+        object_us = tick_objects(create_objects(n), ticks)
+        store_us = tick_store(create_store(n), ticks)
+        print(f"{n:>6} {object_bytes:>14.1f} {store_bytes:>12.1f} {object_us:>16.1f} {store_us:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
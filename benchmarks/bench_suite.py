@@ -0,0 +1,269 @@
+### Suite de benchmarks da simulacao (sem janela), com resultado em JSON para acompanhar regressoes
+### Roda cada cenario por N ticks com seeds e entradas fixas e mede, por subsistema (metodo do jogo):
+### - tempo por chamada: media, p99 e maximo (us)
+### - memoria por chamada (tracemalloc, em uma segunda passada para nao pesar no tempo): media do que
+###   ficou alocado e do pico dentro da chamada (bytes)
+### - entidades criadas por tick (entities.entity_allocations) e coletas do gc durante a passada de tempo
+###
+### Simulation.step eh a logica do GameState.update sem teclado, som e desenho; os outros subsistemas
+### sao medidos dentro dele (tempos inclusivos). Cenarios:
+### - singleplayer:   entradas aleatorias, como uma partida normal
+### - host_2p:        host de 2 jogadores trocando snapshots com o cliente (delta + codec binario, sem socket)
+### - barcos_densos:  rio em animating_to_center o tempo todo (BoatManager.spawn_chance vai a 0.8)
+### - tiro_pesado:    o jogador atira em todo tick
+###
+### Para executar:
+### python benchmarks/bench_suite.py [--ticks N] [--out ARQUIVO] [--baseline ARQUIVO] [--threshold 0.2]
+### Com --baseline, compara a media e o p99 com um resultado anterior e sai com erro se algum piorou
+### mais que o threshold (fracao)
+
+import os
+import sys
+import gc
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+import tracemalloc
+
+# Permite importar os modulos do jogo a partir da pasta "benchmarks"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation import *
+from config import *
+import bench_players
+
+SEED = 12345  # Seed de todas as partidas: a mesma carga em toda execucao
+
+
+def random_input(rng, fire_chance=0.1):
+    return PlayerInput(left=rng.random() < 0.4, right=rng.random() < 0.4, up=rng.random() < 0.2,
+                       down=rng.random() < 0.2, fire=rng.random() < fire_chance)
+
+
+# ——— Cenarios: cada um retorna (simulacao medida, funcao que avanca um tick) ———
+def singleplayer(rng):
+    sim = Simulation(initial_seed=SEED)
+    def tick():
+        sim.player.lives = MAX_LIVES
+        sim.step(TickInput(random_input(rng)))
+    return sim, tick
+
+
+def host_2p(rng):
+    host = Simulation(is_multiplayer=True, is_host=True, initial_seed=SEED)
+    client = Simulation(is_multiplayer=True, initial_seed=SEED, local_slot=1)
+    uplink, downlink = bench_players.Link(), bench_players.Link()
+    def tick():
+        for p in host.players:
+            p.lives = MAX_LIVES
+        client.step(TickInput(random_input(rng)))
+        host.apply_snapshot(uplink.transmit(client.snapshot()), 1)
+        host.step(TickInput(random_input(rng)))
+        client.apply_snapshot(downlink.transmit(host.snapshot()))
+    return host, tick
+
+
+def barcos_densos(rng):
+    sim = Simulation(initial_seed=SEED)
+    def tick():
+        sim.player.lives = MAX_LIVES
+        sim.background.animating_to_center = True
+        sim.step(TickInput(random_input(rng)))
+    return sim, tick
+
+
+def tiro_pesado(rng):
+    sim = Simulation(initial_seed=SEED)
+    def tick():
+        sim.player.lives = MAX_LIVES
+        sim.step(TickInput(random_input(rng, fire_chance=1.0)))
+    return sim, tick
+
+
+SCENARIOS = {
+    'singleplayer': singleplayer,
+    'host_2p': host_2p,
+    'barcos_densos': barcos_densos,
+    'tiro_pesado': tiro_pesado,
+}
+
+
+# ——— Medicao por subsistema ———
+def subsystems(sim):
+    """(nome, objeto, metodo) medidos. Os metodos sao trocados na instancia, entao as chamadas internas passam por eles."""
+    return (
+        ('Simulation.step', sim, 'step'),
+        ('Simulation.check_all_collisions', sim, 'check_all_collisions'),
+        ('Simulation.update_shots', sim, 'update_shots'),
+        ('Background.update', sim.background, 'update'),
+        ('TreeManager.update_arvores', sim.background.tree_manager, 'update_arvores'),
+        ('BoatManager.update', sim.boat_manager, 'update'),
+        ('GasolineBombManager.update', sim.bomb_manager, 'update'),
+        ('Simulation.apply_snapshot', sim, 'apply_snapshot'),
+        ('Simulation.snapshot', sim, 'snapshot'),
+    )
+
+
+class Probe:
+    """Amostras de um subsistema: tempo (s) ou memoria (bytes) de cada chamada."""
+    def __init__(self):
+        self.times = []
+        self.net = []       # Bytes que ficaram alocados depois da chamada
+        self.peak = []      # Pico de bytes alocados durante a chamada
+
+    def timed(self, method):
+        times = self.times
+        clock = time.perf_counter
+        def wrapper(*args, **kwargs):
+            start = clock()
+            result = method(*args, **kwargs)
+            times.append(clock() - start)
+            return result
+        return wrapper
+
+    def traced(self, method, peaks):
+        # 'peaks' eh a pilha das chamadas medidas em andamento: reset_peak de uma chamada interna
+        # apagaria o pico da externa, entao ele eh guardado na pilha antes
+        def wrapper(*args, **kwargs):
+            before, peak = tracemalloc.get_traced_memory()
+            if peaks:
+                peaks[-1] = max(peaks[-1], peak)
+            tracemalloc.reset_peak()
+            peaks.append(before)
+            result = method(*args, **kwargs)
+            after, peak = tracemalloc.get_traced_memory()
+            peak = max(peaks.pop(), peak)
+            if peaks:
+                peaks[-1] = max(peaks[-1], peak)
+            self.net.append(after - before)
+            self.peak.append(peak - before)
+            return result
+        return wrapper
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_pass(scenario, ticks, probes, trace):
+    sim, tick = SCENARIOS[scenario](random.Random(SEED))
+    peaks = []
+    for name, obj, attr in subsystems(sim):
+        probe = probes.setdefault(name, Probe())
+        method = getattr(obj, attr)
+        setattr(obj, attr, probe.traced(method, peaks) if trace else probe.timed(method))
+    for _ in range(ticks):
+        tick()
+
+
+def run(scenario, ticks):
+    probes = {}
+    reset_allocation_count()
+    collections = sum(stat['collections'] for stat in gc.get_stats())
+    start = time.perf_counter()
+    run_pass(scenario, ticks, probes, trace=False)
+    elapsed = time.perf_counter() - start
+    collections = sum(stat['collections'] for stat in gc.get_stats()) - collections
+    entities = dict(entity_allocations)
+
+    tracemalloc.start()
+    run_pass(scenario, ticks, probes, trace=True)
+    tracemalloc.stop()
+
+    result = {
+        'ticks': ticks,
+        'seconds': elapsed,
+        'gc_collections': collections,
+        'entities_per_tick': {kind: count / ticks for kind, count in sorted(entities.items())},
+        'subsystems': {},
+    }
+    for name, probe in probes.items():
+        if not probe.times:
+            continue    # Nao roda neste cenario (ex.: snapshots no singleplayer)
+        result['subsystems'][name] = {
+            'calls': len(probe.times),
+            'mean_us': sum(probe.times) / len(probe.times) * 1e6,
+            'p99_us': percentile(probe.times, 0.99) * 1e6,
+            'max_us': max(probe.times) * 1e6,
+            'mean_net_bytes': sum(probe.net) / len(probe.net),
+            'mean_peak_bytes': sum(probe.peak) / len(probe.peak),
+        }
+    return result
+
+
+def metadata(ticks):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'ticks': ticks,
+        'seed': SEED,
+        'config': {'SPATIAL_HASH': SPATIAL_HASH, 'NUMPY_COLLISIONS': NUMPY_COLLISIONS,
+                   'BANK_COLLISION': BANK_COLLISION, 'DELTA_SNAPSHOTS': DELTA_SNAPSHOTS},
+    }
+
+
+def compare(results, baseline, threshold):
+    """Mostra a variacao da media e do p99 contra o resultado anterior. Retorna quantos pioraram alem do threshold."""
+    regressions = 0
+    print()
+    print(f"Comparado com {baseline['meta'].get('commit')} ({baseline['meta'].get('date')}), "
+          f"limite {threshold:.0%}")
+    if baseline['meta'].get('ticks') != next(iter(results.values()))['ticks']:
+        print("Aviso: quantidade de ticks diferente da execucao anterior (p99 e max nao sao comparaveis)")
+    for scenario, result in results.items():
+        old = baseline['scenarios'].get(scenario, {}).get('subsystems', {})
+        for name, new in result['subsystems'].items():
+            if name not in old:
+                continue
+            changes = [(new[key] - old[name][key]) / old[name][key] if old[name][key] else 0.0
+                       for key in ('mean_us', 'p99_us')]
+            worse = any(change > threshold for change in changes)
+            regressions += worse
+            print(f"{'!' if worse else ' '} {scenario:<14} {name:<34} media {changes[0]:>+7.1%}  p99 {changes[1]:>+7.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks da simulacao por subsistema")
+    parser.add_argument("--ticks", type=int, default=1200)
+    parser.add_argument("--out", default="bench_suite.json", help="arquivo JSON com os resultados")
+    parser.add_argument("--baseline", help="JSON de uma execucao anterior para comparar")
+    parser.add_argument("--threshold", type=float, default=0.2, help="piora (fracao) que conta como regressao")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="cenarios separados por virgula")
+    args = parser.parse_args()
+
+    results = {}
+    for scenario in args.scenarios.split(","):
+        results[scenario] = result = run(scenario, args.ticks)
+        print(f"{scenario} ({args.ticks} ticks, {result['gc_collections']} coletas do gc, "
+              f"entidades/tick {sum(result['entities_per_tick'].values()):.2f})")
+        print(f"  {'subsistema':<34} {'media us':>9} {'p99 us':>9} {'max us':>9} {'B retidos':>10} {'B pico':>9}")
+        for name, s in result['subsystems'].items():
+            print(f"  {name:<34} {s['mean_us']:>9.1f} {s['p99_us']:>9.1f} {s['max_us']:>9.1f} "
+                  f"{s['mean_net_bytes']:>10.0f} {s['mean_peak_bytes']:>9.0f}")
+
+    with open(args.out, "w") as f:
+        json.dump({'meta': metadata(args.ticks), 'scenarios': results}, f, indent=2)
+    print(f"\nResultados em {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,385 @@
+### Modulo de codificacao dos pacotes de rede. Responsavel por:
+### - Converter os pacotes (dicionarios) em bytes para envio via UDP e vice-versa
+### - Formato binario versionado (struct) para os snapshots do jogo ('game_update'), seus deltas
+###   e as mensagens de entradas do lockstep ('lockstep', ver lockstep.py)
+### - Formato JSON, mantido como alternativa para depuracao
+###
+### Os dois formatos convivem: o receptor identifica o formato pelo primeiro byte do pacote
+### (pacotes JSON sempre comecam com '{', pacotes binarios com CODEC_MAGIC ou CODEC_LOCKSTEP)
+###
+### As mensagens do lockstep saem a cada tick e tem poucos bytes de conteudo, entao nao usam o cabecalho
+### comum (horario, sequencia e confirmacao do pacote, que elas nao usam): levam so o byte CODEC_LOCKSTEP
+### e os ticks com 16 bits (o Lockstep completa os bits de cima pelo proprio tick, ver Lockstep.receive)
+
+# Bibliotecas
+import json             # Formato texto (depuracao e mensagens de controle: handshake, heartbeat, game_start)
+import struct           # Empacotamento binario de tamanho fixo
+from config import *    # Importa constantes e configuracoes do arquivo "config.py"
+
+# Formatos de transporte aceitos pelo NetworkManager
+WIRE_BINARY = "binary"
+WIRE_JSON = "json"
+
+CODEC_MAGIC = 0xB5      # Primeiro byte de todo pacote binario (nunca colide com '{' = 0x7B do JSON)
+CODEC_LOCKSTEP = 0xB6   # Primeiro byte das mensagens do lockstep ('lockstep'), no formato compacto
+CODEC_VERSION = 7       # Versao do esquema binario. Pacotes de outra versao sao rejeitados
+
+KIND_GAME_UPDATE = 1    # Tipo de mensagem binaria: snapshot completo do jogo ('game_update')
+KIND_GAME_DELTA = 2     # Tipo de mensagem binaria: delta de um snapshot em relacao a uma base (ver delta.py)
+
+# Flags do snapshot
+FLAG_HOST = 0x01        # Remetente eh o host (player_type = 'host')
+
+# Cabecalho de todo pacote binario: magic, versao, tipo da mensagem, timestamp de envio,
+# sequencia do pacote (_NO_SEQ = sem sequencia) e ultima sequencia confirmada do outro lado (-1 = nenhuma)
+_HEADER = struct.Struct("<BBBdIi")
+_NO_SEQ = 0xFFFFFFFF
+
+# Campos fixos do snapshot:
+# flags, slot do remetente, scroll, rio_centro, rio_largura, seed, quantidade de blocos de entidades.
+# Os jogadores (posicao, vidas, gasolina...) vao no bloco 'players', um registro por jogador
+_UPDATE = struct.Struct("<BBiffIB")
+
+# Cabecalho de cada bloco de entidades: tag do tipo e quantidade de registros (todos do mesmo tamanho)
+_BLOCK = struct.Struct("<BH")
+
+# Delta: sequencia da base, mascara dos campos simples alterados, quantidade de blocos de entidades
+_DELTA = struct.Struct("<IHB")
+# Bloco de entidades no delta: tag, modo (0 = alteracoes, 1 = lista inteira),
+# quantidade de IDs removidos e quantidade de entidades alteradas/novas
+_DELTA_BLOCK = struct.Struct("<BBHH")
+_DELTA_MERGE = 0
+_DELTA_REPLACE = 1
+# ID de rede de uma entidade removida
+_ID = struct.Struct("<I")
+# Entidade alterada: mascara dos campos presentes (o 'id' eh o primeiro campo e sempre esta presente)
+_CHANGE = struct.Struct("<B")
+
+# Lockstep: CODEC_LOCKSTEP, ultimo tick confirmado e quantidades (bits 0-3: sequencias de entradas,
+# bits 4-7: checksums). Todos os ticks vao com os 16 bits de baixo
+_LOCKSTEP = struct.Struct("<BHB")
+# Sequencia de entradas de um jogador: slot, primeiro tick e quantidade (seguidos de um byte por tick)
+_LOCKSTEP_RUN = struct.Struct("<BHB")
+# Checksum do estado em um tick: tick e CRC32
+_LOCKSTEP_HASH = struct.Struct("<HI")
+_TICK_MASK = 0xFFFF
+
+# Tags que identificam o tipo de cada registro de entidade
+TAG_TREE = 1
+TAG_SHOT = 2
+TAG_EXPLOSION = 3
+TAG_BOAT = 4
+TAG_BOMB = 5
+TAG_SOUND = 6
+TAG_PLAYER = 7
+TAG_INPUT = 8
+
+
+class _Schema:
+    """Esquema de um tipo de registro: chave no snapshot e lista de campos (nome, formato struct)."""
+    def __init__(self, tag, key, fields, as_tuple=False):
+        self.tag = tag
+        self.key = key                                  # Chave da lista correspondente no snapshot
+        self.names = tuple(name for name, _ in fields)  # Ordem dos campos no registro
+        self.as_tuple = as_tuple                        # Registro eh uma tupla (ex: sons) e nao um dicionario
+        self.struct = struct.Struct("<" + "".join(fmt for _, fmt in fields))
+        # Struct de cada campo isolado (usado nos deltas, que so levam os campos alterados)
+        self.field_structs = tuple(struct.Struct("<" + fmt) for _, fmt in fields)
+        # Campos inteiros aceitam floats sem parte fracionaria (convertidos com int())
+        self.int_fields = tuple(i for i, (_, fmt) in enumerate(fields) if fmt in "bBhHiI")
+
+    def pack(self, item):
+        values = item if self.as_tuple else [item[name] for name in self.names]
+        try:
+            return self.struct.pack(*values)
+        except struct.error:
+            # Caminho lento: converte os floats inteiros (ex.: 12.0) dos campos inteiros antes de empacotar
+            values = list(values)
+            for i in self.int_fields:
+                values[i] = self._whole(i, values[i])
+            return self.struct.pack(*values)
+
+    def _whole(self, i, value):
+        """Valor do campo inteiro 'i' como int. Um float com parte fracionaria seria truncado: eh um erro."""
+        if isinstance(value, float):
+            if not value.is_integer():
+                raise ValueError(f"Valor nao inteiro no campo '{self.names[i]}' de '{self.key}': {value}")
+            return int(value)
+        return value
+
+    def pack_block(self, items):
+        """Empacota uma lista de entidades: cabecalho (tag, quantidade) seguido dos registros."""
+        return _BLOCK.pack(self.tag, len(items)) + b"".join([self.pack(item) for item in items])
+
+    def unpack_block(self, buffer, offset, count):
+        """Desempacota 'count' registros consecutivos a partir de 'offset'."""
+        end = offset + count * self.struct.size
+        rows = self.struct.iter_unpack(buffer[offset:end])
+        if self.as_tuple:
+            return [list(values) for values in rows], end
+        names = self.names
+        return [dict(zip(names, values)) for values in rows], end
+
+    def pack_change(self, changed):
+        """Empacota os campos alterados de uma entidade (mascara e valores presentes)."""
+        mask = 0
+        parts = []
+        for i, name in enumerate(self.names):
+            if name in changed:
+                mask |= 1 << i
+                value = changed[name]
+                parts.append(self.field_structs[i].pack(self._whole(i, value) if i in self.int_fields else value))
+        if len(parts) != len(changed):
+            raise ValueError(f"Campo desconhecido em '{self.key}': {sorted(set(changed) - set(self.names))}")
+        return _CHANGE.pack(mask) + b"".join(parts)
+
+    def unpack_change(self, buffer, offset):
+        """Desempacota uma entidade alterada. Retorna (campos, novo offset)."""
+        mask, = _CHANGE.unpack_from(buffer, offset)
+        offset += _CHANGE.size
+        changed = {}
+        for i, name in enumerate(self.names):
+            if mask & (1 << i):
+                field_struct = self.field_structs[i]
+                changed[name] = field_struct.unpack_from(buffer, offset)[0]
+                offset += field_struct.size
+        return changed, offset
+
+
+# Tabela de esquemas das entidades enviadas no snapshot (ordem define a ordem no pacote)
+ENTITY_SCHEMAS = (
+    _Schema(TAG_TREE, 'arvores', (('id', 'I'), ('x', 'h'), ('y', 'h'), ('visible', '?'), ('sprite_type', 'B'))),
+    _Schema(TAG_SHOT, 'shots', (('id', 'I'), ('x', 'h'), ('y', 'h'), ('vy', 'b'), ('owner', 'B'))),
+    _Schema(TAG_EXPLOSION, 'explosions', (('id', 'I'), ('x', 'h'), ('y', 'h'), ('tile_u', 'B'), ('tile_v', 'B'),
+                                          ('width', 'B'), ('height', 'B'), ('timer', 'b'))),
+    _Schema(TAG_BOAT, 'boats', (('id', 'I'), ('x', 'h'), ('y', 'h'), ('vy', 'b'), ('visible', '?'))),
+    _Schema(TAG_BOMB, 'bombs', (('id', 'I'), ('x', 'h'), ('y', 'h'), ('vy', 'b'), ('visible', '?'))),
+    _Schema(TAG_SOUND, 'sounds', (('channel', 'B'), ('sound', 'B')), as_tuple=True),
+    _Schema(TAG_PLAYER, 'players', (('id', 'B'), ('x', 'h'), ('y', 'h'), ('lives', 'B'), ('fuel', 'f'),
+                                    ('invincible', 'h'), ('score', 'I'), ('input_seq', 'I'))),
+    # Comandos de movimento do cliente ainda nao confirmados pelo host: (sequencia, bits das teclas)
+    _Schema(TAG_INPUT, 'inputs', (('seq', 'I'), ('bits', 'B')), as_tuple=True),
+)
+_SCHEMAS_BY_TAG = {schema.tag: schema for schema in ENTITY_SCHEMAS}
+# Listas de tuplas que vao inteiras no delta quando mudam (um bloco no lugar do campo)
+_DELTA_BLOCK_SCHEMAS = {'sounds': _SCHEMAS_BY_TAG[TAG_SOUND], 'inputs': _SCHEMAS_BY_TAG[TAG_INPUT]}
+
+# Campos simples que podem aparecer em um delta (o bit na mascara eh a posicao na tupla).
+# 'player_type', 'sounds' e 'inputs' tem tratamento especial (ver _encode_delta)
+_DELTA_FIELDS = (
+    ('player_type', struct.Struct("<?")),
+    ('slot', struct.Struct("<B")),
+    ('sounds', None),
+    ('inputs', None),
+    ('scroll', struct.Struct("<i")),
+    ('rio_centro', struct.Struct("<f")),
+    ('rio_largura', struct.Struct("<f")),
+    ('seed', struct.Struct("<I")),
+)
+_DELTA_FIELD_NAMES = {name for name, _ in _DELTA_FIELDS}
+
+
+# Converte um pacote (dicionario) em bytes, no formato escolhido
+def encode_packet(packet, wire_format=WIRE_FORMAT):
+    # Apenas os snapshots do jogo (completos ou delta) e as mensagens do lockstep tem esquema binario.
+    # O resto (handshake, heartbeat, game_start) vai em JSON
+    if wire_format == WIRE_BINARY and packet.get('type') == 'game_data':
+        if 'delta' in packet:
+            return _encode_header(packet, KIND_GAME_DELTA) + _encode_delta(packet)
+        payload = packet.get('payload')
+        if isinstance(payload, dict) and payload.get('type') == 'game_update':
+            return _encode_header(packet, KIND_GAME_UPDATE) + _encode_update(payload)
+        if isinstance(payload, dict) and payload.get('type') == 'lockstep':
+            return _encode_lockstep(payload)  # Sem o cabecalho comum
+
+    return json.dumps(packet).encode('utf-8')
+
+# Converte bytes recebidos em um pacote (dicionario), detectando o formato automaticamente
+def decode_packet(raw):
+    if raw and raw[0] == CODEC_MAGIC:
+        return _decode_binary(raw)
+    if raw and raw[0] == CODEC_LOCKSTEP:
+        return {'type': 'game_data', 'payload': _decode_lockstep(raw)}
+    return json.loads(raw.decode('utf-8'))
+
+
+# Empacota o cabecalho comum dos pacotes binarios
+def _encode_header(packet, kind):
+    seq = packet.get('seq')
+    ack = packet.get('ack')
+    return _HEADER.pack(CODEC_MAGIC, CODEC_VERSION, kind, packet.get('timestamp', 0.0),
+                        _NO_SEQ if seq is None else seq, -1 if ack is None else ack)
+
+# Empacota um snapshot 'game_update' no formato binario
+def _encode_update(payload):
+    flags = 0
+    if payload.get('player_type') == 'host':
+        flags |= FLAG_HOST
+
+    # Um bloco por tipo de entidade presente no snapshot
+    blocks = [schema.pack_block(payload[schema.key]) for schema in ENTITY_SCHEMAS if payload.get(schema.key)]
+
+    fixed = _UPDATE.pack(
+        flags, payload.get('slot', 0), int(payload.get('scroll', 0)),
+        payload['rio_centro'], payload['rio_largura'], payload['seed'],
+        len(blocks),
+    )
+    return b"".join((fixed, *blocks))
+
+# Empacota um delta (gerado por delta.diff_snapshot) no formato binario
+def _encode_delta(packet):
+    changes = packet['delta']
+    if changes.get('removed'):
+        raise ValueError("Delta binario nao suporta remocao de campos do snapshot")
+    fields = changes.get('fields', {})
+    unknown = set(fields) - _DELTA_FIELD_NAMES
+    if unknown:
+        raise ValueError(f"Campos sem esquema binario no delta: {sorted(unknown)}")
+
+    mask = 0
+    parts = []
+    for bit, (name, field_struct) in enumerate(_DELTA_FIELDS):
+        if name not in fields:
+            continue
+        mask |= 1 << bit
+        value = fields[name]
+        if name == 'player_type':
+            parts.append(field_struct.pack(value == 'host'))
+        elif name in _DELTA_BLOCK_SCHEMAS:
+            parts.append(_DELTA_BLOCK_SCHEMAS[name].pack_block(value))
+        else:
+            parts.append(field_struct.pack(value))
+
+    entities = changes.get('entities', {})
+    blocks = []
+    for schema in ENTITY_SCHEMAS:
+        if schema.key not in entities:
+            continue
+        removed, changed_items = entities[schema.key]
+        if removed is None:
+            # Lista inteira: registros completos, no mesmo formato do snapshot
+            blocks.append(_DELTA_BLOCK.pack(schema.tag, _DELTA_REPLACE, 0, len(changed_items)))
+            blocks.extend(schema.pack(item) for item in changed_items)
+            continue
+        blocks.append(_DELTA_BLOCK.pack(schema.tag, _DELTA_MERGE, len(removed), len(changed_items)))
+        blocks.extend(_ID.pack(net_id) for net_id in removed)
+        blocks.extend(schema.pack_change(changed) for changed in changed_items)
+
+    return b"".join((_DELTA.pack(packet['base'], mask, len(entities)), *parts, *blocks))
+
+# Empacota uma mensagem do lockstep: entradas por jogador (um byte por tick) e checksums
+def _encode_lockstep(payload):
+    runs = payload['inputs']
+    hashes = payload.get('hashes', ())
+    if len(runs) > 0x0F or len(hashes) > 0x0F:
+        raise ValueError(f"Mensagem do lockstep grande demais: {len(runs)} sequencias, {len(hashes)} checksums")
+    parts = [_LOCKSTEP.pack(CODEC_LOCKSTEP, payload['ack'] & _TICK_MASK, len(runs) | len(hashes) << 4)]
+    for slot, first, bits in runs:
+        parts.append(_LOCKSTEP_RUN.pack(slot, first & _TICK_MASK, len(bits)))
+        parts.append(bytes(bits))
+    parts.extend(_LOCKSTEP_HASH.pack(tick & _TICK_MASK, crc) for tick, crc in hashes)
+    return b"".join(parts)
+
+# Desempacota um pacote binario, devolvendo o mesmo dicionario que o formato JSON produziria
+def _decode_binary(raw):
+    _, version, kind, timestamp, seq, ack = _HEADER.unpack_from(raw, 0)
+    if version != CODEC_VERSION:
+        raise ValueError(f"Versao de codec incompativel: {version} (esperada {CODEC_VERSION})")
+
+    packet = {
+        'type': 'game_data',
+        'timestamp': timestamp,
+        'seq': None if seq == _NO_SEQ else seq,
+        'ack': None if ack < 0 else ack,
+    }
+    if kind == KIND_GAME_UPDATE:
+        packet['payload'] = _decode_update(raw, _HEADER.size)
+    elif kind == KIND_GAME_DELTA:
+        packet['base'], packet['delta'] = _decode_delta(raw, _HEADER.size)
+    else:
+        raise ValueError(f"Tipo de mensagem binaria desconhecido: {kind}")
+    return packet
+
+# Desempacota o corpo de um snapshot completo
+def _decode_update(raw, offset):
+    flags, slot, scroll, rio_centro, rio_largura, seed, n_blocks = _UPDATE.unpack_from(raw, offset)
+    offset += _UPDATE.size
+
+    payload = {
+        'type': 'game_update',
+        'player_type': 'host' if flags & FLAG_HOST else 'client',
+        'slot': slot,
+        'scroll': scroll,
+        'rio_centro': rio_centro,
+        'rio_largura': rio_largura,
+        'seed': seed,
+    }
+    for schema in ENTITY_SCHEMAS:
+        payload[schema.key] = []
+
+    for _ in range(n_blocks):
+        tag, count = _BLOCK.unpack_from(raw, offset)
+        schema = _SCHEMAS_BY_TAG[tag]
+        payload[schema.key], offset = schema.unpack_block(raw, offset + _BLOCK.size, count)
+
+    return payload
+
+# Desempacota o corpo de um delta. Retorna (sequencia da base, delta)
+def _decode_delta(raw, offset):
+    base, mask, n_blocks = _DELTA.unpack_from(raw, offset)
+    offset += _DELTA.size
+
+    fields = {}
+    for bit, (name, field_struct) in enumerate(_DELTA_FIELDS):
+        if not mask & (1 << bit):
+            continue
+        if name in _DELTA_BLOCK_SCHEMAS:
+            _, count = _BLOCK.unpack_from(raw, offset)
+            fields[name], offset = _DELTA_BLOCK_SCHEMAS[name].unpack_block(raw, offset + _BLOCK.size, count)
+            continue
+
+        values = field_struct.unpack_from(raw, offset)
+        offset += field_struct.size
+        if name == 'player_type':
+            fields['player_type'] = 'host' if values[0] else 'client'
+        else:
+            fields[name] = values[0]
+
+    entities = {}
+    for _ in range(n_blocks):
+        tag, mode, n_removed, n_changes = _DELTA_BLOCK.unpack_from(raw, offset)
+        offset += _DELTA_BLOCK.size
+        schema = _SCHEMAS_BY_TAG[tag]
+        if mode == _DELTA_REPLACE:
+            items, offset = schema.unpack_block(raw, offset, n_changes)
+            entities[schema.key] = [None, items]
+            continue
+
+        removed = [_ID.unpack_from(raw, offset + i * _ID.size)[0] for i in range(n_removed)]
+        offset += n_removed * _ID.size
+        changed_items = []
+        for _ in range(n_changes):
+            change, offset = schema.unpack_change(raw, offset)
+            changed_items.append(change)
+        entities[schema.key] = [removed, changed_items]
+
+    changes = {}
+    if fields:
+        changes['fields'] = fields
+    if entities:
+        changes['entities'] = entities
+    return base, changes
+
+# Desempacota uma mensagem do lockstep (ticks com 16 bits)
+def _decode_lockstep(raw):
+    _, ack, counts = _LOCKSTEP.unpack_from(raw, 0)
+    n_runs, n_hashes = counts & 0x0F, counts >> 4
+    offset = _LOCKSTEP.size
+    runs = []
+    for _ in range(n_runs):
+        slot, first, count = _LOCKSTEP_RUN.unpack_from(raw, offset)
+        offset += _LOCKSTEP_RUN.size
+        runs.append([slot, first, list(raw[offset:offset + count])])
+        offset += count
+    hashes = [list(_LOCKSTEP_HASH.unpack_from(raw, offset + i * _LOCKSTEP_HASH.size)) for i in range(n_hashes)]
+    return {'type': 'lockstep', 'ack': ack, 'inputs': runs, 'hashes': hashes}
@@ -5,6 +5,19 @@ SCREEN_WIDTH = 160      # Largura da janela
 SCREEN_HEIGHT = 180     # Altura da janela
 FPS = 60                # Frames por segundo
 FULLSCREAM = False          # Define se o jogo vai comecar ou nao em tela cheia
+FIXED_TIMESTEP = True       # Simula FPS ticks por segundo de tempo real, independente do ritmo dos frames (timestep.py)
+MAX_TICKS_PER_FRAME = 4     # Ticks simulados no maximo em um frame para recuperar um atraso (o resto eh descartado)
+TIMESTEP_SLACK = 0.25       # Folga (em ticks) para a variacao normal do tempo entre frames
+
+# Replays (replay.py)
+REPLAY_RECORD = False       # Grava as partidas singleplayer e lockstep em REPLAY_DIR (python replay.py ARQUIVO reproduz)
+REPLAY_DIR = "replays"      # Pasta dos arquivos de replay
+REPLAY_HASH_INTERVAL = 60   # A cada quantos ticks o checksum do estado vai no replay (conferido na reproducao)
+REPLAY_FLUSH_INTERVAL = 600 # A cada quantos ticks o replay eh descarregado no disco (o que sobra se o jogo fechar)
+
+# Profiler (profiler.py)
+PROFILER_OVERLAY = False    # Comeca com o overlay de tempos por frame aberto (F3 abre e fecha durante o jogo)
+PROFILER_WINDOW = 120       # Frames usados nas medias, maximos e no histograma do overlay
 
 # Rede
 NETWORK_PORT = 5555         # Porta padrao para conexao
@@ -13,6 +26,23 @@ TIMEOUT = 3                 # Tempo (em segundos) para dar um Timeout no cliente
 RECONNECT_INTERVAL = 1.0    # Intervalo (em segundos) entre tentativas de reconexao do cliente, caso o host caia
 MAX_IP_LENGTH = 15          # Tamanho maximo para um IP
 MAX_PORT_LENGTH = 5         # Tamanho maximo para uma Porta
+WIRE_FORMAT = "binary"      # Formato dos pacotes de jogo na rede: "binary" (struct, compacto) ou "json" (para depuracao)
+DELTA_SNAPSHOTS = True      # Envia apenas o que mudou desde o ultimo snapshot confirmado pelo outro lado
+SNAPSHOT_HISTORY_SIZE = 32  # Quantidade de snapshots recentes guardados como base para os deltas
+RECV_QUEUE_SIZE = 256       # Mensagens recebidas guardadas ate o jogo consumir (as mais antigas sao descartadas)
+INTERP_DELAY = 0.1          # Atraso (em segundos) da renderizacao do cliente em relacao ao snapshot mais novo do host (0 desliga)
+INTERP_MAX_EXTRAPOLATION = 0.1  # Quanto (em segundos) o cliente extrapola alem do snapshot mais novo quando os pacotes atrasam
+INTERP_BUFFER_SIZE = 64     # Snapshots guardados no buffer de interpolacao do cliente
+INPUT_BUFFER_SIZE = 120     # Comandos de movimento do cliente guardados ate o host confirmar (predicao)
+MAX_INPUTS_PER_PACKET = 30  # Comandos nao confirmados reenviados em cada snapshot do cliente (redundancia contra perdas)
+NETWORK_SEND_RATE = 60      # Snapshots enviados por segundo (ex.: 20, 30 ou 60). Sons e explosoes dos frames entre dois envios vao juntos
+MAX_PLAYERS = 8             # Jogadores por partida (slot 0 = host, os clientes recebem os slots seguintes no handshake)
+PING_INTERVAL = 0.5         # Intervalo (em segundos) entre os heartbeats que medem o RTT de cada conexao
+NETWORK_STATS_INTERVAL = 0  # A cada quantos segundos as estatisticas de cada conexao vao para o terminal (0 desliga)
+NETWORK_IMPAIRMENT = None   # Rede ruim simulada para testes (cenario de network.IMPAIRMENT_SCENARIOS, ex.: "wifi_ruim"). None desliga
+LOCKSTEP = False            # Multiplayer em lockstep: todos simulam a partida a partir da seed e trocam so as entradas (lockstep.py)
+LOCKSTEP_INPUT_DELAY = 6    # Ticks entre ler a entrada local e simula-la (tempo para ela chegar, via host, aos outros jogadores)
+LOCKSTEP_HASH_INTERVAL = 30 # A cada quantos ticks o checksum do estado eh comparado entre as maquinas
 
 # Cores (paleta Pyxel)
 COLOR_BG = 0                # Cor de fundo
@@ -37,6 +67,20 @@ PLAYER_SPEED = 1        # Velocidade do jogador
 # TODO: Modificar ou remover essas duas constantes quando tiver feito as pixel arts dos avioes
 PLAYER_WIDTH = 16       # Largura do jogador
 PLAYER_HEIGHT = 16      # Altura do jogador
+# Posicao inicial de cada slot de jogador (x, y)
+PLAYER_SPAWNS = ((55, 130), (90, 130), (20, 130), (125, 130), (72, 130), (38, 110), (108, 110), (72, 110))
+
+# Colisoes
+SPATIAL_HASH = True         # Consultas de colisao pela grade uniforme (spatial.py); False testa contra todas as entidades
+COLLISION_CELL_SIZE = 32    # Lado (em pixels) de cada celula da grade de colisao
+NUMPY_COLLISIONS = False    # Resolve tiros x alvos e jogadores x perigos em lote com o NumPy (aabb.py), se estiver instalado
+BANK_COLLISION = True       # Encostar na margem do rio tira vida (depois que o aviao entrou no rio)
+BANK_INSET = 2              # Pixels da caixa do aviao que podem passar da margem (como na colisao com arvores)
+DEBUG_COLLISIONS = False    # Mostra no terminal cada colisao do aviao com uma arvore (atrapalha os benchmarks)
+
+# Pools de entidades
+SHOT_POOL_SIZE = 64         # Tiros livres guardados para reaproveitar (entities.EntityPool)
+EXPLOSION_POOL_SIZE = 32    # Explosoes livres guardadas para reaproveitar
 
 # HUD
 MAX_LIVES = 3               # Quantidade maxima de vida de um jogador
@@ -0,0 +1,171 @@
+### Modulo de compressao delta dos snapshots. Responsavel por:
+### - Guardar os snapshots recentes em um buffer circular indexado pelo numero de sequencia
+### - Calcular apenas os campos que mudaram em relacao a um snapshot base (ja confirmado pelo outro lado)
+### - Reconstruir o snapshot completo a partir da base + delta
+###
+### As entidades sao comparadas pelo ID de rede ('id'): cada lista no delta leva os IDs que sairam
+### e os campos alterados de cada entidade (entidades novas vao completas). A ordem das listas eh
+### preservada: as que ficaram mantem a ordem e as novas entram no final, como fazem os gerenciadores.
+### Se a ordem mudar de outro jeito, a lista eh enviada inteira
+###
+### Arvores, barcos e bombas descem junto com o rio: a coordenada Y deles eh comparada relativa ao
+### deslocamento do cenario (campo 'scroll' do snapshot), entao so entram no delta quando fazem algo
+### diferente de acompanhar o scroll
+
+from config import *    # Importa constantes e configuracoes do arquivo "config.py"
+
+# Listas de entidades (lista de dicionarios) comparadas item a item
+ENTITY_KEYS = ('players', 'arvores', 'shots', 'explosions', 'boats', 'bombs')
+# Entidades que acompanham o scroll do rio
+SCROLLING_KEYS = ('arvores', 'boats', 'bombs')
+
+_MISSING = object()
+
+
+class SnapshotHistory:
+    """Buffer circular de snapshots (seq -> snapshot) de tamanho fixo."""
+    def __init__(self, size=SNAPSHOT_HISTORY_SIZE):
+        self.size = size
+        self._slots = [None] * size  # Cada posicao guarda (seq, snapshot)
+
+    def put(self, seq, snapshot):
+        self._slots[seq % self.size] = (seq, snapshot)
+
+    def get(self, seq):
+        """Retorna o snapshot da sequencia 'seq' ou None se ele ja foi sobrescrito."""
+        if seq is None:
+            return None
+        entry = self._slots[seq % self.size]
+        if entry is not None and entry[0] == seq:
+            return entry[1]
+        return None
+
+    def clear(self):
+        self._slots = [None] * self.size
+
+
+# Calcula o deslocamento vertical esperado entre a base e o snapshot atual
+def _scroll_shift(base, current):
+    base_scroll = base.get('scroll')
+    current_scroll = current.get('scroll')
+    if base_scroll is None or current_scroll is None:
+        return 0
+    return current_scroll - base_scroll
+
+
+# Compara duas listas de entidades pelo ID.
+# Retorna [IDs removidos, [campos alterados (com o 'id'), ...]], [None, lista completa] se a ordem
+# mudou, ou None se nada mudou
+def _diff_entities(old, new, y_shift):
+    old_ids = [item['id'] for item in old]
+    new_ids = [item['id'] for item in new]
+    if old_ids == new_ids:
+        # Caso comum: mesmas entidades, na mesma ordem
+        removed = []
+        previous = old
+    else:
+        new_id_set = set(new_ids)
+        removed = [net_id for net_id in old_ids if net_id not in new_id_set]
+        # As que ficaram precisam estar na mesma ordem e antes das novas
+        survivors = [net_id for net_id in old_ids if net_id in new_id_set]
+        if new_ids[:len(survivors)] != survivors:
+            return [None, new]
+        old_by_id = dict(zip(old_ids, old))
+        previous = [old_by_id.get(net_id) for net_id in new_ids]
+
+    changes = []
+    for item, prev in zip(new, previous):
+        if prev is None:
+            changes.append(item)  # Entidade nova: vai completa
+            continue
+        if prev is item:
+            continue
+
+        changed = None
+        for field, value in item.items():
+            expected = prev.get(field, _MISSING)
+            if field == 'y' and y_shift and expected is not _MISSING:
+                expected += y_shift
+            if expected != value:
+                if changed is None:
+                    changed = {'id': item['id']}
+                changed[field] = value
+        if changed is not None:
+            changes.append(changed)
+
+    if not changes and not removed:
+        return None
+    return [removed, changes]
+
+
+# Gera o delta de 'current' em relacao a 'base'
+def diff_snapshot(base, current):
+    shift = _scroll_shift(base, current)
+    fields = {}
+    entities = {}
+
+    for key, value in current.items():
+        if key in ENTITY_KEYS:
+            old = base.get(key)
+            if not isinstance(old, list):
+                old = []
+            diff = _diff_entities(old, value, shift if key in SCROLLING_KEYS else 0)
+            if diff is not None:
+                entities[key] = diff
+        elif base.get(key, _MISSING) != value:
+            fields[key] = value
+
+    delta = {}
+    if fields:
+        delta['fields'] = fields
+    if entities:
+        delta['entities'] = entities
+    removed = [key for key in base if key not in current]
+    if removed:
+        delta['removed'] = removed
+    return delta
+
+
+# Reconstroi o snapshot completo aplicando o delta sobre a base (a base nao eh modificada)
+def apply_delta(base, delta):
+    snapshot = dict(base)
+    for key in delta.get('removed', ()):
+        snapshot.pop(key, None)
+    snapshot.update(delta.get('fields', {}))
+
+    shift = _scroll_shift(base, snapshot)
+    entities = delta.get('entities', {})
+
+    for key in ENTITY_KEYS:
+        items = base.get(key)
+        if items is None and key not in entities:
+            continue
+        items = list(items or ())
+
+        # Entidades que so acompanharam o scroll tambem precisam ter o Y atualizado
+        if shift and key in SCROLLING_KEYS:
+            items = [dict(item, y=item['y'] + shift) for item in items]
+
+        if key in entities:
+            removed, changes = entities[key]
+            if removed is None:
+                # Lista enviada inteira
+                snapshot[key] = list(changes)
+                continue
+            if removed:
+                removed = set(removed)
+                items = [item for item in items if item['id'] not in removed]
+
+            index_by_id = {item['id']: i for i, item in enumerate(items)}
+            for changed in changes:
+                index = index_by_id.get(changed['id'])
+                if index is None:
+                    items.append(dict(changed))
+                else:
+                    merged = dict(items[index])
+                    merged.update(changed)
+                    items[index] = merged
+
+        snapshot[key] = items
+
+    return snapshot
@@ -1,31 +1,83 @@
 # Importações necessárias para o módulo
 import pyxel          # Biblioteca para criação do jogo
 import random         # Para geração de números aleatórios
-from collections import deque  # Para estrutura de dados eficiente
+import math           # Arredonda a posicao dos barcos presos na margem
+import itertools      # Gerador de IDs de rede
+from collections import deque, Counter  # Para estrutura de dados eficiente
 from config import *  # Importa constantes do jogo
+from entity_store import EntityStore, StoredEntity  # Colunas das arvores, barcos e bombas
 
-class Tree:
-    """Classe que representa uma árvore no jogo"""
-    def __init__(self, x, y):
-        # Posição inicial da árvore
-        self.x = x  # Coordenada X no mapa
-        self.y = y  # Coordenada Y no mapa
-        
-        # Dimensões do sprite da árvore
-        self.width = 16   # Largura do sprite
-        self.height = 16  # Altura do sprite
+# IDs de rede: cada entidade recebe um ID estável, que identifica a mesma entidade entre pacotes
+_net_ids = itertools.count(1)
+
+# Contador de entidades criadas por tipo (para medir a alocação por frame)
+entity_allocations = Counter()
+
+def _new_net_id(net_id):
+    """Usa o ID recebido pela rede ou gera um novo ID local."""
+    return next(_net_ids) if net_id is None else net_id
+
+def new_seed():
+    """Seed de uma nova partida (cabe nos 32 bits do campo 'seed' dos pacotes)."""
+    return random.getrandbits(32)
+
+def rng_stream(seed, name):
+    """Gerador aleatório próprio de um subsistema ('arvores', 'sprites', 'barcos', 'bombas'...),
+    derivado da seed da partida: a mesma seed sempre gera o mesmo mundo, e o que um subsistema
+    sorteia não muda a sequência dos outros."""
+    return random.Random(f"{seed}:{name}")
+
+def allocation_count():
+    """Total de entidades criadas desde o início (ou desde o último reset)."""
+    return sum(entity_allocations.values())
+
+def reset_allocation_count():
+    entity_allocations.clear()
+
+
+class Tree(StoredEntity):
+    """Classe que representa uma árvore no jogo (linha do EntityStore do TreeManager)"""
+    __slots__ = ()
 
-        self.visible = True   # ← flag de visibilidade
-        self.sprite_type = random.choice([0, 1])  # 0 = primeira árvore (0,0), 1 = segunda (16,0)
+    # Dimensões do sprite da árvore
+    width = 16   # Largura do sprite
+    height = 16  # Altura do sprite
+
+    def __init__(self, x, y, sprite_type=0, net_id=None, store=None):
+        entity_allocations['Tree'] += 1
+        # Posição no mapa, visível e sprite (0 = primeira árvore (0,0), 1 = segunda (16,0))
+        super().__init__(_new_net_id(net_id), x, y, kind=sprite_type, store=store)
+
+    @property
+    def sprite_type(self):
+        return self._store.kind[self._index]
+
+    @sprite_type.setter
+    def sprite_type(self, value):
+        self._store.kind[self._index] = value
 
     def to_dict(self):
         return {
+            'id': self.net_id,
             'x': self.x, 
             'y': self.y, 
             'visible': self.visible,
             'sprite_type': self.sprite_type  # ← Novo
         }
 
+    @classmethod
+    def from_dict(cls, data, store=None):
+        tree = cls(data['x'], data['y'], data['sprite_type'], data.get('id'), store)
+        tree.visible = data['visible']
+        return tree
+
+    def apply_dict(self, data):
+        """Atualiza a árvore no lugar com o estado recebido pela rede."""
+        self.x = data['x']
+        self.y = data['y']
+        self.visible = data['visible']
+        self.sprite_type = data['sprite_type']
+
     @property
     def hitbox(self):
         """Retorna a área de colisão da árvore (menor que o sprite visual)"""
@@ -36,9 +88,194 @@ class Tree:
             self.y + self.height - 2   # Bottom: 2px antes da borda inferior
         )
 
+class EntityRegistry:
+    """
+    Registro de entidades recebidas pela rede, indexadas pelo ID estável.
+    Cada snapshot é aplicado no lugar: entidades existentes são atualizadas,
+    as novas são criadas e as que sumiram do snapshot são destruídas.
+    Com 'store', as entidades são criadas e removidas nesse EntityStore;
+    com 'pool', saem e voltam para esse EntityPool.
+    """
+    def __init__(self, entity_cls, store=None, pool=None):
+        self.entity_cls = entity_cls  # Classe da entidade (precisa de from_dict e apply_dict)
+        self.store = store
+        self.pool = pool
+        self.by_id = {}               # ID de rede -> entidade
+        self.items = []               # Entidades na ordem do último snapshot
+        # Eventos acumulados desde a criação do registro
+        self.created = 0
+        self.updated = 0
+        self.destroyed = 0
+
+    def apply(self, states):
+        """Aplica a lista de estados recebida e retorna a lista de entidades atualizada."""
+        by_id = self.by_id
+        changed = len(states) != len(self.items)
+        seen = set()
+
+        for state in states:
+            net_id = state['id']
+            seen.add(net_id)
+            entity = by_id.get(net_id)
+            if entity is None:
+                # create
+                if self.store is not None:
+                    by_id[net_id] = self.entity_cls.from_dict(state, self.store)
+                elif self.pool is not None:
+                    by_id[net_id] = self.entity_cls.from_dict(state, self.pool)
+                else:
+                    by_id[net_id] = self.entity_cls.from_dict(state)
+                self.created += 1
+                changed = True
+            else:
+                # update
+                entity.apply_dict(state)
+                self.updated += 1
+
+        # destroy
+        if len(seen) != len(by_id):
+            for net_id in [net_id for net_id in by_id if net_id not in seen]:
+                entity = by_id.pop(net_id)
+                if self.store is not None:
+                    self.store.remove(entity)
+                elif self.pool is not None:
+                    self.pool.release(entity)
+                self.destroyed += 1
+            changed = True
+
+        # A lista só é refeita quando entidades entram ou saem (ou a ordem muda)
+        if not changed:
+            for entity, state in zip(self.items, states):
+                if entity.net_id != state['id']:
+                    changed = True
+                    break
+        if changed:
+            self.items = [by_id[state['id']] for state in states]
+        return self.items
+
+    def clear(self):
+        if self.pool is not None:
+            for entity in self.by_id.values():
+                self.pool.release(entity)
+        self.by_id.clear()
+        self.items = []
+        if self.store is not None:
+            self.store.clear()
+
+
+class EntityPool:
+    """
+    Pool de entidades reaproveitáveis (tiros e explosões).
+    acquire() devolve uma entidade livre reiniciada com reset() ou cria uma nova;
+    release() devolve a entidade ao pool, que guarda no máximo 'size' entidades livres.
+    Devolver de novo uma entidade que já está livre é ignorado (e contado em double_releases):
+    senão ela sairia duas vezes do pool, compartilhada por dois tiros ou explosões.
+    """
+    def __init__(self, entity_cls, size):
+        self.entity_cls = entity_cls  # Classe da entidade (precisa de reset com os argumentos do construtor)
+        self.size = size
+        self.free = []
+        self._free_ids = set()        # id() das entidades em free (detecta devolução repetida)
+        # Estatisticas (para dimensionar o pool)
+        self.hits = 0       # acquire atendido por uma entidade livre
+        self.misses = 0     # acquire que precisou criar uma entidade
+        self.in_use = 0     # Entidades entregues e ainda não devolvidas
+        self.peak = 0       # Maior in_use já visto
+        self.double_releases = 0  # release() de uma entidade que já estava livre (ignorados)
+
+    def acquire(self, *args, **kwargs):
+        if self.free:
+            entity = self.free.pop()
+            self._free_ids.discard(id(entity))
+            entity.reset(*args, **kwargs)
+            self.hits += 1
+        else:
+            entity = self.entity_cls(*args, **kwargs)
+            self.misses += 1
+        self.in_use += 1
+        if self.in_use > self.peak:
+            self.peak = self.in_use
+        return entity
+
+    def release(self, entity):
+        if id(entity) in self._free_ids:
+            self.double_releases += 1
+            return
+        self.in_use -= 1
+        if len(self.free) < self.size:
+            self.free.append(entity)
+            self._free_ids.add(id(entity))
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+            'in_use': self.in_use,
+            'peak': self.peak,
+            'free': len(self.free),
+            'double_releases': self.double_releases,
+        }
+
+
+class Player:
+    """Estado de um jogador (avião/helicóptero) na partida. O ID de rede é o slot do jogador."""
+    def __init__(self, slot, x, y):
+        self.slot = slot                # Posição do jogador na partida (0 = host)
+        self.x = x
+        self.y = y
+        self.lives = MAX_LIVES          # Vidas restantes
+        self.fuel = MAX_FUEL            # Gasolina
+        self.invincible = 0             # Frames restantes de invencibilidade
+        self.score = 0                  # Pontuação
+        self.active = False             # Jogador presente na partida (conectado)
+        self.exploded = False           # A explosão de morte já foi criada
+        self.input_seq = 0              # Último comando de movimento do cliente processado pelo host
+        self.over_river = False         # Já esteve inteiro sobre a água (só então a margem tira vida)
+
+    @property
+    def alive(self):
+        return self.active and self.lives > 0
+
+    @property
+    def hitbox(self):
+        """Área do sprite inteiro (usada contra barcos e bombas)."""
+        return (self.x, self.y, self.x + PLAYER_WIDTH, self.y + PLAYER_HEIGHT)
+
+    def to_dict(self):
+        return {
+            'id': self.slot,
+            'x': self.x,
+            'y': self.y,
+            'lives': self.lives,
+            'fuel': self.fuel,
+            'invincible': self.invincible,
+            'score': self.score,
+            'input_seq': self.input_seq,
+        }
+
+    def apply_dict(self, data, local=False):
+        """Atualiza o jogador com o estado recebido. 'local' mantém a posição (prevista localmente e
+        corrigida pela reconciliação) e a invencibilidade, que são controladas por quem pilota o jogador."""
+        if not local:
+            self.x = data['x']
+            self.y = data['y']
+            self.invincible = data['invincible']
+        self.lives = data['lives']
+        self.fuel = data['fuel']
+        self.score = data['score']
+        self.input_seq = data.get('input_seq', 0)
+        self.active = True
+
+
 class TreeManager:
     """Gerenciador responsável por criar e controlar todas as árvores do jogo"""
-    def __init__(self, background):
+    def __init__(self, background, seed=None):
         # Referência ao background para verificar margens do rio
         self.background = background  
         # Distância mínima entre árvores e o rio
@@ -49,103 +286,107 @@ class TreeManager:
         self.max_arvores = 20  
         # Largura do sprite da árvore
         self.tree_w = 16  
-        # Lista de árvores ativas
-        self.arvores = [self.criar_arvore_fora_tela() for _ in range(self.max_arvores)]  
         # Distância mínima entre árvores
         self.distancia_minima = 12  
-        # Seed aleatória para geração consistente
-        self.random_seed = random.randint(0, 1000000)  
-        random.seed(self.random_seed)  # Define a seed para o random
+        # Seed da partida e geradores próprios (posições e sprites), derivados dela
+        self._seed_streams(new_seed() if seed is None else seed)
+        # Colunas das árvores e lista de árvores ativas (a lista do store, alterada no lugar)
+        self.store = EntityStore()
+        self.arvores = self.store.handles
+        for _ in range(self.max_arvores):
+            self.criar_arvore_fora_tela()
+        # Registro das árvores recebidas pela rede (cliente atualiza no lugar, sem recriar)
+        self.registry = EntityRegistry(Tree, EntityStore())
     
     def get_tree_states(self):
         return [tree.to_dict() for tree in self.arvores]
 
     def set_tree_states(self, tree_states):
-        self.arvores = []
-        for state in tree_states:
-            tree = Tree(state['x'], state['y'])
-            tree.visible = state['visible']
-            tree.sprite_type = state['sprite_type']  # ← Novo
-            self.arvores.append(tree)
+        self.arvores = self.registry.apply(tree_states)
+
+    def _seed_streams(self, seed):
+        self.random_seed = seed
+        self.rng = rng_stream(seed, 'arvores')          # Posições
+        self.sprite_rng = rng_stream(seed, 'sprites')   # Escolha do sprite
+
+    def reseed(self, seed):
+        """Troca a seed da partida e recria as árvores a partir dela"""
+        self.random_seed = seed
+        self.reset_arvores()
 
-            
     def reset_arvores(self):
         """Reinicia todas as árvores usando a mesma seed aleatória"""
-        random.seed(self.random_seed)
-        self.arvores = [self.criar_arvore_fora_tela() for _ in range(self.max_arvores)]
+        self._seed_streams(self.random_seed)
+        self.store.clear()
+        self.arvores = self.store.handles
+        for _ in range(self.max_arvores):
+            self.criar_arvore_fora_tela()
         
-    def _arvore_valida(self, nova_arvore):
-        """Verifica se a nova árvore não está muito próxima das existentes"""
+    def _posicao_valida(self, x, y):
+        """Verifica se uma árvore em (x, y) não fica muito próxima das existentes"""
         for arv in self.arvores:
             # Checa distância mínima entre árvores
-            if self._calcular_distancia(arv, nova_arvore) < self.distancia_minima:
+            if self._calcular_distancia(arv.x, arv.y, x, y) < self.distancia_minima:
                 return False
         return True
     
-    def _calcular_distancia(self, arv1, arv2):
+    def _calcular_distancia(self, x1, y1, x2, y2):
         """Calcula distância euclidiana entre os centros das hitboxes"""
-        # Centro X da primeira árvore
-        x1 = (arv1.hitbox[0] + arv1.hitbox[2]) / 2  
-        # Centro Y da primeira árvore
-        y1 = (arv1.hitbox[1] + arv1.hitbox[3]) / 2  
-        # Centro X da segunda árvore
-        x2 = (arv2.hitbox[0] + arv2.hitbox[2]) / 2  
-        # Centro Y da segunda árvore
-        y2 = (arv2.hitbox[1] + arv2.hitbox[3]) / 2  
-        # Fórmula de distância entre dois pontos
+        # Todas as árvores têm a mesma hitbox, então a distância entre os centros
+        # é a mesma distância entre as posições
         return ((x2 - x1)**2 + (y2 - y1)**2)**0.5  
     
     def criar_arvore_fora_tela(self):
-        """Cria nova árvore posicionada acima da tela visível"""
+        """Cria nova árvore (no store) posicionada acima da tela visível"""
         # Posição Y aleatória acima da tela
-        y = random.randint(-pyxel.height, 0)  
+        y = self.rng.randint(-SCREEN_HEIGHT, 0)  
         # Obtém margens do rio no topo da tela
         esq0, dir0 = self.background.obter_margens_rio(0)  
         # Cria árvore fora do rio
-        return self._novo_tree_fora(esq0, dir0, y)  
+        x = self._x_fora(esq0, dir0, y)
+        return Tree(x, y, self.sprite_rng.choice((0, 1)), store=self.store)
 
-    def _novo_tree_fora(self, esq, dir, y):
-        """Cria nova árvore garantidamente fora das margens do rio"""
+    def _x_fora(self, esq, dir, y):
+        """Escolhe uma posição X garantidamente fora das margens do rio"""
         # Limites para árvores à esquerda do rio
         left_min = self.margem_lateral  
         left_max = int(esq - self.distancia_rio - self.tree_w)  
         # Limites para árvores à direita do rio
         right_min = int(dir + self.distancia_rio)  
-        right_max = pyxel.width - self.margem_lateral - self.tree_w  
+        right_max = SCREEN_WIDTH - self.margem_lateral - self.tree_w  
 
         # Loop até encontrar posição válida
         while True:
             # Escolhe aleatoriamente entre esquerda/direita (50% de chance)
-            if left_min <= left_max and random.random() < 0.5:
-                x = random.randint(left_min, left_max)  # Posição à esquerda
+            if left_min <= left_max and self.rng.random() < 0.5:
+                x = self.rng.randint(left_min, left_max)  # Posição à esquerda
             elif right_min <= right_max:
-                x = random.randint(right_min, right_max)  # Posição à direita
+                x = self.rng.randint(right_min, right_max)  # Posição à direita
             else:
                 x = self.margem_lateral  # Fallback
 
             # Verifica se está fora do rio
             if not (esq < x < dir):
-                return Tree(x, y)  
+                return x
             
             # Verifica colisão com outras árvores
-            nova_arvore = Tree(x, y)
-            if self._arvore_valida(nova_arvore):
-                return nova_arvore
+            if self._posicao_valida(x, y):
+                return x
 
     def reposicionar_arvore(self, arvore):
         """Tenta reposicionar até 5 vezes; se falhar, faz fallback na beira do rio."""
         esq0, dir0 = self.background.obter_margens_rio(0)
         # 1) tenta 5 vezes numa posição aleatória
         for _ in range(5):
-            y = random.randint(-pyxel.height, 0)
-            nova = self._novo_tree_fora(esq0, dir0, y)
-            if self._arvore_valida(nova):
-                arvore.x, arvore.y = nova.x, nova.y
+            y = self.rng.randint(-SCREEN_HEIGHT, 0)
+            x = self._x_fora(esq0, dir0, y)
+            if self._posicao_valida(x, y):
+                arvore.x, arvore.y = x, y
                 arvore.visible = True  # ← Resetar visibilidade aqui
                 return
 
         # 2) fallback: coloca à esquerda ou à direita, mas sempre fora do rio
-        y = random.randint(-pyxel.height, 0)
+        y = self.rng.randint(-SCREEN_HEIGHT, 0)
         margem = self.distancia_rio + self.tree_w
         if esq0 - margem >= self.margem_lateral:
             arvore.x = int(esq0 - margem)
@@ -156,16 +397,16 @@ class TreeManager:
 
 
     def update_arvores(self, velocidade_scroll):
+        # desce todas as árvores de uma vez
+        self.store.shift(velocidade_scroll)
         for arvore in self.arvores:
-            arvore.y += velocidade_scroll
-
             # se saiu de baixo, reposiciona
-            if arvore.y > pyxel.height:
+            if arvore.y > SCREEN_HEIGHT:
                 self.reposicionar_arvore(arvore)
                 continue
 
             # se entrou no rio, reposiciona só uma vez
-            screen_y = min(max(int(arvore.y), 0), pyxel.height - 1)
+            screen_y = min(max(int(arvore.y), 0), SCREEN_HEIGHT - 1)
             esq, dir = self.background.obter_margens_rio(screen_y)
             if esq < arvore.x < dir:
                 self.reposicionar_arvore(arvore)
@@ -211,24 +452,35 @@ def check_tree_collision(player_x, player_y, arvores, player_name):
             jogador_bottom > arv_top and
             jogador_top < arv_bottom):
             colisoes += 1  # Incrementa contador
-            print(f"{player_name} colidiu com uma árvore! (-1 vida)")
+            if DEBUG_COLLISIONS:
+                print(f"{player_name} colidiu com uma árvore! (-1 vida)")
     
     return colisoes  # Retorna total de colisões
 
 
 class Shot:
-    """Classe que representa um tiro disparado por um jogador."""
-    def __init__(self, x, y, vy=-2):
+    """Classe que representa um tiro disparado por um jogador (reaproveitado pelo EntityPool)."""
+    __slots__ = ('net_id', 'owner', 'x', 'y', 'vy')
+
+    # dimensões do tiro (ajuste a gosto)
+    width = 2
+    height = 4
+    # cor do tiro (branco)
+    color = 7
+
+    def __init__(self, x, y, vy=-2, net_id=None, owner=0):
+        entity_allocations['Shot'] += 1
+        self.reset(x, y, vy, net_id, owner)
+
+    def reset(self, x, y, vy=-2, net_id=None, owner=0):
+        """(Re)inicia o tiro: usado pelo construtor e pelo EntityPool."""
+        self.net_id = _new_net_id(net_id)  # ID estável na rede
+        self.owner = owner  # Slot do jogador que disparou (recebe os pontos)
         # posição inicial
         self.x = x
         self.y = y
         # velocidade vertical (vai para cima, por isso negativo)
         self.vy = vy
-        # dimensões do tiro (ajuste a gosto)
-        self.width = 2
-        self.height = 4
-        # cor do tiro (branco)
-        self.color = 7
 
     def update(self):
         """Move o tiro."""
@@ -244,17 +496,33 @@ class Shot:
 
     def to_dict(self):
         """Serializa estado para enviar pela rede."""
-        return {'x': self.x, 'y': self.y, 'vy': self.vy}
+        return {'id': self.net_id, 'x': self.x, 'y': self.y, 'vy': self.vy, 'owner': self.owner}
 
     @classmethod
-    def from_dict(cls, data):
-        """Reconstrói um Shot a partir de dicionário."""
-        return cls(data['x'], data['y'], data.get('vy', -2))
+    def from_dict(cls, data, pool=None):
+        """Reconstrói um Shot a partir de dicionário (tirando do pool, se houver)."""
+        create = cls if pool is None else pool.acquire
+        return create(data['x'], data['y'], data.get('vy', -2), data.get('id'), data.get('owner', 0))
+
+    def apply_dict(self, data):
+        """Atualiza o tiro no lugar com o estado recebido pela rede."""
+        self.x = data['x']
+        self.y = data['y']
+        self.vy = data.get('vy', -2)
+        self.owner = data.get('owner', 0)
     
 
 class Explosion:
-    """Uma explosão que vive por alguns frames e depois some."""
-    def __init__(self, x, y, tile_u, tile_v, width, height, duration=5):
+    """Uma explosão que vive por alguns frames e depois some (reaproveitada pelo EntityPool)."""
+    __slots__ = ('net_id', 'x', 'y', 'tile_u', 'tile_v', 'width', 'height', 'timer', 'unsent')
+
+    def __init__(self, x, y, tile_u, tile_v, width, height, duration=5, net_id=None):
+        entity_allocations['Explosion'] += 1
+        self.reset(x, y, tile_u, tile_v, width, height, duration, net_id)
+
+    def reset(self, x, y, tile_u, tile_v, width, height, duration=5, net_id=None):
+        """(Re)inicia a explosão: usado pelo construtor e pelo EntityPool."""
+        self.net_id = _new_net_id(net_id)  # ID estável na rede
         # posição da explosão (top‑left)
         self.x = x
         self.y = y
@@ -265,6 +533,8 @@ class Explosion:
         self.height = height
         # quantos updates ela ainda vai viver
         self.timer = duration
+        # ainda não foi em nenhum snapshot (multiplayer): não volta ao pool antes de ser enviada
+        self.unsent = False
 
     def update(self):
         # decrementa o timer; quando chega a zero, indica que deve ser removida
@@ -281,6 +551,7 @@ class Explosion:
 
     def to_dict(self):
            return {
+               'id': self.net_id,
                'x': self.x,
                'y': self.y,
                'tile_u': self.tile_u,
@@ -291,25 +562,39 @@ class Explosion:
            }    
     
     @classmethod
-    def from_dict(cls, data):
-        exp = cls(
+    def from_dict(cls, data, pool=None):
+        create = cls if pool is None else pool.acquire
+        exp = create(
             data['x'], data['y'],
             data['tile_u'], data['tile_v'],
             data['width'], data['height'],
-            duration=data['timer']
+            duration=data['timer'],
+            net_id=data.get('id')
         )
         return exp
+
+    def apply_dict(self, data):
+        """Atualiza a explosão no lugar com o estado recebido pela rede."""
+        self.x = data['x']
+        self.y = data['y']
+        self.tile_u = data['tile_u']
+        self.tile_v = data['tile_v']
+        self.width = data['width']
+        self.height = data['height']
+        self.timer = data['timer']
     
 
-class Boat:
-    """Classe que representa um barco inimigo que navega pelo rio."""
-    def __init__(self, x, y, vy=1):
-        self.x = x
-        self.y = y
-        self.vy = vy              # velocidade para baixo (scroll relativo)
-        self.width = 16
-        self.height = 16
-        self.visible = True
+class Boat(StoredEntity):
+    """Classe que representa um barco inimigo que navega pelo rio (linha do EntityStore do BoatManager)."""
+    __slots__ = ()
+
+    width = 16
+    height = 16
+
+    def __init__(self, x, y, vy=1, net_id=None, store=None):
+        entity_allocations[type(self).__name__] += 1
+        # vy: velocidade para baixo (scroll relativo)
+        super().__init__(_new_net_id(net_id), x, y, vy, store=store)
 
     @property
     def hitbox(self):
@@ -329,24 +614,33 @@ class Boat:
             pyxel.blt(self.x, self.y, 0, 32, 16, self.width, self.height, colkey=0)
 
     def to_dict(self):
-        return {'x': self.x, 'y': self.y, 'vy': self.vy, 'visible': self.visible}
+        return {'id': self.net_id, 'x': self.x, 'y': self.y, 'vy': self.vy, 'visible': self.visible}
 
     @classmethod
-    def from_dict(cls, data):
-        b = cls(data['x'], data['y'], data.get('vy', 1))
+    def from_dict(cls, data, store=None):
+        b = cls(data['x'], data['y'], data.get('vy', 1), data.get('id'), store)
         b.visible = data.get('visible', True)
         return b
 
+    def apply_dict(self, data):
+        self.x = data['x']
+        self.y = data['y']
+        self.vy = data.get('vy', 1)
+        self.visible = data.get('visible', True)
+
 
 class BoatManager:
     """Gerencia criação, atualização e reposicionamento de barcos dentro do rio,
        evitando que nasçam muito próximos uns dos outros."""
-    def __init__(self, background, max_boats=10, spawn_chance=0.02, min_spawn_distance=24):
+    def __init__(self, background, max_boats=10, spawn_chance=0.02, min_spawn_distance=24, rng=None):
         self.background = background
+        self.rng = rng or random.Random()   # Gerador próprio dos barcos (ver rng_stream)
         self.max_boats = max_boats
         self.spawn_chance = spawn_chance    # chance por pixel de scroll
         self.min_spawn_distance = min_spawn_distance
-        self.boats = []
+        self.store = EntityStore()
+        self.boats = self.store.handles       # Barcos gerados aqui (a lista do store, alterada no lugar)
+        self.registry = EntityRegistry(Boat, EntityStore())  # Barcos recebidos pela rede (ver set_states)
         self._last_deslocamento = background.deslocamento
 
     def _can_spawn_at(self, x, y):
@@ -368,26 +662,34 @@ class BoatManager:
         # print(f"Spawn chance: {self.spawn_chance:.2f}")
 
         # 1) move todos
-        for b in self.boats:
-            b.update()
+        self.store.advance()
 
         if (self.background.is_host or not self.background.is_multiplayer):
         # 2) descarta os que saíram
-            self.boats = [b for b in self.boats if b.y <= pyxel.height]
+            self.store.compact(SCREEN_HEIGHT)
+
+            # mantém os barcos na água: eles só descem e o rio faz curvas (hitbox 1px para dentro)
+            table = self.background.obter_tabela_margens(Boat.height - 2)
+            for b in self.boats:
+                esq, dir = table.water(b.y + 1)
+                # em pixels inteiros, para dentro (o snapshot leva x como inteiro)
+                menor, maior = math.ceil(esq) - 1, math.floor(dir) - b.width + 1
+                if menor <= maior:
+                    b.x = min(max(b.x, menor), maior)
 
             # 3) spawn “por linha”, testando distância mínima
             delta = int(self.background.deslocamento) - int(self._last_deslocamento)
             for _ in range(delta):
-                if len(self.boats) < self.max_boats and random.random() < self.spawn_chance:
+                if len(self.boats) < self.max_boats and self.rng.random() < self.spawn_chance:
                     esq, dir = self.background.obter_margens_rio(0)
                     largura_disponivel = int(dir - esq - 16)
                     if largura_disponivel > 0:
                         # tente até N vezes encontrar um x válido
                         for _ in range(5):
-                            x = random.randint(int(esq), int(dir - 16))
+                            x = self.rng.randint(int(esq), int(dir - 16))
                             y = -16
                             if self._can_spawn_at(x, y):
-                                self.boats.append(Boat(x, y=y))
+                                Boat(x, y=y, store=self.store)
                                 break
                             
         self._last_deslocamento = self.background.deslocamento
@@ -400,17 +702,18 @@ class BoatManager:
         return [b.to_dict() for b in self.boats]
 
     def set_states(self, states):
-        self.boats = [Boat.from_dict(d) for d in states]
+        self.boats = self.registry.apply(states)
 
-class GasolineBomb:
-    """Bomba de gasolina que cai do topo e reabastece o jogador."""
-    def __init__(self, x, y, vy=1):
-        self.x = x
-        self.y = y
-        self.vy = vy
-        self.width = 16
-        self.height = 16
-        self.visible = True
+class GasolineBomb(StoredEntity):
+    """Bomba de gasolina que cai do topo e reabastece o jogador (linha do EntityStore do GasolineBombManager)."""
+    __slots__ = ()
+
+    width = 16
+    height = 16
+
+    def __init__(self, x, y, vy=1, net_id=None, store=None):
+        entity_allocations[type(self).__name__] += 1
+        super().__init__(_new_net_id(net_id), x, y, vy, store=store)
 
     @property
     def hitbox(self):
@@ -430,79 +733,88 @@ class GasolineBomb:
             pyxel.blt(self.x, self.y, 0, 48, 16, self.width, self.height, colkey=0)
 
     def to_dict(self):
-        return {'x': self.x, 'y': self.y, 'vy': self.vy, 'visible': self.visible}
+        return {'id': self.net_id, 'x': self.x, 'y': self.y, 'vy': self.vy, 'visible': self.visible}
 
     @classmethod
-    def from_dict(cls, data):
-        b = cls(data['x'], data['y'], data.get('vy', 1))
+    def from_dict(cls, data, store=None):
+        b = cls(data['x'], data['y'], data.get('vy', 1), data.get('id'), store)
         b.visible = data.get('visible', True)
         return b
 
+    def apply_dict(self, data):
+        self.x = data['x']
+        self.y = data['y']
+        self.vy = data.get('vy', 1)
+        self.visible = data.get('visible', True)
+
 
 class GasolineBombManager:
     """
     Gera uma bomba de gasolina a cada intervalo fixo, até max_bombs simultâneas,
     evitando spawn sobre árvores ou barcos.
     """
-    def __init__(self, background, boat_manager, max_bombs=5, spawn_interval_s=1):
+    def __init__(self, background, boat_manager, max_bombs=5, spawn_interval_s=1, rng=None):
         """
         background: Background (para acessar árvores e largura da tela).
         boat_manager: BoatManager (para checar colisão com barcos).
         max_bombs: número máximo de bombas simultâneas.
         spawn_interval_s: intervalo fixo em segundos entre spawns.
+        rng: gerador próprio das bombas (ver rng_stream).
         """
         self.background = background
         self.boat_manager = boat_manager
         self.max_bombs = max_bombs
-        self.spawn_interval_frames = int(spawn_interval_s * 60)  # 60 FPS
-        self.bombs = []
-        self._last_spawn_frame = pyxel.frame_count
-
-    def _can_spawn(self, x, y):
-        """Retorna False se (x,y) colidir com outra bomba, árvore ou barco."""
+        self.spawn_interval_frames = int(spawn_interval_s * FPS)
+        self.rng = rng or random.Random()
+        self.store = EntityStore()
+        self.bombs = self.store.handles       # Bombas geradas aqui (a lista do store, alterada no lugar)
+        self.registry = EntityRegistry(GasolineBomb, EntityStore())  # Bombas recebidas pela rede (ver set_states)
+        self.frame = 0                # Contador de updates (relogio proprio, nao depende do pyxel.frame_count)
+        self._last_spawn_frame = self.frame
+
+    def _can_spawn(self, x, y, obstacle_grids=None):
+        """Retorna False se (x,y) colidir com outra bomba, árvore ou barco.
+        'obstacle_grids' são as grades de colisão (spatial.SpatialHash) de árvores e barcos do tick;
+        sem elas, testa contra todas as árvores e barcos."""
         # colisão com outras bombas
         for b in self.bombs:
             if abs(b.x - x) < b.width and abs(b.y - y) < b.height:
                 return False
 
-        # colisão com árvores
-        for tree in self.background.tree_manager.arvores:
-            if not tree.visible:
-                continue
-            left, top, right, bottom = tree.hitbox
-            if (x + 16 > left and x < right and
-                y + 16 > top  and y < bottom):
-                return False
-
-        # colisão com barcos
-        for boat in self.boat_manager.boats:
-            if not boat.visible:
+        # colisão com árvores e barcos
+        if obstacle_grids is not None:
+            box = (x, y, x + 16, y + 16)
+            obstacles = [entity for grid in obstacle_grids for entity in grid.query(box)]
+        else:
+            obstacles = self.background.tree_manager.arvores + self.boat_manager.boats
+        for obstacle in obstacles:
+            if not obstacle.visible:
                 continue
-            left, top, right, bottom = boat.hitbox
+            left, top, right, bottom = obstacle.hitbox
             if (x + 16 > left and x < right and
                 y + 16 > top  and y < bottom):
                 return False
 
         return True
 
-    def update(self):
+    def update(self, obstacle_grids=None):
         # 1) Move todas as bombas
-        for b in self.bombs:
-            b.update()
+        self.store.advance()
 
         # 2) Remove as que saíram da tela ou foram destruídas
-        self.bombs = [b for b in self.bombs if b.y <= pyxel.height and b.visible]
+        self.store.compact(SCREEN_HEIGHT, drop_hidden=True)
 
         # 3) Spawn garantido a cada intervalo
-        current = pyxel.frame_count
+        self.frame += 1
+        current = self.frame
         if (current - self._last_spawn_frame) >= self.spawn_interval_frames:
             if len(self.bombs) < self.max_bombs:
                 # tenta até 5 posições aleatórias
                 for _ in range(5):
-                    x = random.randint(0, pyxel.width - 16)
+                    x = self.rng.randint(0, SCREEN_WIDTH - 16)
                     y = -16
-                    if self._can_spawn(x, y):
-                        self.bombs.append(GasolineBomb(x, y))
+                    if self._can_spawn(x, y, obstacle_grids):
+                        GasolineBomb(x, y, store=self.store)
                         break
             self._last_spawn_frame = current
 
@@ -514,4 +826,4 @@ class GasolineBombManager:
         return [b.to_dict() for b in self.bombs]
 
     def set_states(self, states):
-        self.bombs = [GasolineBomb.from_dict(d) for d in states]
\ No newline at end of file
+        self.bombs = self.registry.apply(states)
\ No newline at end of file
@@ -0,0 +1,159 @@
+### Armazenamento em colunas (struct of arrays) das entidades do cenario. Responsavel por:
+### - Guardar x, y, vy, visible, tipo e ID de rede de todas as entidades de um gerenciador em arrays contiguos
+### - Mover todas as entidades de uma vez (advance/shift) em vez de uma por uma
+### - Remover entidades em O(1) trocando a removida pela ultima (swap-remove)
+###
+### As entidades (Tree, Boat, GasolineBomb em entities.py) viram apenas um "ponteiro" (store, indice) para
+### uma linha das colunas: o resto do jogo continua usando arvore.x, barco.visible, barco.hitbox...
+### A lista 'handles' eh sempre a mesma (alterada no lugar), entao pode ser guardada pelos gerenciadores.
+### A remocao troca a ordem das entidades: quem vem depois da removida pode mudar de posicao na lista
+###
+### Com o NumPy instalado, as operacoes em lote usam visoes (np.frombuffer) das mesmas colunas, sem copia.
+### As visoes vivem so durante a operacao: um array com visao aberta nao pode crescer nem encolher
+
+from array import array
+from itertools import repeat
+from operator import add
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class EntityStore:
+    """Colunas das entidades de um tipo. A linha i pertence a handles[i]."""
+    def __init__(self):
+        self.net_id = array('Q')    # ID estavel na rede
+        self.x = array('d')
+        self.y = array('d')
+        self.vy = array('d')        # Velocidade vertical (advance)
+        self.visible = array('B')
+        self.kind = array('B')      # Tipo/sprite da entidade (ex.: Tree.sprite_type)
+        self.handles = []           # Entidade (objeto) de cada linha
+        self._columns = (self.net_id, self.x, self.y, self.vy, self.visible, self.kind)
+
+    def add(self, handle, net_id, x, y, vy=0, visible=True, kind=0):
+        """Acrescenta uma linha para a entidade e devolve o indice dela."""
+        self.net_id.append(net_id)
+        self.x.append(x)
+        self.y.append(y)
+        self.vy.append(vy)
+        self.visible.append(visible)
+        self.kind.append(kind)
+        self.handles.append(handle)
+        return len(self.handles) - 1
+
+    def remove(self, handle):
+        """Remove a entidade trocando-a pela ultima linha."""
+        self._swap_remove(handle._index)
+
+    def _swap_remove(self, index):
+        handles = self.handles
+        removed = handles[index]
+        last = len(handles) - 1
+        if index != last:
+            for column in self._columns:
+                column[index] = column[last]
+            moved = handles[last]
+            moved._index = index
+            handles[index] = moved
+        for column in self._columns:
+            column.pop()
+        handles.pop()
+        removed._index = -1
+
+    def compact(self, max_y, drop_hidden=False):
+        """Remove as entidades abaixo de max_y (e as invisiveis, com drop_hidden)."""
+        ys, visible = self.y, self.visible
+        # Caso comum (nada a remover) sem percorrer as linhas em Python
+        if not ys or (max(ys) <= max_y and not (drop_hidden and 0 in visible)):
+            return
+        if np is not None:
+            doomed = np.frombuffer(ys) > max_y
+            if drop_hidden:
+                doomed |= np.frombuffer(visible, np.uint8) == 0
+            doomed = np.flatnonzero(doomed).tolist()
+        else:
+            doomed = [i for i, y in enumerate(ys) if y > max_y or (drop_hidden and not visible[i])]
+        # De tras para frente: a linha que vem do fim para o lugar da removida ja foi conferida
+        for index in reversed(doomed):
+            self._swap_remove(index)
+
+    def advance(self):
+        """Soma vy em y de todas as entidades."""
+        if not self.y:
+            return
+        if np is not None:
+            ys = np.frombuffer(self.y)
+            ys += np.frombuffer(self.vy)
+        else:
+            self.y[:] = array('d', map(add, self.y, self.vy))
+
+    def shift(self, dy):
+        """Soma dy em y de todas as entidades (scroll do cenario)."""
+        if not self.y:
+            return
+        if np is not None:
+            ys = np.frombuffer(self.y)
+            ys += dy
+        else:
+            self.y[:] = array('d', map(add, self.y, repeat(dy, len(self.y))))
+
+    def clear(self):
+        for column in self._columns:
+            del column[:]
+        for handle in self.handles:
+            handle._index = -1
+        self.handles.clear()
+
+    def __len__(self):
+        return len(self.handles)
+
+
+class StoredEntity:
+    """Base das entidades guardadas em um EntityStore: os atributos leem e escrevem nas colunas.
+    Sem store, a entidade ganha um store proprio (entidades soltas, como nos benchmarks)."""
+    __slots__ = ('_store', '_index')
+
+    def __init__(self, net_id, x, y, vy=0, visible=True, kind=0, store=None):
+        if store is None:
+            store = EntityStore()
+        self._store = store
+        self._index = store.add(self, net_id, x, y, vy, visible, kind)
+
+    @property
+    def net_id(self):
+        return self._store.net_id[self._index]
+
+    @property
+    def x(self):
+        return self._store.x[self._index]
+
+    @x.setter
+    def x(self, value):
+        self._store.x[self._index] = value
+
+    @property
+    def y(self):
+        return self._store.y[self._index]
+
+    @y.setter
+    def y(self, value):
+        self._store.y[self._index] = value
+
+    @property
+    def vy(self):
+        return self._store.vy[self._index]
+
+    @vy.setter
+    def vy(self, value):
+        self._store.vy[self._index] = value
+
+    @property
+    def visible(self):
+        return bool(self._store.visible[self._index])
+
+    @visible.setter
+    def visible(self, value):
+        self._store.visible[self._index] = bool(value)
@@ -0,0 +1,130 @@
+### Buffer de interpolacao dos snapshots no cliente. Responsavel por:
+### - Guardar os snapshots recebidos do host com o horario de envio (campo 'timestamp' do pacote)
+### - Montar, a cada frame, um snapshot interpolado INTERP_DELAY segundos atras do mais novo
+### - Extrapolar por no maximo INTERP_MAX_EXTRAPOLATION segundos quando os pacotes atrasam
+###
+### Os relogios do host e do cliente nao sao sincronizados: o buffer estima a diferenca entre eles
+### pela menor latencia observada (horario de chegada - horario de envio)
+###
+### So as posicoes (x, y) das entidades e os parametros do rio sao interpolados. O resto (vidas, gasolina,
+### pontos...) vem do snapshot do par mais proximo do tempo de renderizacao. Os sons de cada snapshot
+### saem uma unica vez, quando o tempo de renderizacao passa por ele
+
+from collections import deque
+from config import *    # Importa constantes e configuracoes do arquivo "config.py"
+
+# Campos simples do snapshot que sao interpolados
+INTERP_FIELDS = ('rio_centro', 'rio_largura')
+# Listas de entidades cujas posicoes sao interpoladas (casadas pelo 'id')
+INTERP_ENTITY_KEYS = ('players', 'arvores', 'shots', 'explosions', 'boats', 'bombs')
+
+# Uma entidade que andou mais que isso entre dois snapshots foi reposicionada (ex.: arvore que voltou
+# para o topo): nao interpola, para ela nao atravessar a tela
+TELEPORT_DISTANCE = 32
+# Quanto a estimativa da diferenca entre os relogios acompanha uma latencia maior a cada snapshot
+CLOCK_OFFSET_DRIFT = 0.01
+
+
+def _lerp(a, b, t):
+    return a + (b - a) * t
+
+
+# Interpola as posicoes de duas listas de entidades.
+# Com t < 1 a lista eh a do snapshot antigo; com t >= 1 (extrapolando) eh a do novo
+def _blend_entities(old, new, t):
+    if t < 1:
+        base, others, forward = old, new, True
+    else:
+        base, others, forward = new, old, False
+    by_id = {item['id']: item for item in others}
+    result = []
+    for item in base:
+        other = by_id.get(item['id'])
+        if other is None:
+            result.append(item)
+            continue
+        a, b = (item, other) if forward else (other, item)
+        if abs(b['x'] - a['x']) > TELEPORT_DISTANCE or abs(b['y'] - a['y']) > TELEPORT_DISTANCE:
+            result.append(item)
+            continue
+        # Arredonda para pixels inteiros: o estado interpolado vai para a simulacao do cliente, e o codec
+        # binario so aceita coordenadas inteiras
+        result.append(dict(item, x=round(_lerp(a['x'], b['x'], t)), y=round(_lerp(a['y'], b['y'], t))))
+    return result
+
+
+class SnapshotBuffer:
+    """Snapshots do host ordenados pelo horario de envio, amostrados com atraso fixo."""
+    def __init__(self, delay=INTERP_DELAY, max_extrapolation=INTERP_MAX_EXTRAPOLATION, size=INTERP_BUFFER_SIZE):
+        self.delay = delay                          # Atraso da renderizacao em relacao ao snapshot mais novo (s)
+        self.max_extrapolation = max_extrapolation  # Quanto pode passar do snapshot mais novo (s)
+        self._entries = deque(maxlen=size)          # [horario de envio, snapshot, sons ja entregues]
+        self.clock_offset = None                    # Horario local - horario do host (inclui a menor latencia)
+
+        # Contadores
+        self.interpolated = 0   # Frames entre dois snapshots
+        self.extrapolated = 0   # Frames alem do snapshot mais novo (pacotes atrasados)
+        self.held = 0           # Frames parados no limite da extrapolacao
+        self.late = 0           # Snapshots descartados por chegarem fora de ordem
+
+    def push(self, timestamp, snapshot, recv_time):
+        """Guarda um snapshot enviado em 'timestamp' (relogio do host) e recebido em 'recv_time' (relogio local)."""
+        if self._entries and timestamp <= self._entries[-1][0]:
+            self.late += 1
+            return
+        offset = recv_time - timestamp
+        if self.clock_offset is None or offset < self.clock_offset:
+            self.clock_offset = offset
+        else:
+            self.clock_offset += (offset - self.clock_offset) * CLOCK_OFFSET_DRIFT
+        self._entries.append([timestamp, snapshot, False])
+
+    def sample(self, now):
+        """Snapshot interpolado para o horario local 'now' (None se ainda nao chegou nenhum)."""
+        entries = self._entries
+        if not entries:
+            return None
+        render = now - self.clock_offset - self.delay
+
+        # Sons dos snapshots pelos quais o tempo de renderizacao ja passou
+        sounds = []
+        for entry in entries:
+            if entry[0] > render:
+                break
+            if not entry[2]:
+                entry[2] = True
+                sounds.extend(entry[1].get('sounds', ()))
+
+        # Descarta os que ficaram para tras, mantendo o par que envolve o tempo de renderizacao
+        # (ou os dois mais novos, para extrapolar)
+        while len(entries) > 2 and entries[1][0] <= render:
+            entries.popleft()
+
+        old_time, old = entries[0][0], entries[0][1]
+        if len(entries) == 1 or render <= old_time:
+            # Um snapshot so, ou o tempo de renderizacao ainda nao chegou no mais antigo
+            return dict(old, sounds=sounds)
+
+        new_time, new = entries[1][0], entries[1][1]
+        t = (render - old_time) / (new_time - old_time)
+        if t <= 1:
+            self.interpolated += 1
+        else:
+            self.extrapolated += 1
+            max_t = 1 + self.max_extrapolation / (new_time - old_time)
+            if t > max_t:
+                t = max_t
+                self.held += 1
+
+        snapshot = dict(old if t < 1 else new, sounds=sounds)
+        for key in INTERP_FIELDS:
+            if key in old and key in new:
+                snapshot[key] = _lerp(old[key], new[key], t)
+        for key in INTERP_ENTITY_KEYS:
+            if key in old and key in new:
+                snapshot[key] = _blend_entities(old[key], new[key], t)
+        return snapshot
+
+    def clear(self):
+        self._entries.clear()
+        self.clock_offset = None
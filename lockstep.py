@@ -0,0 +1,225 @@
+### Modo lockstep do multiplayer. Responsavel por:
+### - Guardar as entradas de cada jogador por tick e liberar o tick quando as de todos chegaram
+### - Atrasar a entrada local em LOCKSTEP_INPUT_DELAY ticks, para ela ter tempo de chegar aos outros
+### - Montar as mensagens de entradas (com redundancia) e comparar os checksums do estado (dessincronizacao)
+###
+### Como o mundo sai todo da seed (entities.rng_stream), cada maquina roda a simulacao autoritativa inteira
+### e a rede leva apenas um byte por jogador por tick, em vez do snapshot. A topologia eh a mesma dos snapshots
+### (estrela): cada cliente envia as suas entradas ao host e o host repassa a todos as entradas de todos.
+### Cada mensagem reenvia as entradas que o outro lado ainda nao confirmou ('ack'), entao uma perda eh coberta
+### pela mensagem seguinte. Quem fica sem a entrada de alguem para o proximo tick espera (stall), entao as
+### entradas nao confirmadas ficam limitadas aos ticks em transito mais o atraso da entrada local
+###
+### A cada LOCKSTEP_HASH_INTERVAL ticks, cada maquina calcula Simulation.checksum() e manda junto das entradas.
+### O host compara o de cada cliente com o seu; o cliente compara o do host. Uma diferenca eh uma dessincronizacao:
+### fica registrada (desyncs, desync_tick) e aparece no terminal
+###
+### Mensagem (payload do 'game_data', binario compacto em codec.py, com os ticks em 16 bits):
+### {'type': 'lockstep', 'ack': tick, 'inputs': [[slot, primeiro tick, [byte, ...]], ...], 'hashes': [[tick, crc]]}
+
+from config import *    # Importa constantes e configuracoes do arquivo "config.py"
+from simulation import PlayerInput, TickInput
+
+# Byte de entrada de um jogador em um tick: movimento, tiro e tecla de controle do rio (so a do host vale)
+_LEFT = 0x01
+_RIGHT = 0x02
+_UP = 0x04
+_DOWN = 0x08
+_FIRE = 0x10
+_RIVER_SHIFT = 5                # Bits 5 a 7: indice da tecla do rio + 1 (0 = nenhuma)
+RIVER_COMMANDS = ("KEY_1", "KEY_2", "KEY_3", "KEY_4", "KEY_5")
+
+# Checksums locais guardados para comparar com os que chegam atrasados
+_HASH_HISTORY = 8
+
+# Entradas de um jogador por mensagem: limite do contador de um byte no codec binario
+# (as que passarem vao na mensagem seguinte, depois que o outro lado confirmar as primeiras)
+_MAX_RUN = 255
+
+
+def encode_input(tick_input):
+    """Byte com a entrada do jogador local e a primeira tecla do rio do tick."""
+    player = tick_input.player
+    bits = ((_LEFT if player.left else 0) | (_RIGHT if player.right else 0) | (_UP if player.up else 0) |
+            (_DOWN if player.down else 0) | (_FIRE if player.fire else 0))
+    for command in tick_input.river_keys:
+        if command in RIVER_COMMANDS:
+            bits |= (RIVER_COMMANDS.index(command) + 1) << _RIVER_SHIFT
+            break
+    return bits
+
+
+def decode_input(bits):
+    """(PlayerInput, teclas do rio) de um byte de entrada."""
+    player = PlayerInput(left=bool(bits & _LEFT), right=bool(bits & _RIGHT), up=bool(bits & _UP),
+                         down=bool(bits & _DOWN), fire=bool(bits & _FIRE))
+    river = bits >> _RIVER_SHIFT
+    return player, (RIVER_COMMANDS[river - 1],) if river else ()
+
+
+class Lockstep:
+    """Entradas por tick de todos os jogadores da partida ('slots') e checksums, vistos desta maquina."""
+    def __init__(self, local_slot, slots, is_host, delay=LOCKSTEP_INPUT_DELAY, hash_interval=LOCKSTEP_HASH_INTERVAL):
+        self.local_slot = local_slot
+        self.slots = tuple(sorted(slots))   # Jogadores da partida (mesma ordem em todas as maquinas)
+        self.is_host = is_host
+        self.delay = delay
+        self.hash_interval = hash_interval
+        self.tick = 0                       # Ultimo tick simulado
+
+        # slot -> {tick: byte}. Os primeiros 'delay' ticks nao tem entrada de ninguem
+        self._inputs = {slot: dict.fromkeys(range(1, delay + 1), 0) for slot in self.slots}
+        self._through = dict.fromkeys(self.slots, delay)  # slot -> ultimo tick com todas as entradas anteriores
+        self.peer_acks = {}                 # slot da sessao -> ultimo tick que o outro lado confirmou
+        self.heard = set()                  # Sessoes que ja mandaram alguma mensagem
+        self.departed = set()               # Host: jogadores que sairam (seguem com entrada neutra)
+
+        self._hashes = {}                   # tick -> checksum local (os mais recentes)
+        self._peer_hashes = {}              # tick -> {slot: checksum} que chegaram antes do nosso
+        self._checked = {}                  # slot -> ultimo tick comparado
+        self.last_hash = None               # (tick, checksum) local mais recente, vai em toda mensagem
+
+        # Contadores
+        self.stalls = 0         # Frames parados esperando a entrada de alguem
+        self.checks = 0         # Checksums comparados
+        self.desyncs = 0        # Checksums diferentes
+        self.desync_tick = None # Primeiro tick em que os estados divergiram
+
+    def _store(self, slot, tick, bits):
+        inputs = self._inputs[slot]
+        if tick <= self._through[slot] or tick in inputs:
+            return
+        inputs[tick] = bits
+        through = self._through[slot]
+        while through + 1 in inputs:
+            through += 1
+        self._through[slot] = through
+
+    def add_local(self, tick_input):
+        """Agenda a entrada local para daqui a 'delay' ticks (uma vez por tick simulado)."""
+        tick = self.tick + self.delay + 1
+        self._store(self.local_slot, tick, encode_input(tick_input))
+        # Host: quem saiu da partida segue com entrada neutra, repassada aos outros como qualquer entrada
+        for slot in self.departed:
+            for missing in range(self._through[slot] + 1, tick + 1):
+                self._store(slot, missing, 0)
+
+    def drop(self, slot):
+        """Host: o jogador do slot saiu da partida."""
+        if slot in self._inputs and slot != self.local_slot:
+            self.departed.add(slot)
+            self.peer_acks.pop(slot, None)
+
+    def ready(self):
+        return all(through > self.tick for through in self._through.values())
+
+    def step(self, sim, peer_connected=True):
+        """Simula o proximo tick se as entradas de todos ja chegaram. Retorna os eventos (None se esperou).
+
+        'peer_connected' eh o estado da conexao (NetworkManager.connected): sem ninguem conectado, a morte
+        do jogador local encerra a partida, como no modo de snapshots."""
+        if not self.ready():
+            self.stalls += 1
+            return None
+        tick = self.tick + 1
+        players = []
+        river_keys = ()
+        local = PlayerInput()
+        for slot in self.slots:
+            player, keys = decode_input(self._inputs[slot][tick])
+            players.append((slot, player))
+            if slot == 0:
+                river_keys = keys   # O rio eh controlado pelo host
+            if slot == self.local_slot:
+                local = player
+        events = sim.step(TickInput(local, river_keys, peer_connected, tuple(players)))
+        self.tick = tick
+        if tick % self.hash_interval == 0:
+            self._record_hash(tick, sim.checksum())
+        self._prune()
+        return events
+
+    def receive(self, sender, data):
+        """Aplica uma mensagem de lockstep vinda da sessao do slot 'sender' (o host, no cliente)."""
+        if sender in self.departed:
+            return
+        self.heard.add(sender)
+        self.peer_acks[sender] = max(self.peer_acks.get(sender, 0), self._unwrap(data['ack']))
+        for slot, first, bits in data['inputs']:
+            # O host so aceita as entradas do proprio cliente; o cliente aceita as que o host repassa
+            if slot not in self._inputs or slot == self.local_slot or (self.is_host and slot != sender):
+                continue
+            first = self._unwrap(first)
+            for i, value in enumerate(bits):
+                self._store(slot, first + i, value)
+        for tick, crc in data.get('hashes', ()):
+            self._peer_hash(sender, self._unwrap(tick), crc)
+
+    def _unwrap(self, tick):
+        """Tick completo mais proximo do atual com os mesmos 16 bits de baixo (o codec binario so leva esses).
+        As maquinas nunca se afastam tanto: quem fica sem entradas para (stall)."""
+        return self.tick + ((tick - self.tick + 0x8000) & 0xFFFF) - 0x8000
+
+    def message(self, peer):
+        """Mensagem para a sessao do slot 'peer': confirmacao, entradas nao confirmadas e o ultimo checksum."""
+        if self.is_host:
+            ack = self._through[peer]
+            slots = [slot for slot in self.slots if slot != peer]
+        else:
+            ack = min(self._through.values())
+            slots = [self.local_slot]
+        # Redundancia: tudo o que o outro lado ainda nao confirmou
+        first = self.peer_acks.get(peer, 0) + 1
+        runs = []
+        for slot in slots:
+            last = min(self._through[slot], first + _MAX_RUN - 1)
+            if last >= first:
+                inputs = self._inputs[slot]
+                runs.append([slot, first, [inputs[tick] for tick in range(first, last + 1)]])
+        return {
+            'type': 'lockstep',
+            'ack': ack,
+            'inputs': runs,
+            'hashes': [list(self.last_hash)] if self.last_hash else [],
+        }
+
+    # ——— Checksums ———
+    def _record_hash(self, tick, crc):
+        self._hashes[tick] = crc
+        self.last_hash = (tick, crc)
+        for slot, theirs in self._peer_hashes.pop(tick, {}).items():
+            self._compare(slot, tick, crc, theirs)
+        if len(self._hashes) > _HASH_HISTORY:
+            del self._hashes[min(self._hashes)]
+
+    def _peer_hash(self, sender, tick, crc):
+        if tick <= self._checked.get(sender, 0):
+            return  # Ja comparado (o ultimo checksum vai repetido em toda mensagem)
+        if tick in self._hashes:
+            self._compare(sender, tick, self._hashes[tick], crc)
+        elif tick > self.tick:
+            self._peer_hashes.setdefault(tick, {})[sender] = crc
+
+    def _compare(self, slot, tick, ours, theirs):
+        self._checked[slot] = tick
+        self.checks += 1
+        if ours != theirs:
+            self.desyncs += 1
+            if self.desync_tick is None:
+                self.desync_tick = tick
+                print(f"Lockstep dessincronizado no tick {tick} (jogador {slot + 1})")
+
+    # Descarta as entradas ja simuladas que todos os outros lados ja confirmaram
+    # (quem ainda nao mandou nada pode precisar de todas)
+    def _prune(self):
+        if self.is_host:
+            peers = [slot for slot in self.slots if slot != self.local_slot and slot not in self.departed]
+        else:
+            peers = [0]
+        oldest = min([self.tick] + [self.peer_acks.get(slot, 0) for slot in peers])
+        for inputs in self._inputs.values():
+            while inputs:
+                tick = next(iter(inputs))
+                if tick > oldest:
+                    break
+                del inputs[tick]
@@ -15,7 +15,8 @@
 # Bibliotecas
 import pyxel # Engine utilizada no jogo
 from network import NetworkManager # Importa a classe NetworkManager para gerenciar conexoes de rede
-from states import MenuState # Importa a classe do menu principal
+from states import MenuState, ProfilerOverlay # Importa a classe do menu principal e o overlay do profiler
+from profiler import frame_profiler # Tempos por secao do frame (F3 mostra)
 from config import * # Importa todas as configuracoes definidas em config.py
 
 # Seguindo as recomendacoes do github oficial do Pyxel de encapsular o codigo do Pyxel em uma classe:
@@ -30,6 +31,7 @@ class Game:
         self.current_state = MenuState(self) # Chama o menu principal passando a instancia do jogo e recebe o estado atual (que eh o proprio menu principal)
         self.previous_state = None  # Usado para tela de pause do jogo (se o usuario pausar, o jogo guarda o estado anterior do jogo, que era o proprio jogo)
         self.network = NetworkManager(NETWORK_PORT) # Inicializa a conexao passando a porta que a aplicacao vai usar
+        self.profiler_overlay = ProfilerOverlay(self) # Overlay com os tempos de cada secao do frame (F3 abre e fecha)
         
         # Inicializa configuracoes iniciais do jogo
         pyxel.init(SCREEN_WIDTH, SCREEN_HEIGHT,     # Tamanho do Jogo
@@ -49,18 +51,28 @@ class Game:
     
     # Atualiza a logica do jogo a cada frame
     def update(self):
+        frame_profiler.frame() # Fecha o frame anterior (update + draw) no profiler
+
         # Verifica tecla F11 para alternar tela cheia
         if pyxel.btnp(pyxel.KEY_F11):
             self.is_fullscreen = not self.is_fullscreen # Pega o contrario do estado atual
             pyxel.fullscreen(self.is_fullscreen) # Fica ou nao em tela cheia
 
+        # Verifica tecla F3 para abrir ou fechar o overlay do profiler
+        if pyxel.btnp(pyxel.KEY_F3):
+            self.profiler_overlay.toggle()
+        self.profiler_overlay.update()
+
         # Chama o metodo "update" do estado atual em que o jogo estah (states.py)
-        self.current_state.update()
+        with frame_profiler.section("update"):
+            self.current_state.update()
     
     # Desenha todos os elementos na tela a cada frame
     def draw(self):
         # Chama o metodo "draw" do estado atual em que o jogo estah (states.py)
-        self.current_state.draw()
+        with frame_profiler.section("draw"):
+            self.current_state.draw()
+        self.profiler_overlay.draw() # Overlay do profiler por cima de tudo (se estiver aberto)
         
 
 # Executa o jogo
@@ -2,14 +2,125 @@
 ### - Criar terreno aleatorio sincronizado
 ### - Gerenciar scroll automatico
 ### - Manter consistencia entre jogadores
+###
+### A logica (update) nao depende do pyxel: as teclas de controle do rio chegam como parametro.
+### Apenas o draw usa o pyxel
+###
+### O rio fica desenhado em uma imagem fora da tela. A cada frame ela desce as linhas que o historico
+### andou e so as linhas novas do topo sao desenhadas (ver draw)
+###
+### O historico do rio (margens de cada linha da tela) eh um buffer circular espelhado em arrays: cada linha
+### fica em 'i' e em 'i + size', entao as linhas a partir do topo sao sempre contiguas (sem dar a volta).
+### Com o NumPy instalado, as margens de todas as linhas saem de uma vez (RiverHistory.all_margins)
+###
+### A colisao com as margens usa uma tabela por altura de caixa (BankTable): para cada linha de topo,
+### a agua livre em todas as linhas da caixa. Uma consulta eh so uma leitura na tabela
 
+from array import array
 from collections import deque
 import pyxel
 from entities import *
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class RiverHistory:
+    """Margens do rio em cada linha da tela (linha 0 = topo, a mais nova), em buffer circular espelhado."""
+    def __init__(self, size, centro, largura):
+        self.size = size
+        meia = largura / 2
+        self.esquerdas = array('d', [centro - meia] * (2 * size))
+        self.direitas = array('d', [centro + meia] * (2 * size))
+        self.head = 0       # Posicao da linha 0 nos arrays (sempre menor que 'size')
+        self.pushes = 0     # Linhas acrescentadas desde o inicio
+
+    def push(self, centro, largura):
+        """Acrescenta uma linha no topo; todas as outras descem uma linha e a ultima sai."""
+        head = self.head = (self.head - 1) % self.size
+        meia = largura / 2
+        self.esquerdas[head] = self.esquerdas[head + self.size] = centro - meia
+        self.direitas[head] = self.direitas[head + self.size] = centro + meia
+        self.pushes += 1
+
+    def margins(self, screen_y):
+        index = self.head + screen_y
+        return self.esquerdas[index], self.direitas[index]
+
+    def all_margins(self, rows=None):
+        """Margens (esquerda, direita) das 'rows' primeiras linhas (todas, sem 'rows'), em ordem de tela.
+        Com o NumPy, dois arrays; sem ele, duas listas."""
+        if rows is None:
+            rows = self.size
+        head = self.head
+        if np is not None:
+            return (np.frombuffer(self.esquerdas)[head:head + rows].copy(),
+                    np.frombuffer(self.direitas)[head:head + rows].copy())
+        return self.esquerdas[head:head + rows].tolist(), self.direitas[head:head + rows].tolist()
+
+
+class BankTable:
+    """Para cada linha de topo t: a margem esquerda mais a direita e a margem direita mais a esquerda
+    nas 'height' linhas a partir de t. Uma caixa dessa altura esta na agua se cabe entre as duas.
+    Quando o historico anda k linhas, as janelas descem junto e so as k do topo sao calculadas."""
+    def __init__(self, history, height):
+        self.history = history
+        self.height = height
+        self.esq = []
+        self.dir = []
+        self._pushes = None     # history.pushes da ultima atualizacao
+
+    def _rebuild(self):
+        height = self.height
+        esq_todas, dir_todas = self.history.all_margins()
+        if np is not None:
+            # maximo/minimo das janelas: uma operacao por linha da caixa (deslocando o array)
+            n = len(esq_todas) - height + 1
+            esq, dir = esq_todas[:n].copy(), dir_todas[:n].copy()
+            for i in range(1, height):
+                np.maximum(esq, esq_todas[i:n + i], out=esq)
+                np.minimum(dir, dir_todas[i:n + i], out=dir)
+            self.esq, self.dir = esq.tolist(), dir.tolist()
+        else:
+            linhas = range(len(esq_todas) - height + 1)
+            self.esq = [max(esq_todas[t:t + height]) for t in linhas]
+            self.dir = [min(dir_todas[t:t + height]) for t in linhas]
+
+    def _window(self, top):
+        margens = [self.history.margins(y) for y in range(top, top + self.height)]
+        return max(esq for esq, _ in margens), min(dir for _, dir in margens)
+
+    def _update(self):
+        novas = None if self._pushes is None else self.history.pushes - self._pushes
+        if novas is None or novas >= len(self.esq):
+            self._rebuild()
+        else:
+            del self.esq[-novas:]
+            del self.dir[-novas:]
+            janelas = [self._window(t) for t in range(novas)]
+            self.esq[0:0] = [esq for esq, _ in janelas]
+            self.dir[0:0] = [dir for _, dir in janelas]
+        self._pushes = self.history.pushes
+
+    def water(self, top):
+        """(esquerda, direita) da agua livre nas linhas da caixa que comeca em 'top'.
+        Caixas fora da tela usam as linhas da borda mais proxima."""
+        if self._pushes != self.history.pushes:
+            self._update()
+        t = min(max(int(top), 0), len(self.esq) - 1)
+        return self.esq[t], self.dir[t]
+
+    def on_bank(self, left, top, right):
+        """True se a caixa (left, top, right, top + height) passa de alguma margem."""
+        esq, dir = self.water(top)
+        return left < esq or right > dir
+
+
 # Classe que gerencia o cenário do jogo (rio e margens)
 class Background:
-    def __init__(self, is_host=False , is_multiplayer=False):
+    def __init__(self, is_host=False , is_multiplayer=False, seed=None):
         self.is_host = is_host
         self.is_multiplayer = is_multiplayer
 
@@ -23,26 +134,30 @@ class Background:
         self.largura_speed = .5                      # ← velocidade de ajuste da largura
 
         # centro do rio (já existente)
-        self.centro_rio_x = pyxel.width / 2
+        self.centro_rio_x = SCREEN_WIDTH / 2
         self.target_centro_x = self.centro_rio_x
         self.curve_speed = .5
 
         # histórico para “descer” curvas e larguras do topo
-        self.centros_hist = deque([self.centro_rio_x] * pyxel.height,
-                                  maxlen=pyxel.height)
-        self.largura_hist = deque([self.largura_rio] * pyxel.height,
-                                  maxlen=pyxel.height)       # ← novo
+        self.hist = RiverHistory(SCREEN_HEIGHT, self.centro_rio_x, self.largura_rio)
+        self._bank_tables = {}  # altura da caixa -> BankTable
+
+        # Imagens do rio fora da tela (criadas no primeiro draw). São duas porque o pyxel
+        # não copia uma imagem sobre ela mesma: cada frame desce a atual para a outra
+        self._river_images = None
+        self._river_front = 0       # Imagem com o rio do último draw
+        self._river_pushes = 0      # hist.pushes no último draw
 
         self.cor_borda = 15
         
         
         
-        self.tree_manager = TreeManager(self)
+        self.tree_manager = TreeManager(self, seed)
 
 
         # Novo estado para controle da animação
         self.animating_to_center = False
-        self.max_largura = pyxel.width - 30  # Largura máxima igual ao KEY_3
+        self.max_largura = SCREEN_WIDTH - 30  # Largura máxima igual ao KEY_3
 
         self.comandos = deque([
             ("WAIT", 300),
@@ -102,39 +217,52 @@ class Background:
                 self.tempo_comando = 0
         else:
             # Executa o comando por 1 frame
-            if comando == "KEY_1":
-                self.target_centro_x = min(self.target_centro_x + 30, pyxel.width - self.largura_rio / 2)
-            elif comando == "KEY_2":
-                self.target_centro_x = max(self.target_centro_x - 30, self.largura_rio / 2)
-            elif comando == "KEY_3":
-                self.target_largura = min(self.target_largura + 10, self.max_largura)
-            elif comando == "KEY_4":
-                self.target_largura = max(self.target_largura - 10, 20)
-            elif comando == "KEY_5":
-                self.animating_to_center = True
-                self.target_centro_x = pyxel.width / 2
-                self.target_largura = 45
+            self.aplicar_comando(comando)
 
             # Remove imediatamente após 1 frame
             self.comandos.popleft()
             self.tempo_comando = 0
 
+    def aplicar_comando(self, comando):
+        """Aplica um comando de controle do rio ("KEY_1" a "KEY_5"), vindo do teclado ou do roteiro."""
+        # —–– curvar (1/2)
+        if comando == "KEY_1":
+            self.target_centro_x = min(self.target_centro_x + 30, SCREEN_WIDTH - self.largura_rio / 2)
+        elif comando == "KEY_2":
+            self.target_centro_x = max(self.target_centro_x - 30, self.largura_rio / 2)
+        # —–– largura (3/4)
+        elif comando == "KEY_3":
+            # aumenta até um máximo
+            self.target_largura = min(self.target_largura + 10, self.max_largura)
+        elif comando == "KEY_4":
+            # diminui até um mínimo (20 px)
+            self.target_largura = max(self.target_largura - 10, 20)
+        elif comando == "KEY_5":
+            self.animating_to_center = True
+            self.target_centro_x = SCREEN_WIDTH / 2  # Primeiro centraliza
+            self.target_largura = 45  # Reset para largura inicial
+
     def obter_margens_rio(self, screen_y):
-        centro = self.centros_hist[screen_y]
-        largura = self.largura_hist[screen_y]           # ← histórico de largura
-        meia = largura / 2
-        return centro - meia, centro + meia
+        return self.hist.margins(screen_y)
 
-    def update(self):
+    def obter_todas_margens(self, linhas=None):
+        """Margens de todas as linhas da tela (ou das 'linhas' primeiras), de uma vez."""
+        return self.hist.all_margins(linhas)
+
+    def obter_tabela_margens(self, altura):
+        """Tabela de colisão com as margens para caixas de 'altura' linhas (ver BankTable)."""
+        table = self._bank_tables.get(altura)
+        if table is None:
+            table = self._bank_tables[altura] = BankTable(self.hist, altura)
+        return table
+
+    def update(self, comandos=()):
+        """Avança um frame. 'comandos' são as teclas de controle do rio pressionadas neste frame ("KEY_1"...)."""
         
         if self.is_host or not self.is_multiplayer:
-            # —–– curvar (1/2)
-            if pyxel.btnp(pyxel.KEY_1):
-                self.target_centro_x = min(self.target_centro_x + 30,
-                                        pyxel.width - self.largura_rio/2)
-            if pyxel.btnp(pyxel.KEY_2):
-                self.target_centro_x = max(self.target_centro_x - 30,
-                                        self.largura_rio/2)
+            # —–– comandos do teclado (curvas e largura)
+            for comando in comandos:
+                self.aplicar_comando(comando)
 
             # —–– ajustar centro suavemente
             diff_c = self.target_centro_x - self.centro_rio_x
@@ -143,23 +271,6 @@ class Background:
             else:
                 self.centro_rio_x = self.target_centro_x
 
-            # —–– largura (3/4)
-            if pyxel.btnp(pyxel.KEY_3):
-                # aumenta até um máximo (por ex. metade da largura da tela)
-                self.target_largura = min(self.target_largura + 10,
-                                        self.max_largura)
-                
-            if pyxel.btnp(pyxel.KEY_4):
-                # diminui até um mínimo (por ex. 20 px)
-                self.target_largura = max(self.target_largura - 10, 20)
-
-            # Novo controle KEY_5
-            if pyxel.btnp(pyxel.KEY_5):
-                self.animating_to_center = True
-                self.target_centro_x = pyxel.width / 2  # Primeiro centraliza
-                self.target_largura = 45  # Reset para largura inicial
-                
-
             self.executar_comando_simulado()
 
             # atualiza árvores
@@ -168,7 +279,7 @@ class Background:
         # Lógica da animação automática
         if self.animating_to_center:
             # Verifica se já centralizou
-            if abs(self.centro_rio_x - pyxel.width/2) < 1:
+            if abs(self.centro_rio_x - SCREEN_WIDTH/2) < 1:
                 # Começa a expandir após centralizar
                 self.target_largura = self.max_largura
                 
@@ -184,25 +295,44 @@ class Background:
             self.largura_rio = self.target_largura
 
         # —–– atualizar históricos
-        self.centros_hist.appendleft(self.centro_rio_x)
-        self.largura_hist.appendleft(self.largura_rio)   # ← novo
-        
+        self.hist.push(self.centro_rio_x, self.largura_rio)
         
         self.deslocamento += self.velocidade_scroll
 
        
     def draw(self):
-        pyxel.rect(0, 0, pyxel.width, pyxel.height, 9)
-        for screen_y in range(pyxel.height):
-            esq, dir = self.obter_margens_rio(screen_y)
-            # bordas
-            for i in range(4):
-                pyxel.line(int(esq)-i, screen_y, int(esq), screen_y,
-                           self.cor_borda)
-                pyxel.line(int(dir), screen_y, int(dir)+i, screen_y,
-                           self.cor_borda)
-            # água
-            pyxel.line(int(esq), screen_y, int(dir), screen_y, 12)
-            
-        
+        width, height = pyxel.width, pyxel.height
+        if self._river_images is None:
+            self._river_images = (pyxel.Image(width, height), pyxel.Image(width, height))
+            novas = height
+        else:
+            novas = min(self.hist.pushes - self._river_pushes, height)
+
+        if novas:
+            atual = self._river_images[self._river_front]
+            proxima = self._river_images[1 - self._river_front]
+            # desce o que já estava desenhado e desenha só as linhas novas do topo
+            if novas < height:
+                proxima.blt(0, novas, atual, 0, 0, width, height - novas)
+            if novas == 1:
+                # caso comum: uma linha nova por frame
+                self._desenhar_linha_rio(proxima, 0, *self.obter_margens_rio(0), width)
+            else:
+                esq_todas, dir_todas = self.obter_todas_margens(novas)
+                for screen_y in range(novas):
+                    self._desenhar_linha_rio(proxima, screen_y, esq_todas[screen_y], dir_todas[screen_y], width)
+            self._river_front = 1 - self._river_front
+            self._river_pushes = self.hist.pushes
+
+        pyxel.blt(0, 0, self._river_images[self._river_front], 0, 0, width, height)
         self.tree_manager.draw_arvores()
+
+    def _desenhar_linha_rio(self, image, screen_y, esq, dir, width):
+        """Desenha uma linha da tela: fundo, bordas (4 px) e água."""
+        esq, dir = int(esq), int(dir)
+        image.line(0, screen_y, width - 1, screen_y, 9)
+        # bordas
+        image.line(esq - 3, screen_y, esq, screen_y, self.cor_borda)
+        image.line(dir, screen_y, dir + 3, screen_y, self.cor_borda)
+        # água
+        image.line(esq, screen_y, dir, screen_y, 12)
@@ -2,32 +2,450 @@
 ### - Estabelecer conexoes via UDP
 ### - Enviar e receber dados entre cliente e servidor
 ### - Gerenciar socket e threads
+###
+### O host guarda uma sessao por cliente (tabela indexada pelo endereco). Cada sessao recebe um slot de
+### jogador no handshake e tem suas proprias sequencias e historicos de snapshots (compressao delta).
+### No cliente existe uma unica sessao, a do host
+###
+### As mensagens recebidas pelas threads de rede vao para uma fila limitada (ReceiveQueue). O laco do jogo
+### consome a fila uma vez por frame com drain(), sem perder pacotes que chegam entre dois frames
+###
+### Cada sessao tem as suas estatisticas (ConnectionStats): trafego e taxas em cada sentido, erros de envio,
+### perdas e pacotes atrasados pelas sequencias, jitter pelo horario de envio dos pacotes e RTT pelos
+### heartbeats: a cada PING_INTERVAL, cada lado manda {'type': 'heartbeat', 'ping': horario} e o outro
+### devolve {'type': 'heartbeat', 'pong': horario}. Consulta com connection_stats(); com
+### NETWORK_STATS_INTERVAL, vao tambem para o terminal
+###
+### Rede ruim simulada (NETWORK_IMPAIRMENT): o socket eh envolvido por um ImpairedSocket, que atrasa, perde,
+### duplica e reordena os pacotes no sendto/recvfrom seguindo um dos cenarios de IMPAIRMENT_SCENARIOS
 
 # Bibliotecas
 import socket           # Responsavel por criar e gerenciar conexoes de rede usando protocolo UDP
 import threading        # Permite criar e controlar threads para execucao paralela (nao vai congelar o jogo)
 import time             # Usado para controlar intervalos de tempo e marcar timestamps
-import json             # Usado para codificar e decodificar dados em formato JSON para envio pela rede
+import heapq            # Pacotes retidos pela rede simulada, ordenados pelo horario de entrega
+import random           # Sorteios da rede simulada (perda, duplicacao, atraso)
+from collections import namedtuple
+from collections import deque  # Fila das mensagens recebidas (append/popleft sao atomicos entre threads)
+import codec            # Codifica e decodifica os pacotes (binario ou JSON) para envio pela rede
+import delta            # Compressao delta dos snapshots (envia so o que mudou desde o ultimo snapshot confirmado)
 from config import *    # Importa constantes e configuracoes do arquivo "config.py"
+from profiler import frame_profiler  # Tempos de codificacao e recebimento (overlay do F3)
+
+
+# Taxas por segundo das estatisticas: amostras dos contadores a cada _RATE_SAMPLE_INTERVAL segundos,
+# as ultimas _RATE_SAMPLES delas (a taxa sai da primeira e da ultima)
+_RATE_SAMPLE_INTERVAL = 0.25
+_RATE_SAMPLES = 9
+
+
+class ConnectionStats:
+    """Estatisticas de uma conexao: trafego, RTT (heartbeats), jitter, perdas e erros de envio."""
+    def __init__(self):
+        self.packets_sent = 0
+        self.bytes_sent = 0
+        self.packets_received = 0
+        self.bytes_received = 0
+        self.send_errors = 0            # Envios que falharam (sendto levantou erro)
+
+        # RTT (s), como no TCP: media suavizada (srtt) e variacao (rtt_var)
+        self.rtt = None                 # Ultima medida
+        self.srtt = None
+        self.rtt_var = 0.0
+        self.rtt_min = None
+        self.rtt_max = None
+        self.rtt_samples = 0
+
+        # Jitter (s) da chegada dos pacotes de jogo, como no RTP: variacao do tempo de transito
+        self.jitter = 0.0
+        self._last_transit = None
+
+        self._samples = deque(maxlen=_RATE_SAMPLES)  # (horario, pacotes/bytes enviados, pacotes/bytes recebidos)
+        self.reset_sequence()
+
+    # Sequencias novas (conexao refeita): perdas contam a partir do proximo pacote
+    def reset_sequence(self):
+        self.first_seq = None           # Primeira sequencia de jogo recebida
+        self.highest_seq = None         # Maior sequencia de jogo recebida
+        self.in_order = 0               # Pacotes de jogo recebidos em ordem
+        self.late = 0                   # Pacotes de jogo que chegaram depois de um mais novo (descartados)
+
+    def on_game_packet(self, seq, timestamp, late):
+        """Pacote de jogo recebido: 'seq' e 'timestamp' (relogio de quem enviou) do cabecalho."""
+        if timestamp is not None:
+            transit = time.time() - timestamp   # O desvio entre os relogios se cancela na diferenca
+            if self._last_transit is not None:
+                self.jitter += (abs(transit - self._last_transit) - self.jitter) / 16
+            self._last_transit = transit
+        if seq is None:
+            return
+        if late:
+            self.late += 1
+            return
+        self.in_order += 1
+        if self.first_seq is None:
+            self.first_seq = seq
+        self.highest_seq = seq
+
+    def on_rtt(self, rtt):
+        self.rtt = rtt
+        self.rtt_samples += 1
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rtt_var = rtt / 2
+        else:
+            self.rtt_var = 0.75 * self.rtt_var + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.rtt_min = rtt if self.rtt_min is None else min(self.rtt_min, rtt)
+        self.rtt_max = rtt if self.rtt_max is None else max(self.rtt_max, rtt)
+
+    @property
+    def lost(self):
+        """Sequencias que nao chegaram (as que chegaram atrasadas nao contam como perdidas)."""
+        if self.first_seq is None:
+            return 0
+        return max(0, self.highest_seq - self.first_seq + 1 - self.in_order - self.late)
+
+    def sample(self, now):
+        """Guarda os contadores para as taxas por segundo (chamado pela thread de rede)."""
+        self._samples.append((now, self.packets_sent, self.bytes_sent, self.packets_received, self.bytes_received))
+
+    def rates(self):
+        """(pacotes/s enviados, bytes/s enviados, pacotes/s recebidos, bytes/s recebidos) nas ultimas amostras."""
+        if len(self._samples) < 2:
+            return (0.0, 0.0, 0.0, 0.0)
+        first, last = self._samples[0], self._samples[-1]
+        elapsed = last[0] - first[0]
+        return tuple((new - old) / elapsed for new, old in zip(last[1:], first[1:]))
+
+    def as_dict(self):
+        expected = self.lost + self.in_order + self.late
+        out_pps, out_bps, in_pps, in_bps = self.rates()
+        ms = lambda seconds: None if seconds is None else seconds * 1000
+        return {
+            'rtt_ms': ms(self.rtt), 'srtt_ms': ms(self.srtt), 'rtt_var_ms': ms(self.rtt_var),
+            'rtt_min_ms': ms(self.rtt_min), 'rtt_max_ms': ms(self.rtt_max), 'rtt_samples': self.rtt_samples,
+            'jitter_ms': ms(self.jitter),
+            'lost': self.lost, 'late': self.late, 'loss_rate': self.lost / expected if expected else 0.0,
+            'packets_sent': self.packets_sent, 'bytes_sent': self.bytes_sent,
+            'packets_received': self.packets_received, 'bytes_received': self.bytes_received,
+            'out_pps': out_pps, 'out_bps': out_bps, 'in_pps': in_pps, 'in_bps': in_bps,
+            'send_errors': self.send_errors,
+        }
+
+
+class PeerSession:
+    """Conexao com um outro jogador: endereco, slot, estado da compressao delta e estatisticas."""
+    def __init__(self, addr, slot):
+        self.addr = addr                # Endereco (IP, porta) do outro lado
+        self.slot = slot                # Slot do jogador (cliente) ou 0 (host, visto pelo cliente)
+        self.last_recv = time.time()    # Horario da ultima mensagem recebida
+        self.last_ping = 0.0            # Horario (perf_counter) do ultimo heartbeat de medicao do RTT
+        self.stats = ConnectionStats()
+        self.reset_delta_state()
+
+    # Zera as sequencias e os historicos de snapshots (nova conexao)
+    def reset_delta_state(self):
+        self.send_seq = 0               # Sequencia do ultimo pacote de jogo enviado
+        self.sent_history = delta.SnapshotHistory(SNAPSHOT_HISTORY_SIZE)  # Snapshots enviados (bases possiveis dos deltas)
+        self.peer_ack = None            # Ultimo snapshot nosso que o outro lado confirmou ter aplicado
+        self.recv_seq = None            # Sequencia do ultimo pacote de jogo recebido e aceito
+        self.recv_snapshot_seq = None   # Sequencia do ultimo snapshot aplicado (eh o que confirmamos ao outro lado)
+        self.recv_history = delta.SnapshotHistory(SNAPSHOT_HISTORY_SIZE)  # Snapshots recebidos (bases dos deltas que chegam)
+        self.need_keyframe = False      # Recebemos um delta cuja base nao temos: pede um snapshot completo
+        self.stats.reset_sequence()
+
+
+class InboundMessage:
+    """Mensagem recebida de uma sessao: slot de quem enviou, sequencia do pacote, horarios e conteudo."""
+    def __init__(self, slot, seq, payload, timestamp=None):
+        self.slot = slot            # Slot do jogador que enviou (0 = host, visto pelo cliente)
+        self.seq = seq              # Sequencia do pacote na sessao de quem enviou
+        self.payload = payload      # Conteudo (snapshot ja reconstruido, 'game_start', heartbeat...)
+        self.timestamp = timestamp  # Horario de envio (relogio de quem enviou)
+        self.recv_time = time.time()  # Horario de chegada (relogio local)
+
+
+def _is_snapshot(payload):
+    return isinstance(payload, dict) and payload.get('type') == 'game_update'
+
+
+class ReceiveQueue:
+    """Fila limitada das mensagens recebidas, entre a thread de rede e o laco do jogo.
+
+    Apenas a thread de rede insere (put) e apenas o laco do jogo retira (drain). O append e o popleft
+    do deque sao atomicos, entao a fila dispensa lock. Se a fila encher, a mensagem mais antiga eh descartada.
+    """
+    def __init__(self, size=RECV_QUEUE_SIZE):
+        self.size = size
+        self._queue = deque()
+        self.dropped = 0      # Mensagens descartadas porque a fila estava cheia
+        self.reordered = 0    # Pacotes que chegaram fora de ordem (mais antigos que o ultimo aceito) e foram descartados
+        self.coalesced = 0    # Snapshots substituidos por um mais novo da mesma sessao no mesmo drain
+
+    def put(self, message):
+        if len(self._queue) >= self.size:
+            try:
+                self._queue.popleft()
+                self.dropped += 1
+            except IndexError:
+                pass  # O laco do jogo esvaziou a fila ao mesmo tempo
+        self._queue.append(message)
+
+    def drain(self, coalesce=True):
+        """Retira todas as mensagens da fila, na ordem de chegada.
+
+        Com 'coalesce', fica apenas o snapshot mais novo de cada sessao: os sons dos snapshots
+        descartados sao passados para ele, para nao se perderem.
+        """
+        messages = []
+        while True:
+            try:
+                messages.append(self._queue.popleft())
+            except IndexError:
+                break
+        if not coalesce or len(messages) < 2:
+            return messages
+
+        latest = {}  # slot -> posicao do snapshot mais novo
+        for i, message in enumerate(messages):
+            if _is_snapshot(message.payload):
+                latest[message.slot] = i
+
+        result = []
+        sounds = {}  # slot -> sons dos snapshots descartados
+        for i, message in enumerate(messages):
+            if _is_snapshot(message.payload):
+                if latest[message.slot] != i:
+                    sounds.setdefault(message.slot, []).extend(message.payload.get('sounds', ()))
+                    self.coalesced += 1
+                    continue
+                if message.slot in sounds:
+                    # Copia o snapshot: o original tambem eh a base dos proximos deltas
+                    message.payload = dict(message.payload,
+                                           sounds=sounds.pop(message.slot) + list(message.payload.get('sounds', ())))
+            result.append(message)
+        return result
+
+    def clear(self):
+        self._queue.clear()
+
+
+class SendTimer:
+    """Decide em quais ticks da simulacao sai um snapshot, para enviar 'rate' snapshots por segundo
+    com a simulacao rodando a 'tick_rate' ticks por segundo."""
+    def __init__(self, rate=NETWORK_SEND_RATE, tick_rate=FPS):
+        self.interval = max(1.0, tick_rate / rate)  # Ticks entre dois envios (nunca mais de um envio por tick)
+        self._elapsed = self.interval               # O primeiro tick ja envia
+
+    def due(self):
+        """Chamado uma vez por tick. Retorna True quando eh hora de enviar."""
+        self._elapsed += 1
+        if self._elapsed < self.interval:
+            return False
+        self._elapsed -= self.interval
+        return True
+
+
+# Condicoes de uma rede ruim simulada (ImpairedSocket):
+# - delay / jitter: atraso de cada pacote (ms), delay mais um valor aleatorio entre -jitter e +jitter
+# - loss: fracao dos pacotes descartados
+# - duplicate: fracao dos pacotes entregues duas vezes
+# - reorder: fracao dos pacotes segurados por mais um delay (+ 20 ms), para os seguintes passarem na frente
+Impairment = namedtuple('Impairment', ['delay', 'jitter', 'loss', 'duplicate', 'reorder'], defaults=[0, 0, 0.0, 0.0, 0.0])
+
+# Cenarios: fases (duracao em segundos, condicoes) repetidas em ciclo. Com uma fase so, a condicao eh fixa
+IMPAIRMENT_SCENARIOS = {
+    'lan': ((60, Impairment(delay=1, jitter=1)),),
+    'wifi_ruim': ((60, Impairment(delay=30, jitter=15, loss=0.02, duplicate=0.01, reorder=0.02)),),
+    'movel': ((60, Impairment(delay=120, jitter=40, loss=0.05, reorder=0.01)),),
+    'perda_alta': ((60, Impairment(delay=20, jitter=5, loss=0.2)),),
+    # Conexao cai por mais que o TIMEOUT e volta (reconexao, fim de partida por desconexao)
+    'queda': ((10, Impairment(delay=20, jitter=5)), (TIMEOUT + 2, Impairment(loss=1.0))),
+    # Piora aos poucos e volta ao normal (interpolacao e predicao com atraso crescente)
+    'degradando': ((8, Impairment(delay=10, jitter=2)), (8, Impairment(delay=60, jitter=20, loss=0.02)),
+                   (8, Impairment(delay=150, jitter=50, loss=0.05, reorder=0.02)),
+                   (8, Impairment(delay=300, jitter=80, loss=0.1, duplicate=0.02, reorder=0.05))),
+    # Rajadas de perda curtas (menos que o TIMEOUT) no meio de uma rede boa
+    'rajadas': ((4, Impairment(delay=20, jitter=5)), (0.5, Impairment(delay=20, loss=1.0))),
+}
+
+_REORDER_EXTRA_MS = 20  # Atraso a mais de um pacote reordenado, alem de mais um 'delay'
+
+
+class ImpairedSocket:
+    """Socket UDP com rede ruim simulada: envolve sendto/recvfrom de um socket real e aplica um cenario
+    de IMPAIRMENT_SCENARIOS (ou uma lista de fases) aos pacotes. 'directions' diz onde aplicar: "send",
+    "recv" ou os dois. O resto dos metodos (bind, close...) vai direto para o socket real."""
+    def __init__(self, sock, scenario, directions=("send", "recv"), seed=None):
+        self._sock = sock
+        self.name = scenario if isinstance(scenario, str) else "personalizado"
+        self.phases = IMPAIRMENT_SCENARIOS[scenario] if isinstance(scenario, str) else tuple(scenario)
+        self.directions = directions
+        self.rng = random.Random(seed)
+        self._start = time.monotonic()
+        self._phase = None
+        self._phase_lock = threading.Lock()  # conditions() roda nas duas direcoes (jogo e thread de rede)
+        self._timeout = None
+
+        self._inbound = []                  # heap: (entrega, ordem, dados, endereco) recebidos e retidos
+        self._outbound = []                 # heap: (entrega, ordem, dados, endereco) a enviar
+        self._order = 0
+        # Protege as filas, o rng e os contadores (as duas direcoes sorteiam) e acorda a thread de envio
+        self._lock = threading.Condition()
+        self._closed = False
+        self._sender = None
+        if "send" in directions:
+            self._sender = threading.Thread(target=self._send_loop, daemon=True, name="Network-Impairment")
+            self._sender.start()
+
+        # Contadores
+        self.dropped = 0        # Pacotes descartados (perda simulada)
+        self.duplicated = 0     # Copias extras entregues
+        self.reordered = 0      # Pacotes segurados para os seguintes passarem na frente
+        self.delayed = 0        # Pacotes entregues com atraso
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+    # Condicoes da fase atual do cenario (avisa no terminal quando muda)
+    def conditions(self):
+        total = sum(duration for duration, _ in self.phases)
+        elapsed = (time.monotonic() - self._start) % total
+        for i, (duration, impairment) in enumerate(self.phases):
+            if elapsed < duration or i == len(self.phases) - 1:
+                break
+            elapsed -= duration
+        with self._phase_lock:
+            if i != self._phase and len(self.phases) > 1:
+                print(f"[rede simulada] {self.name}, fase {i + 1}/{len(self.phases)}: {impairment}")
+            self._phase = i
+        return impairment
+
+    # Horarios de entrega de um pacote ([] se perdido, dois se duplicado). Chamado com o self._lock
+    def _schedule(self):
+        impairment = self.conditions()
+        if self.rng.random() < impairment.loss:
+            self.dropped += 1
+            return []
+        copies = 1
+        if self.rng.random() < impairment.duplicate:
+            copies = 2
+            self.duplicated += 1
+        now = time.monotonic()
+        deliveries = []
+        for _ in range(copies):
+            delay = impairment.delay + self.rng.uniform(-impairment.jitter, impairment.jitter)
+            if self.rng.random() < impairment.reorder:
+                delay += impairment.delay + _REORDER_EXTRA_MS
+                self.reordered += 1
+            if delay > 0:
+                self.delayed += 1
+            deliveries.append(now + max(0.0, delay) / 1000)
+        return deliveries
+
+    def sendto(self, data, addr):
+        if "send" not in self.directions:
+            return self._sock.sendto(data, addr)
+        with self._lock:
+            for due in self._schedule():
+                self._order += 1
+                heapq.heappush(self._outbound, (due, self._order, data, addr))
+            self._lock.notify()
+        return len(data)
+
+    # Thread que envia os pacotes retidos quando chega o horario de cada um
+    def _send_loop(self):
+        with self._lock:
+            while not self._closed:
+                if not self._outbound:
+                    self._lock.wait()
+                    continue
+                wait = self._outbound[0][0] - time.monotonic()
+                if wait > 0:
+                    self._lock.wait(wait)
+                    continue
+                _, _, data, addr = heapq.heappop(self._outbound)
+                try:
+                    self._sock.sendto(data, addr)
+                except OSError:
+                    pass  # Socket fechado ou destino inalcancavel: como na rede, o pacote se perde
+
+    def settimeout(self, timeout):
+        self._timeout = timeout
+        self._sock.settimeout(timeout)
+
+    def recvfrom(self, bufsize):
+        if "recv" not in self.directions:
+            return self._sock.recvfrom(bufsize)
+        deadline = None if self._timeout is None else time.monotonic() + self._timeout
+        while True:
+            now = time.monotonic()
+            if self._inbound and self._inbound[0][0] <= now:
+                _, _, data, addr = heapq.heappop(self._inbound)
+                return data, addr
+            # Espera o proximo pacote real, ate a entrega de um retido ou o timeout do socket
+            limits = [t for t in (deadline, self._inbound[0][0] if self._inbound else None) if t is not None]
+            wait = min(limits) - now if limits else None
+            if deadline is not None and wait <= 0:
+                raise socket.timeout("timed out")
+            self._sock.settimeout(None if wait is None else max(wait, 0.001))
+            try:
+                data, addr = self._sock.recvfrom(bufsize)
+            except socket.timeout:
+                continue
+            with self._lock:
+                for due in self._schedule():
+                    self._order += 1
+                    heapq.heappush(self._inbound, (due, self._order, data, addr))
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._lock.notify()
+        self._sock.close()
+
+    def stats(self):
+        with self._lock:
+            return {'scenario': self.name, 'dropped': self.dropped, 'duplicated': self.duplicated,
+                    'reordered': self.reordered, 'delayed': self.delayed}
 
 
 class NetworkManager:
     # Construtor
     # Prepara conexao: cria socket, define porta e variaveis de estado
-    def __init__(self, port):
+    def __init__(self, port, wire_format=WIRE_FORMAT, max_players=MAX_PLAYERS, impairment=NETWORK_IMPAIRMENT):
         self.sock = None                # Objeto socket UDP que sera criado para enviar/receber dados
+        self.impairment = impairment    # Cenario de rede ruim simulada (ImpairedSocket), None = rede real
         self.port = port                # Porta local usada pelo servidor para escutar conexoes
+        self.wire_format = wire_format  # Formato dos snapshots enviados ("binary" ou "json"). O recebimento aceita os dois
+        self.max_players = max_players  # Slots de jogador (o host usa o slot 0)
         self.running = False            # Indica se a conexao esta ativa ou nao
         self.connected = False          # Indica se ha uma conexao ativa com outro jogador
         self.remote_addr = None         # Endereco do servidor remoto (no modo cliente)
-        self.client_addr = None         # Endereco do cliente conectado (usado apenas no modo host)
-        self.data = None                # Ultimos dados recebidos
+        self.sessions = {}              # Sessoes ativas: endereco -> PeerSession (no cliente, apenas a do host)
+        self.slot = None                # Slot do jogador local (0 no host; no cliente, recebido no handshake)
+        self.inbox = ReceiveQueue()     # Mensagens recebidas, consumidas pelo jogo com drain()
+
+        # Trafego (contadores acumulados; as taxas saem da diferenca entre duas leituras)
+        self.packets_sent = 0
+        self.bytes_sent = 0
+        self.packets_received = 0
+        self.bytes_received = 0
+        self.send_errors = 0            # Envios que falharam (todas as sessoes)
+        self.handshakes = 0             # Quantos handshakes o host ja aceitou (o servidor dedicado detecta novos clientes por ele)
+        self.stats_interval = NETWORK_STATS_INTERVAL  # Segundos entre as estatisticas no terminal (0 desliga)
+        self._last_sample = 0.0         # Ultima amostra das taxas (perf_counter)
+        self._last_log = time.perf_counter()  # Ultima vez que as estatisticas foram para o terminal
 
         self.receive_thread = None      # Thread responsavel por escutar pacotes recebidos
         self.reconnect_thread = None    # Thread que tenta reconectar automaticamente se a conexao for perdida (no cliente)
         self.last_recv = None           # Marca o horario da ultima mensagem recebida
         self.local_ip = None            # IP local da maquina, utilizado para exibir no menu de multiplayer do host
 
+        # Compressao delta dos snapshots (ver delta.py)
+        self.delta_enabled = DELTA_SNAPSHOTS    # Se False, envia sempre o snapshot completo
+
         # # DEBUG:
         # # captura o conjunto de threads que ja existiam antes
         # self._initial_threads = set(t.name for t in threading.enumerate())
@@ -38,7 +456,7 @@ class NetworkManager:
             self.stop() # Encerra conexoes anteriores (se tiver alguma)
 
             # Cria socket UDP
-            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock = self._create_socket()
             self.sock.settimeout(0.1) # Define tempo maximo de espera ao receber pacotes
 
             # Tenta associar socket a porta especifica
@@ -58,6 +476,7 @@ class NetworkManager:
 
             # Marca que a conexao esta ativa
             self.running = True
+            self.slot = 0  # O host eh sempre o jogador do slot 0
 
             time.sleep(0.1) # Aguarda um pouco antes de iniciar a escuta (evita de dar conflitos)
             # Cria thread para escutar pacotes recebidos
@@ -74,6 +493,14 @@ class NetworkManager:
             print(f"Erro ao iniciar host: {e}")
             return False
     
+    # Socket UDP da conexao (envolvido pela rede ruim simulada, se houver um cenario)
+    def _create_socket(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if self.impairment:
+            print(f"Rede simulada: cenario '{self.impairment}'")
+            return ImpairedSocket(sock, self.impairment)
+        return sock
+
     # Obtem o endereco de IP local da maquina
     def _get_local_ip(self):
         try:
@@ -91,14 +518,14 @@ class NetworkManager:
     def connect(self, ip, port):
         try:
             self.stop() # Encerra conexoes anteriores (se tiver alguma)
-            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM) # Cria socket UDP
+            self.sock = self._create_socket() # Cria socket UDP
             self.sock.settimeout(0.1) # Define tempo maximo de espera para receber dados
             
             # Define o endereco do servidor remoto (IP e porta)
             self.remote_addr = (ip, int(port))
 
             # Envia pacote inicial para iniciar a conexao
-            self._send({'type': 'handshake'})  # Pacote inicial para iniciar a comunicacao
+            self._send({'type': 'handshake'}, self.remote_addr)  # Pacote inicial para iniciar a comunicacao
             self.running = True # Marca que a conexao esta ativa
 
             # Cria thread para receber dados como cliente
@@ -130,7 +557,6 @@ class NetworkManager:
     def stop(self):
         self.running = False  # Sinaliza para as threads pararem
         self.connected = False # Marca como desconectado
-        self.data = None # Reseta os dados recebidos
 
         # Espera a thread de recepcao finalizar
         if self.receive_thread:
@@ -147,7 +573,9 @@ class NetworkManager:
             self.sock.close() 
             self.sock = None
 
-        self.client_addr = None # Reseta endereco do cliente
+        self.sessions = {} # Descarta as sessoes (sequencias e historicos de snapshots)
+        self.inbox.clear() # Descarta as mensagens ainda nao consumidas
+        self.slot = None
         self.remote_addr = None # Reseta endereco remoto
 
 
@@ -165,40 +593,172 @@ class NetworkManager:
         while self.running:
             # Se estiver desconectado e tiver endereco remoto, reenvia o handshake
             if not self.connected and self.remote_addr:
-                self._send({'type': 'handshake'})
+                self._send({'type': 'handshake'}, self.remote_addr)
                 time.sleep(RECONNECT_INTERVAL)
             
             # Espera por x segundos para a proxima tentativa
             time.sleep(RECONNECT_INTERVAL)
 
-    # Envia dados para outro jogador/servidor
+    # Contadores de trafego: (pacotes enviados, bytes enviados, pacotes recebidos, bytes recebidos)
+    def traffic(self):
+        return (self.packets_sent, self.bytes_sent, self.packets_received, self.bytes_received)
+
+    # Estatisticas de cada conexao: slot -> ConnectionStats.as_dict() (RTT, jitter, perdas, taxas, erros)
+    def connection_stats(self):
+        return {session.slot: session.stats.as_dict() for session in list(self.sessions.values())}
+
+    # Uma linha por conexao no terminal
+    def log_stats(self):
+        for slot, s in sorted(self.connection_stats().items()):
+            rtt = "-" if s['srtt_ms'] is None else f"{s['srtt_ms']:.1f} ms (+-{s['rtt_var_ms']:.1f})"
+            print(f"[rede] jogador {slot + 1}: rtt {rtt}, jitter {s['jitter_ms']:.1f} ms, "
+                  f"perda {s['loss_rate']:.1%} ({s['lost']}), atrasados {s['late']}, "
+                  f"out {s['out_pps']:.0f} pkt/s {s['out_bps'] / 1024:.1f} kB/s, "
+                  f"in {s['in_pps']:.0f} pkt/s {s['in_bps'] / 1024:.1f} kB/s, erros {s['send_errors']}")
+
+    # Amostra as taxas e, se configurado, escreve as estatisticas (chamado a cada volta das threads de rede)
+    def _update_stats(self):
+        now = time.perf_counter()
+        if now - self._last_sample >= _RATE_SAMPLE_INTERVAL:
+            self._last_sample = now
+            for session in list(self.sessions.values()):
+                session.stats.sample(now)
+        if self.stats_interval and now - self._last_log >= self.stats_interval:
+            self._last_log = now
+            self.log_stats()
+
+    # Heartbeat de medicao do RTT, se ja passou PING_INTERVAL desde o ultimo nesta sessao
+    def _ping(self, session):
+        now = time.perf_counter()
+        if now - session.last_ping >= PING_INTERVAL:
+            session.last_ping = now
+            self._send({'type': 'heartbeat', 'ping': now}, session.addr)
+
+    # Heartbeat recebido fora dos dados de jogo: responde o 'ping' ou mede o RTT pelo 'pong'
+    def _heartbeat(self, session, packet):
+        if 'ping' in packet:
+            self._send({'type': 'heartbeat', 'pong': packet['ping']}, session.addr)
+        elif 'pong' in packet:
+            session.stats.on_rtt(time.perf_counter() - packet['pong'])
+
+    # Pede aos outros lados um snapshot completo no proximo envio
+    def request_keyframe(self):
+        for session in list(self.sessions.values()):
+            session.need_keyframe = True
+
+    # Slots dos jogadores conectados (no host, os clientes; no cliente, o host)
+    def peer_slots(self):
+        return {session.slot for session in list(self.sessions.values())}
+
+    # Mensagens recebidas desde a ultima chamada (chamado uma vez por frame pelo laco do jogo)
+    def drain(self, coalesce=True):
+        return self.inbox.drain(coalesce)
+
+    # Envia dados para todos os outros jogadores (host) ou para o servidor (cliente)
     def send(self, data):
         # Se o socket estiver ativo e estiver conectado, envia os dados do jogo
         if self.sock and self.connected:
-            self._send({
-                'type': 'game_data',        # Tipo do pacote
-                'payload': data,            # Conteudo a ser enviado
-                'timestamp': time.time()    # Marca o momento do envio
-            })
+            for session in list(self.sessions.values()):
+                self._send_game_data(session, data)
+
+    # Envia dados apenas para o jogador de um slot
+    def send_to(self, slot, data):
+        if self.sock and self.connected:
+            for session in list(self.sessions.values()):
+                if session.slot == slot:
+                    self._send_game_data(session, data)
+
+    # Monta o pacote de jogo de uma sessao (sequencia, confirmacao e snapshot completo ou delta)
+    def _send_game_data(self, session, data):
+        session.send_seq += 1
+        packet = {
+            'type': 'game_data',        # Tipo do pacote
+            'seq': session.send_seq,    # Sequencia do pacote
+            # Confirma o ultimo snapshot aplicado (None pede um snapshot completo)
+            'ack': None if session.need_keyframe else session.recv_snapshot_seq,
+            'timestamp': time.time()    # Marca o momento do envio
+        }
+
+        # Snapshots do jogo podem ir como delta em relacao ao ultimo snapshot que o outro lado confirmou
+        if isinstance(data, dict) and data.get('type') == 'game_update':
+            base = session.sent_history.get(session.peer_ack) if self.delta_enabled else None
+            session.sent_history.put(session.send_seq, data)
+            if base is not None:
+                packet['base'] = session.peer_ack
+                with frame_profiler.section("rede.delta"):
+                    packet['delta'] = delta.diff_snapshot(base, data)
+            else:
+                packet['payload'] = data  # Snapshot completo (keyframe)
+        else:
+            packet['payload'] = data     # Conteudo a ser enviado
+
+        self._send(packet, session.addr)
+        self._ping(session)
+
+    # Processa um pacote de jogo recebido. Retorna o conteudo (snapshot ja reconstruido) ou None se for descartado
+    def _accept_game_data(self, session, packet):
+        seq = packet.get('seq')
+        late = seq is not None and session.recv_seq is not None and seq <= session.recv_seq
+        session.stats.on_game_packet(seq, packet.get('timestamp'), late)
+        # Pacote atrasado (mais antigo que o ultimo aceito): descarta
+        if late:
+            self.inbox.reordered += 1
+            return None
+
+        # O outro lado confirma qual snapshot nosso ele ja aplicou (None = pediu snapshot completo)
+        if 'ack' in packet:
+            session.peer_ack = packet['ack']
+
+        if 'delta' in packet:
+            base = session.recv_history.get(packet['base'])
+            if base is None:
+                # Nao temos a base desse delta: pede um snapshot completo
+                session.need_keyframe = True
+                return None
+            payload = delta.apply_delta(base, packet['delta'])
+        else:
+            payload = packet['payload']
+
+        if seq is not None:
+            session.recv_seq = seq
+            if isinstance(payload, dict) and payload.get('type') == 'game_update':
+                session.recv_history.put(seq, payload)
+                session.recv_snapshot_seq = seq
+                session.need_keyframe = False
+        self.inbox.put(InboundMessage(session.slot, seq, payload, packet.get('timestamp')))
+        return payload
     
-    # Metodo interno que empacota os dados em JSON e envia via UDP
-    def _send(self, data):
+    # Metodo interno que empacota os dados (binario ou JSON, ver codec.py) e envia via UDP
+    def _send(self, data, addr):
+        # Converte os dados em bytes no formato configurado. Fica fora do try: um snapshot nosso que o codec
+        # recusa (ex.: coordenada fracionaria) eh bug do jogo, e nao pode sumir como erro de rede a cada tick
+        with frame_profiler.section("rede.codificar"):
+            raw = codec.encode_packet(data, self.wire_format)
         try:
-            # Converte os dados em string JSON e depois em bytes
-            json_data = json.dumps(data).encode('utf-8')
-
-            # Se for cliente, envia para o servidor (remote_addr)
-            if self.remote_addr:  # Cliente
-                self.sock.sendto(json_data, self.remote_addr)
-
-            # Se for host, envia para o cliente conectado (client_addr)
-            elif self.client_addr:  # Host
-                self.sock.sendto(json_data, self.client_addr)
-
-        # Caso ocorra algum erro no envio, exibe mensagem
-        except Exception as e:
+            self.sock.sendto(raw, addr)
+            self.packets_sent += 1
+            self.bytes_sent += len(raw)
+            session = self.sessions.get(addr)
+            if session is not None:
+                session.stats.packets_sent += 1
+                session.stats.bytes_sent += len(raw)
+
+        # Caso ocorra algum erro no envio (socket fechado, destino inalcancavel...), exibe mensagem
+        except OSError as e:
+            self.send_errors += 1
+            session = self.sessions.get(addr)
+            if session is not None:
+                session.stats.send_errors += 1
             print(f"Erro ao enviar dados: {e}")
 
+    # Menor slot livre para um novo cliente (None se a partida estiver cheia)
+    def _free_slot(self):
+        used = self.peer_slots()
+        for slot in range(1, self.max_players):
+            if slot not in used:
+                return slot
+        return None
+
     # Escuta dados recebidos em segundo plano do host (usando thread)
     def _receive_host(self):
         # Enquanto a conexao estiver ativa, escuta pacotes recebidos
@@ -206,43 +766,77 @@ class NetworkManager:
             try:
                 # Recebe dados do socket (dado e endereco de quem enviou)
                 data, addr = self.sock.recvfrom(MAX_PACKET_SIZE) # Define um limite de tamanho para o pacote (em bytes)
-                # Decodifica os dados JSON recebidos
-                packet = json.loads(data.decode('utf-8')) # Usa a codificacao de caracteres padrao (uft-8)
+                self.packets_received += 1
+                self.bytes_received += len(data)
+                if addr in self.sessions:
+                    self.sessions[addr].stats.packets_received += 1
+                    self.sessions[addr].stats.bytes_received += len(data)
+                # Decodifica os dados recebidos (o formato, binario ou JSON, eh detectado pelo primeiro byte)
+                with frame_profiler.section("rede.decodificar"):
+                    packet = codec.decode_packet(data)
                 
                 # Se for um pacote inicial de conexao
                 if packet['type'] == 'handshake':
-                    # Novo cliente pediu para conectar -> salva o endereco
-                    self.client_addr = addr
+                    session = self.sessions.get(addr)
+                    if session is None:
+                        # Novo cliente pediu para conectar -> reserva um slot de jogador
+                        slot = self._free_slot()
+                        if slot is None:
+                            print(f"Partida cheia, conexao recusada: {addr}")
+                            self._send({'type': 'handshake_refused'}, addr)
+                            continue
+                        session = self.sessions[addr] = PeerSession(addr, slot)
+                        print(f"Cliente conectado: {addr} (jogador {slot + 1})")
+                    else:
+                        # Cliente repetiu o handshake: sequencias e snapshots comecam do zero
+                        session.reset_delta_state()
+                        session.last_recv = time.time()
+                    self.handshakes += 1
                     self.connected = True # Marca como conectado
                     self.last_recv = time.time() # Atualiza o tempo da ultima mensagem recebida
-                    print(f"Cliente conectado: {addr}")
 
-                    # Envia uma resposta de handshake (uma especie de 'ACK') para confirmar conexao com o cliente
-                    self._send({'type': 'handshake'})
+                    # Envia uma resposta de handshake (uma especie de 'ACK') com o slot do jogador
+                    self._send({'type': 'handshake', 'slot': session.slot}, addr)
 
-                # Se for dados de jogo, vindo do cliente conectado
-                elif packet['type'] == 'game_data' and addr == self.client_addr:
-                    # Armazena os dados recebidos
-                    self.data = packet['payload']
+                # Se for dados de jogo, vindo de um cliente conectado
+                elif packet['type'] == 'game_data' and addr in self.sessions:
+                    session = self.sessions[addr]
                     # Atualiza o tempo da ultima mensagem recebida
-                    self.last_recv = time.time()
+                    session.last_recv = self.last_recv = time.time()
+                    # Reconstroi o snapshot (se vier como delta), descarta pacotes atrasados e coloca na fila
+                    payload = self._accept_game_data(session, packet)
 
                     # Se for um ping de heartbeat, responda de volta para manter a conexao ativa (evitar timeout)
-                    if isinstance(self.data, dict) and self.data.get('type') == 'heartbeat':
-                        self._send({'type': 'heartbeat'})
+                    if isinstance(payload, dict) and payload.get('type') == 'heartbeat':
+                        self._send({'type': 'heartbeat'}, addr)
 
-            # Se passar do tempo limite, marca como desconectado
+                # Heartbeat de medicao do RTT (ping ou resposta)
+                elif packet['type'] == 'heartbeat' and addr in self.sessions:
+                    session = self.sessions[addr]
+                    session.last_recv = self.last_recv = time.time()
+                    self._heartbeat(session, packet)
+
+            # Sem pacotes neste intervalo
             except socket.timeout:
-                # Se tiver algum cliente e passou do tempo limite
-                if self.client_addr and (time.time() - self.last_recv > TIMEOUT):
-                    print("Cliente desconectado por timeout")
-                    self.client_addr = None # Reseta o cliente
-                    self.connected = False # Marca como desconectado
-            
+                pass
+
             # Se tiver qualquer outro erro, printa ele
             except Exception as e:
                 print(f"Erro no host: {e}")
 
+            # Remove os clientes que passaram do tempo limite
+            self._expire_sessions()
+            self._update_stats()
+
+    # Remove as sessoes sem mensagens ha mais de TIMEOUT segundos (host)
+    def _expire_sessions(self):
+        now = time.time()
+        for addr, session in list(self.sessions.items()):
+            if now - session.last_recv > TIMEOUT:
+                print(f"Cliente desconectado por timeout: {addr} (jogador {session.slot + 1})")
+                del self.sessions[addr]
+        self.connected = bool(self.sessions)
+
 
     # Escuta dados recebidos em segundo plano do cliente (usando thread)
     def _receive_client(self):
@@ -251,19 +845,46 @@ class NetworkManager:
             try:
                 # Recebe dados do socket
                 data, _ = self.sock.recvfrom(MAX_PACKET_SIZE) # Define um limite de tamanho para o pacote (em bytes)
-                # Decodifica os dados JSON recebidos
-                packet = json.loads(data.decode('utf-8')) # Usa a codificacao de caracteres padrao (uft-8)
+                self.packets_received += 1
+                self.bytes_received += len(data)
+                if self.remote_addr in self.sessions:
+                    self.sessions[self.remote_addr].stats.packets_received += 1
+                    self.sessions[self.remote_addr].stats.bytes_received += len(data)
+                # Decodifica os dados recebidos (o formato, binario ou JSON, eh detectado pelo primeiro byte)
+                with frame_profiler.section("rede.decodificar"):
+                    packet = codec.decode_packet(data)
                 
                 # Se for um pacote inicial de conexao do host (uma especie de 'ACK')
                 if packet['type'] == 'handshake':
+                    slot = packet.get('slot', 1) # Slot de jogador reservado pelo host
+                    session = self.sessions.get(self.remote_addr)
+                    if session is None or slot != self.slot:
+                        # Primeira conexao, ou o host nos deu outro slot: sessao e estatisticas novas
+                        self.sessions = {self.remote_addr: PeerSession(self.remote_addr, 0)}
+                    elif not self.connected:
+                        # Reconexao com o mesmo slot: sequencias e snapshots comecam do zero (como no host)
+                        session.reset_delta_state()
+                    # Conectado, eh uma resposta repetida (ou duplicada pela rede): mantem a sessao
+                    self.slot = slot
                     self.connected = True # Marca como conectado
                     self.last_recv = time.time() # Atualiza o tempo da ultima mensagem recebida
 
+                # Host recusou a conexao (partida cheia)
+                elif packet['type'] == 'handshake_refused':
+                    print("Partida cheia")
+
                 # Se forem dados de jogo
-                elif packet['type'] == 'game_data':
-                    self.data = packet['payload'] # Guarda o dado recebido
-                    self.last_recv = time.time() # Atualiza o tempo da ultima mensagem recebida
+                elif packet['type'] == 'game_data' and self.remote_addr in self.sessions:
+                    session = self.sessions[self.remote_addr]
+                    session.last_recv = self.last_recv = time.time() # Atualiza o tempo da ultima mensagem recebida
                     self.connected = True # Marca como conectado
+                    self._accept_game_data(session, packet) # Reconstroi o snapshot (se vier como delta) e coloca na fila
+
+                # Heartbeat do host (ping de medicao do RTT, resposta a um nosso, ou resposta ao heartbeat do menu)
+                elif packet['type'] == 'heartbeat' and self.remote_addr in self.sessions:
+                    session = self.sessions[self.remote_addr]
+                    session.last_recv = self.last_recv = time.time()
+                    self._heartbeat(session, packet)
 
             # Se passar do tempo limite, marca como desconectado
             except socket.timeout:
@@ -276,4 +897,6 @@ class NetworkManager:
             
             # Para qualquer outro erro, printa ele no terminal
             except Exception as e:
-                print(f"Erro no cliente: {e}")
\ No newline at end of file
+                print(f"Erro no cliente: {e}")
+
+            self._update_stats()
\ No newline at end of file
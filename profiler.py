@@ -0,0 +1,115 @@
+### Profiler de frame do jogo (sem pyxel). Responsavel por:
+### - Medir secoes nomeadas do frame (update, draw, simulacao, rede...) com ganchos leves:
+###   with frame_profiler.section("nome"): ...
+### - Fechar cada frame (chamado no inicio do Game.update) guardando os tempos das ultimas PROFILER_WINDOW
+###   janelas e o intervalo entre frames, para o overlay (ProfilerOverlay em "states.py") mostrar medias,
+###   maximos e o histograma dos tempos de frame
+###
+### Desligado (overlay escondido), cada gancho custa uma chamada que devolve um objeto vazio. Secoes
+### medidas nas threads de rede (decodificacao dos pacotes recebidos) entram no frame em que terminaram;
+### o frame em andamento eh protegido por um lock, porque essas threads somam nele ao mesmo tempo
+
+import time
+import threading
+from collections import deque
+from config import *    # Importa constantes e configuracoes do arquivo "config.py"
+
+# Limites (ms) das faixas do histograma de tempo de frame, em relacao ao tempo de um frame no FPS
+# (a primeira faixa eh o frame no tempo, com 10% de folga); a ultima faixa eh "acima do ultimo limite"
+FRAME_BUCKETS_MS = tuple(round(1000 / FPS * factor) for factor in (1.1, 1.5, 2, 3))
+
+
+class _NullSection:
+    """Secao vazia usada com o profiler desligado."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SECTION = _NullSection()
+
+
+class _Section:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class FrameProfiler:
+    """Tempos por secao e por frame das ultimas 'window' janelas."""
+    def __init__(self, window=PROFILER_WINDOW, clock=time.perf_counter):
+        self.window = window
+        self.clock = clock
+        self.enabled = False
+        self._lock = threading.Lock()  # Protege o frame em andamento (_current)
+        self.reset()
+
+    def reset(self):
+        self.sections = {}                          # nome -> deque com o tempo (s) da secao em cada frame
+        self.frame_times = deque(maxlen=self.window)  # Intervalo (s) entre o inicio de dois frames
+        self.frames = 0                             # Frames fechados desde o reset
+        self._current = {}                          # nome -> tempo acumulado no frame em andamento
+        self._last = None                           # Inicio do frame em andamento
+
+    def set_enabled(self, enabled):
+        if enabled != self.enabled:
+            self.enabled = enabled
+            self.reset()
+
+    def section(self, name):
+        """Gancho de medicao: use em um 'with'. Uma secao pode rodar varias vezes no mesmo frame (soma)."""
+        return _Section(self, name) if self.enabled else _NULL_SECTION
+
+    def add(self, name, seconds):
+        with self._lock:
+            current = self._current
+            current[name] = current.get(name, 0.0) + seconds
+
+    def frame(self):
+        """Fecha o frame anterior e comeca um novo (chamado uma vez por frame, no inicio do Game.update)."""
+        if not self.enabled:
+            return
+        now = self.clock()
+        with self._lock:
+            current, self._current = self._current, {}
+        if self._last is not None:
+            self.frame_times.append(now - self._last)
+            for name in self.sections.keys() | current.keys():
+                history = self.sections.get(name)
+                if history is None:
+                    history = self.sections[name] = deque(maxlen=self.window)
+                history.append(current.get(name, 0.0))
+            self.frames += 1
+        self._last = now
+
+    def stats(self):
+        """nome -> (media, maximo, ultimo) em ms, na janela."""
+        return {name: (sum(history) / len(history) * 1e3, max(history) * 1e3, history[-1] * 1e3)
+                for name, history in self.sections.items() if history}
+
+    def histogram(self):
+        """Quantidade de frames da janela em cada faixa de FRAME_BUCKETS_MS (mais uma faixa para os acima)."""
+        counts = [0] * (len(FRAME_BUCKETS_MS) + 1)
+        for seconds in self.frame_times:
+            ms = seconds * 1e3
+            i = 0
+            while i < len(FRAME_BUCKETS_MS) and ms >= FRAME_BUCKETS_MS[i]:
+                i += 1
+            counts[i] += 1
+        return counts
+
+
+# Profiler do jogo, compartilhado pelos ganchos do main.py, states.py e network.py
+frame_profiler = FrameProfiler()
@@ -0,0 +1,241 @@
+### Gravacao e reproducao de partidas (replays). Responsavel por:
+### - Gravar a seed, os parametros do 'game_start', o roteiro do rio (Background.comandos) e, tick a tick,
+###   as entradas de todos os jogadores e as teclas do rio (KEY_1 a KEY_5) em um arquivo binario compacto
+### - Reproduzir o arquivo sem janela e sem audio, na velocidade maxima, conferindo os checksums gravados
+###
+### Como o mundo sai todo da seed (entities.rng_stream), a seed e as entradas bastam para refazer a partida
+### tick a tick: serve para reproduzir um bug ou um pico de desempenho depois, como teste de regressao
+### (Simulation.checksum() vai gravado a cada REPLAY_HASH_INTERVAL ticks) e como carga fixa para o profiler.
+### So partidas movidas apenas pelas entradas podem ser gravadas: singleplayer e lockstep. No modo de
+### snapshots os clientes mandam estado (posicao, tiros), e nao entradas, entao o host nao teria o que refazer
+###
+### Arquivo: cabecalho (_HEADER), slots dos jogadores, roteiro do rio e os ticks comprimidos com zlib.
+### O stream eh descarregado a cada REPLAY_FLUSH_INTERVAL ticks: se o jogo fechar no meio, o arquivo ainda
+### tem a partida ate o ultimo descarregamento. Cada tick tem:
+### - um byte de entrada por jogador (movimento e tiro, como em lockstep.encode_input)
+### - um byte com a quantidade de teclas do rio (bit 7: checksum presente; bit 6: ninguem conectado, no
+###   lockstep), os indices das teclas e, se presente, o checksum do estado antes do tick
+###
+### Para executar:
+### python replay.py ARQUIVO [--profile] [--no-check]
+
+import os
+import sys
+import time
+import zlib
+import struct
+from collections import deque
+from config import *    # Importa constantes e configuracoes do arquivo "config.py"
+from simulation import Simulation, PlayerInput, TickInput
+from lockstep import encode_input, decode_input, RIVER_COMMANDS
+
+REPLAY_MAGIC = b"RR3R"
+REPLAY_VERSION = 1
+
+# Flags do cabecalho
+_FLAG_MULTIPLAYER = 0x01
+_FLAG_HOST = 0x02
+_FLAG_RIVER = 0x04      # rio_centro e rio_largura vieram no 'game_start'
+
+# Cabecalho: magic, versao, flags, seed, rio_centro, rio_largura, slot local, quantidade de jogadores
+_HEADER = struct.Struct("<4sBBIffBB")
+# Roteiro do rio: quantidade de passos; cada passo eh o comando (0 = WAIT, 1 a 5 = KEY_1 a KEY_5) e a duracao
+_SCRIPT = struct.Struct("<H")
+_SCRIPT_STEP = struct.Struct("<BH")
+_CRC = struct.Struct("<I")
+_TICK_HASH = 0x80       # Bit do byte das teclas do rio: o checksum vem depois das teclas
+_TICK_ALONE = 0x40      # Bit do byte das teclas do rio: TickInput.peer_connected falso
+_TICK_COUNT = 0x3F      # Bits do byte das teclas do rio com a quantidade de teclas
+
+
+def _script_code(command):
+    return 0 if command == "WAIT" else RIVER_COMMANDS.index(command) + 1
+
+
+class ReplayRecorder:
+    """Grava as entradas de cada tick de uma Simulation (ligado em sim.recorder) em um arquivo."""
+    def __init__(self, path, sim, initial_rio_centro=None, initial_rio_largura=None,
+                 hash_interval=REPLAY_HASH_INTERVAL, flush_interval=REPLAY_FLUSH_INTERVAL):
+        self.path = path
+        self.local_slot = sim.local_slot
+        self.slots = tuple(p.slot for p in sim.players if p.active)  # Jogadores da partida
+        self.hash_interval = hash_interval
+        self.flush_interval = flush_interval
+        self.ticks = 0          # Ticks gravados
+        self.bytes = 0          # Bytes escritos no arquivo
+
+        flags = ((_FLAG_MULTIPLAYER if sim.is_multiplayer else 0) | (_FLAG_HOST if sim.is_host else 0) |
+                 (_FLAG_RIVER if initial_rio_centro is not None else 0))
+        header = [_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, flags, sim.seed, initial_rio_centro or 0.0,
+                               initial_rio_largura or 0.0, self.local_slot or 0, len(self.slots)),
+                  bytes(self.slots), _SCRIPT.pack(len(sim.background.comandos))]
+        header += [_SCRIPT_STEP.pack(_script_code(command), duration) for command, duration in sim.background.comandos]
+
+        self._file = open(path, "wb")
+        self._write(b"".join(header))
+        self._zlib = zlib.compressobj(9)
+        sim.recorder = self
+
+    def _write(self, data):
+        if data:
+            self._file.write(data)
+            self.bytes += len(data)
+
+    def record(self, sim, tick_input):
+        """Chamado pela Simulation no comeco de cada step, com a entrada do tick."""
+        if self._file is None:
+            return
+        inputs = dict(tick_input.players) if tick_input.players else {self.local_slot: tick_input.player}
+        keys = [RIVER_COMMANDS.index(key) for key in tick_input.river_keys if key in RIVER_COMMANDS]
+        record = bytearray(encode_input(TickInput(inputs.get(slot, PlayerInput()))) for slot in self.slots)
+        flags = 0 if tick_input.peer_connected else _TICK_ALONE
+        if sim.tick % self.hash_interval == 0:
+            record.append(len(keys) | flags | _TICK_HASH)
+            record += bytes(keys)
+            record += _CRC.pack(sim.checksum())
+        else:
+            record.append(len(keys) | flags)
+            record += bytes(keys)
+
+        self._write(self._zlib.compress(bytes(record)))
+        self.ticks += 1
+        if self.ticks % self.flush_interval == 0:
+            self._write(self._zlib.flush(zlib.Z_SYNC_FLUSH))
+            self._file.flush()
+
+    def close(self):
+        if self._file is None:
+            return
+        self._write(self._zlib.flush())
+        self._file.close()
+        self._file = None
+
+
+class Replay:
+    """Partida lida de um arquivo de replay: parametros do inicio e entradas de cada tick."""
+    def __init__(self, data):
+        magic, version, flags, self.seed, rio_centro, rio_largura, self.local_slot, n_slots = \
+            _HEADER.unpack_from(data, 0)
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError("arquivo de replay invalido ou de outra versao")
+        self.is_multiplayer = bool(flags & _FLAG_MULTIPLAYER)
+        self.is_host = bool(flags & _FLAG_HOST)
+        self.rio_centro = rio_centro if flags & _FLAG_RIVER else None
+        self.rio_largura = rio_largura if flags & _FLAG_RIVER else None
+        offset = _HEADER.size
+        self.slots = tuple(data[offset:offset + n_slots])
+        offset += n_slots
+
+        (n_steps,) = _SCRIPT.unpack_from(data, offset)
+        offset += _SCRIPT.size
+        self.script = []
+        for _ in range(n_steps):
+            code, duration = _SCRIPT_STEP.unpack_from(data, offset)
+            offset += _SCRIPT_STEP.size
+            self.script.append(("WAIT" if code == 0 else RIVER_COMMANDS[code - 1], duration))
+
+        # decompressobj aceita um stream cortado (jogo fechado no meio): fica o que foi descarregado
+        self._ticks = zlib.decompressobj().decompress(data[offset:])
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls(f.read())
+
+    def simulation(self):
+        """Simulation nova, montada como a da partida gravada."""
+        sim = Simulation(is_multiplayer=self.is_multiplayer, is_host=self.is_host, initial_seed=self.seed,
+                         initial_rio_centro=self.rio_centro, initial_rio_largura=self.rio_largura,
+                         local_slot=self.local_slot,
+                         lockstep_slots=list(self.slots) if self.is_multiplayer else None)
+        sim.background.comandos = deque(self.script)
+        return sim
+
+    def ticks(self):
+        """Gera (TickInput, checksum do estado antes do tick ou None) para cada tick gravado."""
+        data = self._ticks
+        n_slots = len(self.slots)
+        offset = 0
+        while offset + n_slots < len(data):
+            players = tuple((slot, decode_input(bits)[0]) for slot, bits in zip(self.slots, data[offset:offset + n_slots]))
+            offset += n_slots
+            count = data[offset] & _TICK_COUNT
+            has_hash = data[offset] & _TICK_HASH
+            peer_connected = not data[offset] & _TICK_ALONE
+            end = offset + 1 + count + (_CRC.size if has_hash else 0)
+            if end > len(data):
+                return  # Ultimo tick incompleto
+            river_keys = tuple(RIVER_COMMANDS[i] for i in data[offset + 1:offset + 1 + count])
+            crc = _CRC.unpack_from(data, end - _CRC.size)[0] if has_hash else None
+            offset = end
+            if self.is_multiplayer:
+                local = dict(players).get(self.local_slot, PlayerInput())
+                yield TickInput(local, river_keys, peer_connected, players), crc
+            else:
+                yield TickInput(players[0][1], river_keys), crc
+
+
+def play(replay, check=True):
+    """Refaz a partida na velocidade maxima. Retorna os ticks, o tempo e os checksums conferidos/diferentes."""
+    sim = replay.simulation()
+    ticks = checks = mismatches = 0
+    first_mismatch = None
+    start = time.perf_counter()
+    for tick_input, crc in replay.ticks():
+        if check and crc is not None:
+            checks += 1
+            if sim.checksum() != crc:
+                mismatches += 1
+                if first_mismatch is None:
+                    first_mismatch = sim.tick
+        sim.step(tick_input)
+        ticks += 1
+    elapsed = time.perf_counter() - start
+    return {
+        'ticks': ticks,
+        'seconds': elapsed,
+        'ticks_per_second': ticks / elapsed if elapsed else 0.0,
+        'checks': checks,
+        'mismatches': mismatches,
+        'first_mismatch': first_mismatch,
+        'checksum': sim.checksum(),
+    }
+
+
+def new_replay_path(seed):
+    """Caminho de um arquivo novo em REPLAY_DIR (criada se preciso)."""
+    os.makedirs(REPLAY_DIR, exist_ok=True)
+    return os.path.join(REPLAY_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{seed}.rr3")
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if not args:
+        print("uso: python replay.py ARQUIVO [--profile] [--no-check]")
+        return 2
+    replay = Replay.load(args[0])
+    check = "--no-check" not in sys.argv
+    mode = "lockstep" if replay.is_multiplayer else "singleplayer"
+    print(f"{args[0]}: {mode}, seed {replay.seed}, jogadores {[slot + 1 for slot in replay.slots]}")
+
+    if "--profile" in sys.argv:
+        import cProfile
+        import pstats
+        profiler = cProfile.Profile()
+        result = profiler.runcall(play, replay, check)
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+    else:
+        result = play(replay, check)
+
+    print(f"{result['ticks']} ticks em {result['seconds']:.2f} s ({result['ticks_per_second']:.0f} ticks/s), "
+          f"checksum final {result['checksum']:08x}")
+    if result['mismatches']:
+        print(f"DIVERGIU: {result['mismatches']} de {result['checks']} checksums diferentes "
+              f"(primeiro no tick {result['first_mismatch']})")
+        return 1
+    print(f"{result['checks']} checksums conferidos, todos iguais")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
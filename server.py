@@ -0,0 +1,183 @@
+### Servidor dedicado do River Raid 3 (sem janela, sem audio)
+### Roda a simulacao autoritativa (simulation.py) a FPS ticks por segundo, aceita clientes pelo
+### mesmo handshake UDP do host (network.py) e envia os snapshots para eles.
+### Os clientes usam o menu normal do jogo: Multiplayer -> Conectar, com o IP e a porta do servidor.
+### O servidor nao tem jogador proprio: os clientes ocupam os slots 1 ate MAX_PLAYERS - 1
+###
+### Fluxo:
+### 1. Aguardando: espera o handshake de um cliente
+### 2. Lobby: reenvia o 'game_start' ate o cliente entrar no jogo e mandar o primeiro snapshot
+###    (quem conecta com a partida em andamento passa pelo mesmo lobby e entra no meio dela)
+### 3. Jogando: a cada tick aplica o snapshot de cada cliente, avanca a simulacao e envia o estado
+### 4. Fim de jogo (ou todos desconectados): volta a aguardar um novo handshake
+###
+### Para executar:
+### python server.py [--port PORTA] [--send-rate SNAPSHOTS_POR_SEGUNDO] [--impair CENARIO]
+### OU
+### make server
+
+# Bibliotecas
+import time
+import argparse
+from network import NetworkManager, SendTimer, IMPAIRMENT_SCENARIOS  # Conexao UDP (mesmo protocolo do host)
+from simulation import *            # Nucleo da simulacao (sem pyxel)
+from config import *                # Importa todas as configuracoes definidas em config.py
+
+STATS_INTERVAL = 5.0  # Segundos entre as linhas de estatistica no terminal
+
+
+class DedicatedServer:
+    def __init__(self, port=NETWORK_PORT, send_rate=NETWORK_SEND_RATE, impairment=NETWORK_IMPAIRMENT):
+        self.network = NetworkManager(port, impairment=impairment)
+        # A taxa de ticks eh sempre a do jogo: velocidades e temporizadores da simulacao sao contados em
+        # ticks de 1/FPS, entao outra taxa mudaria a velocidade da partida em relacao aos clientes
+        self.tick_rate = FPS
+        self.tick_interval = 1.0 / FPS
+        self.send_rate = min(send_rate, FPS)
+        self.send_timer = SendTimer(send_rate, FPS)
+        self.sim = None                 # Simulacao da partida atual (None fora de jogo)
+        self.phase = "waiting"          # "waiting", "lobby" ou "playing"
+        self._handshakes = 0            # Ultimo handshake tratado (ver NetworkManager.handshakes)
+        self._start_data = None         # Pacote 'game_start' da partida em preparacao
+        self._snapshots = {}            # Ultimo snapshot recebido de cada cliente na partida atual: slot -> snapshot
+
+        # Estatisticas (tempo gasto por tick, ticks atrasados)
+        self.ticks = 0
+        self.late_ticks = 0
+        self._busy_time = 0.0
+        self._stats_ticks = 0
+        self._stats_time = time.perf_counter()
+        self._stats_traffic = self.network.traffic()
+
+    # Prepara uma nova partida e passa para o lobby
+    def _new_match(self):
+        self.sim = Simulation(is_multiplayer=True, is_host=True, local_player=False)
+        self._start_data = {
+            'type': 'game_start',
+            'seed': self.sim.seed,  # Semente aleatória
+            'rio_centro': self.sim.background.centro_rio_x,        # Posição do rio
+            'rio_largura': self.sim.background.largura_rio         # Largura do rio
+        }
+        # Ignora o que os clientes mandaram antes da nova partida
+        self._snapshots = {}
+        self.phase = "lobby"
+
+    def _end_match(self, reason):
+        print(f"Partida encerrada ({reason}) apos {self.sim.tick} ticks")
+        self.sim = None
+        self.phase = "waiting"
+
+    # Um tick do servidor
+    def tick(self):
+        network = self.network
+        messages = network.drain()
+
+        if self.phase == "waiting":
+            if network.connected and network.handshakes != self._handshakes:
+                self._handshakes = network.handshakes
+                self._new_match()
+                print(f"{len(network.sessions)} cliente(s) conectado(s), aguardando entrar no jogo")
+            return
+
+        if not network.connected:
+            self._end_match("clientes desconectados")
+            return
+
+        # Clientes que ja estao no jogo (mandaram snapshot); os outros recebem o 'game_start'
+        fresh = {}
+        for message in messages:
+            data = message.payload
+            if isinstance(data, dict) and data.get('type') == 'game_update':
+                fresh[message.slot] = data
+        slots = network.peer_slots()
+        self._snapshots.update(fresh)
+        for slot in self._snapshots.keys() - slots:
+            del self._snapshots[slot]  # Cliente desconectado
+        ready = self._snapshots.keys()
+        for slot in slots - ready:
+            network.send_to(slot, self._start_data)
+
+        if self.phase == "lobby":
+            if not ready:
+                return
+            self.phase = "playing"
+            print("Partida iniciada")
+
+        # Jogando: mesmo ciclo do GameState (recebe, simula, envia)
+        for slot, data in fresh.items():
+            self.sim.apply_snapshot(data, slot)
+        self.sim.sync_peers(ready)
+        self.sim.step(TickInput(peer_connected=network.connected))
+        if self.send_timer.due():
+            snapshot = self.sim.snapshot()
+            for slot in ready:
+                network.send_to(slot, snapshot)
+
+        if self.sim.finished:
+            self._end_match("fim de jogo")
+            # So aceita uma nova partida apos um novo handshake
+            self._handshakes = network.handshakes
+
+    def _print_stats(self, now):
+        elapsed = now - self._stats_time
+        traffic = self.network.traffic()
+        if self._stats_ticks:
+            busy_ms = self._busy_time / self._stats_ticks * 1000
+            sent_pkts, sent_bytes, recv_pkts, recv_bytes = (
+                (now_value - old) / elapsed for now_value, old in zip(traffic, self._stats_traffic))
+            print(f"[{self.phase}] {self._stats_ticks / elapsed:.1f} ticks/s, "
+                  f"{busy_ms:.3f} ms/tick, {self.late_ticks} ticks atrasados, "
+                  f"envio {sent_pkts:.0f} pacotes/s {sent_bytes / 1024:.1f} kB/s, "
+                  f"recebimento {recv_pkts:.0f} pacotes/s {recv_bytes / 1024:.1f} kB/s")
+        self._stats_traffic = traffic
+        self._stats_ticks = 0
+        self._busy_time = 0.0
+        self._stats_time = now
+
+    # Laco principal com taxa de ticks fixa
+    def run(self, max_ticks=None):
+        if not self.network.start_host():
+            print("Nao foi possivel iniciar o servidor")
+            return
+        print(f"Servidor em {self.network.local_ip}:{self.network.port} a {self.tick_rate} ticks/s, "
+              f"{self.send_rate} snapshots/s")
+
+        next_tick = time.perf_counter()
+        try:
+            while max_ticks is None or self.ticks < max_ticks:
+                start = time.perf_counter()
+                self.tick()
+                end = time.perf_counter()
+                self.ticks += 1
+                self._stats_ticks += 1
+                self._busy_time += end - start
+
+                if end - self._stats_time >= STATS_INTERVAL:
+                    self._print_stats(end)
+
+                next_tick += self.tick_interval
+                delay = next_tick - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    # Atrasou: segue sem tentar recuperar os ticks perdidos
+                    self.late_ticks += 1
+                    next_tick = time.perf_counter()
+        except KeyboardInterrupt:
+            print("Servidor encerrado")
+        finally:
+            self.network.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor dedicado do River Raid 3")
+    parser.add_argument("--port", type=int, default=NETWORK_PORT, help="porta UDP do servidor")
+    parser.add_argument("--send-rate", type=int, default=NETWORK_SEND_RATE, help="snapshots enviados por segundo")
+    parser.add_argument("--impair", choices=sorted(IMPAIRMENT_SCENARIOS), default=NETWORK_IMPAIRMENT,
+                        help="simula uma rede ruim (atraso, perda, duplicacao, reordenacao) nos pacotes do servidor")
+    args = parser.parse_args()
+    DedicatedServer(args.port, args.send_rate, args.impair).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,872 @@
+### Nucleo da simulacao do jogo (sem janela, sem audio, sem teclado). Responsavel por:
+### - Guardar todo o estado da partida (jogadores, cenario, tiros, barcos, bombas, explosoes)
+### - Avancar um tick a partir de uma entrada (TickInput) e devolver os eventos gerados
+### - Montar e aplicar os snapshots trocados pela rede
+###
+### Nada aqui chama o pyxel: a leitura do teclado, os sons e o desenho ficam no adaptador
+### (GameState em "states.py"), que traduz as teclas em TickInput e os eventos em pyxel.play.
+### Assim a simulacao roda em servidores, testes e benchmarks sem abrir janela
+###
+### Os jogadores ficam em uma lista indexada pelo slot (0 = host, clientes nos slots seguintes,
+### ate MAX_PLAYERS). Colisoes, gasolina, mortes e HUD percorrem a lista, entao escalam com a
+### quantidade de jogadores. O host eh autoritario para todos; cada cliente pilota apenas o seu
+###
+### Predicao no cliente: cada tick o cliente move o seu aviao na hora e guarda o comando de movimento
+### com um numero de sequencia. Os comandos ainda nao confirmados vao em todo snapshot do cliente; o host
+### aplica os novos ao jogador daquele slot e devolve no snapshot ('input_seq') o ultimo que processou.
+### Ao receber o snapshot, o cliente parte da posicao do host e reaplica os comandos posteriores (reconcile)
+###
+### Lockstep (lockstep.py): todas as maquinas rodam a simulacao autoritativa a partir da mesma seed e aplicam,
+### tick a tick, as entradas de todos os jogadores (TickInput.players). Nada de snapshot: o checksum() do estado
+### eh comparado entre as maquinas para detectar dessincronizacao
+###
+### Eventos sao tuplas cujo primeiro elemento eh o tipo:
+### - (EVENT_SOUND, canal, som)          -> som a ser tocado localmente
+### - (EVENT_EXPLOSION, x, y)            -> explosao criada
+### - (EVENT_HIT, slot)                  -> jogador perdeu uma vida
+### - (EVENT_DEATH, slot)                -> jogador explodiu (sem vidas)
+### - (EVENT_DEATH_DELAY,)               -> todos morreram: comeca o delay antes do game over (para a musica)
+### - (EVENT_GAME_OVER,)                 -> comeca a tela de fim de jogo
+### - (EVENT_GAME_END,)                  -> fim da tela de fim de jogo (voltar ao menu)
+
+import struct
+import zlib
+from collections import namedtuple, deque
+from config import *    # Importa constantes e configuracoes do arquivo "config.py"
+from entities import *  # Importa as classes de entidades do jogo (jogador, arvores, etc.)
+from map_generator import Background
+from spatial import SpatialHash   # Grade uniforme das consultas de colisao
+from entity_store import EntityStore   # Colunas das entidades recebidas pela rede
+import aabb                       # Colisoes em lote com o NumPy (opcional)
+
+# Tipos de evento
+EVENT_SOUND = 'sound'
+EVENT_EXPLOSION = 'explosion'
+EVENT_HIT = 'hit'
+EVENT_DEATH = 'death'
+EVENT_DEATH_DELAY = 'death_delay'
+EVENT_GAME_OVER = 'game_over'
+EVENT_GAME_END = 'game_end'
+
+# Entrada do jogador local em um tick ('fire' eh o aperto da tecla, nao a tecla segurada)
+PlayerInput = namedtuple('PlayerInput', ['left', 'right', 'up', 'down', 'fire'], defaults=[False] * 5)
+
+# Entrada completa de um tick:
+# - player: PlayerInput do jogador local
+# - river_keys: comandos de controle do rio apertados neste tick ("KEY_1" ... "KEY_5")
+# - peer_connected: se ha outro jogador conectado (decide o game over no multiplayer)
+# - players: lockstep, pares (slot, PlayerInput) de todos os jogadores em ordem de slot (substitui 'player')
+TickInput = namedtuple('TickInput', ['player', 'river_keys', 'peer_connected', 'players'],
+                       defaults=[PlayerInput(), (), True, ()])
+
+INVINCIBILITY_DURATION = 90  # Duração em frames (1.5s a 60FPS)
+
+# Bits das teclas de movimento nos comandos enviados ao host
+_INPUT_LEFT = 0x01
+_INPUT_RIGHT = 0x02
+_INPUT_UP = 0x04
+_INPUT_DOWN = 0x08
+
+
+def _input_bits(player_input):
+    return ((_INPUT_LEFT if player_input.left else 0) | (_INPUT_RIGHT if player_input.right else 0) |
+            (_INPUT_UP if player_input.up else 0) | (_INPUT_DOWN if player_input.down else 0))
+
+
+def _input_from_bits(bits):
+    return PlayerInput(left=bool(bits & _INPUT_LEFT), right=bool(bits & _INPUT_RIGHT),
+                       up=bool(bits & _INPUT_UP), down=bool(bits & _INPUT_DOWN))
+
+# Os tiros dos clientes sao repassados pelo host aos outros clientes. O slot do dono vai nos bits
+# altos do ID para que tiros de maquinas diferentes nunca tenham o mesmo ID
+_SHOT_ID_SLOT_SHIFT = 24
+
+# Explosoes que nasceram e acabaram entre dois envios (taxa de envio menor que o FPS) vao no
+# snapshot seguinte com este timer, para ainda aparecerem nos clientes
+_LATE_EXPLOSION_FRAMES = 4
+
+
+class Simulation:
+    def __init__(self, is_multiplayer=False, is_host=False, initial_seed=None, initial_rio_centro=None, initial_rio_largura=None,
+                 local_player=True, local_slot=None, max_players=MAX_PLAYERS, lockstep_slots=None):
+        self.is_multiplayer = is_multiplayer  # Flag para modo multiplayer
+        self.is_host = is_host  # Flag para identificar se é o host
+        self.lockstep = lockstep_slots is not None  # Todos simulam a partida (ver lockstep.py)
+        self.peer_connected = True  # Atualizado a cada tick pelo TickInput
+        self.tick = 0  # Numero de ticks simulados
+        self.recorder = None  # Gravador de replay (replay.ReplayRecorder), recebe a entrada de cada tick
+
+        # Eventos gerados desde o ultimo pop_events
+        self.events = []
+
+        # Fim de jogo
+        self.death_delay = False        # Verifica se estah aguardando para entrar no game over
+        self.death_delay_timer = 0      # quantos frames faltam para o delay de morte acabar
+        self.game_over = False          # flag de fim de jogo
+        self.game_over_timer = 0        # temporizador em frames
+        self.finished = False           # a tela de fim de jogo acabou
+
+        # Fila de sons que a instancia vai enviar aos outros (cliente para servidor ou servidor para clientes)
+        self.pending_sounds = []
+
+        # Jogadores por slot. O host (ou singleplayer) fica no slot 0; o cliente recebe o slot no handshake
+        n_slots = max_players if is_multiplayer else 1
+        self.players = [Player(slot, *PLAYER_SPAWNS[slot % len(PLAYER_SPAWNS)]) for slot in range(n_slots)]
+        if local_slot is None:
+            local_slot = 0 if (is_host or not is_multiplayer) else 1
+        # Jogador pilotado nesta maquina (None no servidor dedicado, que nao tem jogador proprio)
+        self.local_slot = local_slot if local_player else None
+        self.player = self.players[local_slot] if local_player else None
+        if self.player is not None:
+            self.player.active = True
+        for slot in lockstep_slots or ():
+            self.players[slot].active = True
+
+        # Predicao (cliente): comandos de movimento ainda nao confirmados pelo host, (sequencia, bits)
+        self.input_seq = 0
+        self.pending_inputs = deque(maxlen=INPUT_BUFFER_SIZE)
+        self.prediction_corrections = 0   # Snapshots em que a posicao prevista estava errada
+        self.prediction_error = 0.0       # Tamanho (px) da ultima correcao
+
+        # Seed da partida: arvores, sprites, barcos e bombas sorteiam cada um com um gerador proprio
+        # derivado dela (entities.rng_stream), sem usar o random global. O cliente recebe a do host
+        self.seed = new_seed() if initial_seed is None else initial_seed
+
+        # Inicializa o cenário de fundo (no lockstep, todos movem o rio e as árvores como o host)
+        self.background = Background(is_host=is_host or self.lockstep, is_multiplayer=is_multiplayer, seed=self.seed)
+        self.INVINCIBILITY_DURATION = INVINCIBILITY_DURATION
+
+        if initial_rio_centro and not is_host:
+            # Sincroniza a posição do rio para clientes
+            self.background.centro_rio_x = initial_rio_centro
+            self.background.target_centro_x = initial_rio_centro
+
+        if initial_rio_largura is not None and not is_host:
+            self.background.largura_rio     = initial_rio_largura
+            self.background.target_largura  = initial_rio_largura
+
+        if is_multiplayer and not is_host and not self.lockstep:  # Apenas clientes multiplayer não atualizam
+            self.background.tree_manager.update_arvores = lambda _: None  # Desabilita atualização de árvores para clientes
+
+        # Pools de tiros e explosoes: as entidades que saem do jogo voltam para o pool e sao reaproveitadas
+        self.shot_pool = EntityPool(Shot, SHOT_POOL_SIZE)
+        self.explosion_pool = EntityPool(Explosion, EXPLOSION_POOL_SIZE)
+
+        # lista de tiros locais e da outra tela
+        self.shots = []          # tiros deste jogador
+        self.remote_shots = []   # tiros vindos pela rede
+
+        self.explosions = []   # lista de Explosion ativos
+        self._unsent_explosions = []  # explosoes criadas desde o ultimo snapshot
+        self.remote_explosions = []  # explosões vindas pela rede
+
+        self.boat_manager = BoatManager(self.background, rng=rng_stream(self.seed, 'barcos'))  # barcos locais (host gera)
+        self.remote_boats = []                             # barcos sincronizados via rede
+
+        # Bombas de gasolina (host gera; clientes sincronizam)
+        # Bombas: host gera, precisa também do boat_manager pra checar barcos
+        self.bomb_manager = GasolineBombManager(self.background,
+                                                self.boat_manager,
+                                                max_bombs=5,
+                                                spawn_interval_s=1,
+                                                rng=rng_stream(self.seed, 'bombas'))
+        self.remote_bombs = []
+
+        # Registros das entidades vindas pela rede: cada pacote atualiza as entidades no lugar,
+        # pelo ID de rede, em vez de recriar as listas (ver entities.EntityRegistry).
+        # No host, tiros e explosoes tem um registro por cliente (slot)
+        self.remote_shot_registry = EntityRegistry(Shot, pool=self.shot_pool)
+        self.remote_explosion_registry = EntityRegistry(Explosion, pool=self.explosion_pool)
+        self.remote_boat_registry = EntityRegistry(Boat, EntityStore())
+        self.remote_bomb_registry = EntityRegistry(GasolineBomb, EntityStore())
+        # Grades de colisao, reconstruidas a cada tick (ver _update_world)
+        self.spatial_hash = SPATIAL_HASH
+        self.tree_grid = SpatialHash()
+        self.boat_grid = SpatialHash()
+        self.bomb_grid = SpatialHash()
+        self.numpy_collisions = NUMPY_COLLISIONS and aabb.HAS_NUMPY
+
+        self._peer_registries = {}   # slot -> (registro de tiros, registro de explosoes)
+        self._peer_entities = {}     # slot -> (tiros, explosoes) do ultimo snapshot do cliente
+
+    @property
+    def is_authority(self):
+        """Host, singleplayer ou lockstep: quem decide vidas, gasolina e destruicao das entidades."""
+        return self.is_host or not self.is_multiplayer or self.lockstep
+
+    @property
+    def active_players(self):
+        return [p for p in self.players if p.active]
+
+    # Estatisticas dos pools (acertos, pico de uso...), para dimensionar SHOT_POOL_SIZE e EXPLOSION_POOL_SIZE
+    def pool_stats(self):
+        return {'shots': self.shot_pool.stats(), 'explosions': self.explosion_pool.stats()}
+
+    # Troca a seed da partida (cliente recebendo a do host): recria os geradores de cada subsistema e as arvores
+    def reseed(self, seed):
+        self.seed = seed
+        self.background.tree_manager.reseed(seed)
+        self.boat_manager.rng = rng_stream(seed, 'barcos')
+        self.bomb_manager.rng = rng_stream(seed, 'bombas')
+
+    # ——— Eventos ———
+    def _emit(self, *event):
+        self.events.append(event)
+
+    def _play(self, channel, sound):
+        self.events.append((EVENT_SOUND, channel, sound))
+
+    def _explode(self, x, y, duration):
+        explosion = self.explosion_pool.acquire(x, y, 16, 16, 16, 16, duration=duration)
+        self.explosions.append(explosion)
+        if self.is_multiplayer:
+            explosion.unsent = True
+            self._unsent_explosions.append(explosion)
+        self.events.append((EVENT_EXPLOSION, x, y))
+
+    def pop_events(self):
+        """Retorna e limpa os eventos acumulados (tick e snapshots aplicados)."""
+        events = self.events
+        self.events = []
+        return events
+
+    # Avanca a simulacao um tick e retorna os eventos gerados
+    def step(self, tick_input=TickInput()):
+        if self.recorder is not None:
+            self.recorder.record(self, tick_input)
+        self.tick += 1
+        self.peer_connected = tick_input.peer_connected
+        self.background.update(tick_input.river_keys)
+
+        # Se estiver em Game Over, apenas decrementa o timer
+        if self.game_over:
+            self.game_over_timer -= 1
+            if self.game_over_timer <= 0 and not self.finished:
+                self.finished = True
+                self._emit(EVENT_GAME_END)
+            return self.pop_events()
+
+        # Se estiver no “delay de morte”, decrementa o seu timer,
+        # mas continuar rodando o jogo normalmente ateh acabar o timer:
+        if self.death_delay:
+            self.death_delay_timer -= 1
+            if self.death_delay_timer <= 0:
+                # passado o delay, o Game Over eh ativado
+                self.death_delay      = False
+                self.game_over        = True
+                self.game_over_timer  = 5 * FPS   # 5 segundos de tela preta
+                self._play(0, 1) # Som de fim de jogo
+                self._emit(EVENT_GAME_OVER)
+
+        if tick_input.players:
+            # Lockstep: todos os jogadores, sempre na mesma ordem em todas as maquinas
+            for slot, player_input in tick_input.players:
+                self.apply_player_input(player_input, self.players[slot])
+        elif self.player is not None:
+            self.apply_player_input(tick_input.player)
+
+        # ——— Consumo de gasolina (apenas no host ou singleplayer) ———
+        consumption = FUEL_CONSUMPTION_RATE / FPS
+        if self.is_authority:
+            # host autoritário: consome para todos os jogadores
+            for p in self.players:
+                if p.active:
+                    p.fuel = max(0, p.fuel - consumption)
+
+        self._update_world()
+        if self.lockstep:
+            self._clear_outbox()  # Nada vai pela rede alem das entradas
+        return self.pop_events()
+
+    # Avanca o mundo com o jogo pausado (multiplayer: os outros jogadores continuam jogando)
+    def step_paused(self, tick_input=TickInput()):
+        self.peer_connected = tick_input.peer_connected
+        if self.is_multiplayer:
+            # mantém o scroll do rio e o resto do mundo andando
+            self.background.update()
+            self._update_world()
+        return self.pop_events()
+
+    # Move o jogador (o local, ou o do slot no lockstep) e cria os tiros
+    def apply_player_input(self, player_input, player=None):
+        player = player or self.player
+        self.move_player(player, player_input)
+
+        # Cliente: guarda o comando para o host e para a reconciliacao
+        if self.is_multiplayer and not self.is_host and not self.lockstep:
+            self.input_seq += 1
+            self.pending_inputs.append((self.input_seq, _input_bits(player_input)))
+
+        # Disparo: cria um tiro quando apertar o botao de tiro
+        if player_input.fire and (not self.death_delay and not self.game_over) and player.lives > 0:
+            # inicia no centro horizontal do avião, um pouco acima dele
+            shot_x = player.x + PLAYER_WIDTH // 2 - 1
+            shot_y = player.y
+            self.shots.append(self.shot_pool.acquire(shot_x, shot_y, owner=player.slot))
+            if player is self.player:
+                self._play(0, 0) # Som de tiro
+                self.pending_sounds.append((0, 0)) # Envia para Cliente/Servidor o som de tiro
+
+    # Movimento de um tick (mesma regra no cliente, na predicao, e no host, ao processar os comandos)
+    @staticmethod
+    def move_player(player, player_input):
+        if player_input.left:
+            player.x -= PLAYER_SPEED  # Move para esquerda
+        if player_input.right:
+            player.x += PLAYER_SPEED  # Move para direita
+        if player_input.up:
+            player.y -= PLAYER_SPEED  # Move para cima
+        if player_input.down:
+            player.y += PLAYER_SPEED  # Move para baixo
+
+        # Limites da tela
+        player.x = max(0, min(player.x, SCREEN_WIDTH - PLAYER_WIDTH))
+
+        game_area_height = SCREEN_HEIGHT - HUD_HEIGHT
+        player.y = max(0, min(player.y, game_area_height - PLAYER_HEIGHT))
+
+    # Timers, tiros, explosoes, barcos, bombas e colisoes (comum ao jogo e ao pause)
+    def _update_world(self):
+        # Atualiza temporizadores de invencibilidade
+        for p in self.players:
+            if p.invincible > 0:
+                p.invincible -= 1
+
+        self.update_shots()
+
+        # local (as que acabaram voltam para o pool; as que ainda nao foram enviadas voltam em snapshot)
+        for exp in self.explosions:
+            exp.update()
+        alive = []
+        for exp in self.explosions:
+            if not exp.is_dead():
+                alive.append(exp)
+            elif not exp.unsent:
+                self.explosion_pool.release(exp)
+        self.explosions = alive
+
+        # remota
+        for exp in self.remote_explosions:
+            exp.update()
+        self.remote_explosions = [
+            e for e in self.remote_explosions if not e.is_dead()
+        ]
+
+        # atualiza barcos (host gera; ambos movem)
+        self.boat_manager.update()
+        # recebe remote_boats já populada em apply_snapshot
+        self.remote_boat_registry.store.advance()
+
+        # Grades de colisao do tick: arvores e barcos ja se moveram (as bombas entram depois de se moverem)
+        if self.spatial_hash:
+            self.tree_grid.rebuild(self.background.tree_manager.arvores)
+            self.boat_grid.rebuild(self.boat_manager.boats if self.is_authority else self.remote_boats)
+
+        # --- Bombas de gasolina ---
+        if self.is_authority:
+            # host/singleplayer: gera, move e trata colisões
+            self.bomb_manager.update((self.tree_grid, self.boat_grid) if self.spatial_hash else None)
+        else:
+            # cliente: apenas move visualmente as bombas vindas do host
+            self.remote_bomb_registry.store.advance()
+        if self.spatial_hash:
+            self.bomb_grid.rebuild(self.bomb_manager.bombs if self.is_authority else self.remote_bombs)
+
+        # Verificação de colisões
+        self.check_all_collisions()
+
+        # Sem ninguém conectado, nenhum snapshot vai sair: descarta sons e explosões que esperavam o envio
+        # (senão as filas crescem sem limite e as explosões mortas nunca voltam ao pool)
+        if self.is_multiplayer and not self.peer_connected:
+            self._clear_outbox()
+
+    # Aplica um acerto (arvore ou barco) ao jogador.
+    # O som toca na maquina de quem pilota o jogador; os outros recebem pela rede
+    def _hit_player(self, player):
+        player.lives = max(0, player.lives - 1)  # Reduz a vida do jogador
+        player.invincible = self.INVINCIBILITY_DURATION  # Ativa o timer de invencibilidade
+        self._emit(EVENT_HIT, player.slot)
+        if not self.death_delay and not self.game_over and player.lives > 0:  # Se não está em game over e ainda tem vidas
+            if player is self.player:
+                self._play(1, 2)  # Toca o som de colisão
+            if self.is_multiplayer:
+                self.pending_sounds.append((1, 2))  # Adiciona o som na fila de sons pendentes
+
+    # Verifica se a hitbox (left, top, right, bottom) encosta em alguma entidade visivel da lista
+    @staticmethod
+    def _touches_any(box, entities):
+        left, top, right, bottom = box
+        for entity in entities:
+            if not entity.visible:
+                continue
+            e_left, e_top, e_right, e_bottom = entity.hitbox
+            if right > e_left and left < e_right and bottom > e_top and top < e_bottom:
+                return entity
+        return None
+
+    # Entidades que podem encostar na caixa: as da grade (celulas que a caixa toca) ou a lista toda
+    def _nearby(self, grid, entities, box):
+        return grid.query(box) if self.spatial_hash else entities
+
+    # Tiros x alvos de uma vez com o NumPy: tiro -> primeiro alvo que ele acerta
+    # ('consume': o alvo acertado sai do jogo para os tiros seguintes). None com o motor NumPy desligado
+    def _batch_shot_hits(self, shot_lists, targets, inset, consume):
+        if not self.numpy_collisions:
+            return None
+        shots = [shot for shot_list in shot_lists for shot in shot_list]
+        pairs = aabb.first_hits(aabb.box_array(shots, aabb.SHOT_INSET), aabb.box_array(targets, inset),
+                                aabb.visible_mask(targets), consume)
+        return {id(shots[i]): targets[j] for i, j in pairs}
+
+    # Primeiro alvo visivel que o tiro acerta: do resultado em lote ou consultando a grade (ou a lista)
+    def _shot_target(self, shot, hits, grid, targets):
+        if hits is not None:
+            return hits.get(id(shot))
+        s_box = (shot.x, shot.y, shot.x + shot.width, shot.y + shot.height)
+        return self._touches_any(s_box, self._nearby(grid, targets, s_box))
+
+    # Jogadores x arvores e barcos de uma vez com o NumPy: slot -> encostou em algum.
+    # None com o motor NumPy desligado
+    def _batch_player_hazards(self, players, boats):
+        if not self.numpy_collisions:
+            return None
+        arvores = self.background.tree_manager.arvores
+        tree_hits = aabb.any_hits(aabb.box_array(players, aabb.PLAYER_TREE_INSET, PLAYER_WIDTH, PLAYER_HEIGHT),
+                                  aabb.box_array(arvores, aabb.TREE_INSET), aabb.visible_mask(arvores))
+        boat_hits = aabb.any_hits(aabb.box_array(players, aabb.PLAYER_INSET, PLAYER_WIDTH, PLAYER_HEIGHT),
+                                  aabb.box_array(boats, aabb.BOAT_INSET), aabb.visible_mask(boats))
+        return {p.slot: bool(tree_hit or boat_hit) for p, tree_hit, boat_hit in zip(players, tree_hits, boat_hits)}
+
+    # Aviao sobre a margem do rio (mesma tabela de margens no host e na predicao do cliente).
+    # A margem so conta depois que o aviao esteve inteiro sobre a agua: alguns pontos de
+    # nascimento (PLAYER_SPAWNS) ficam em cima da margem ou em terra
+    def _bank_hit(self, player):
+        if not BANK_COLLISION:
+            return False
+        table = self.background.obter_tabela_margens(PLAYER_HEIGHT - 2 * BANK_INSET)
+        on_bank = table.on_bank(player.x + BANK_INSET, player.y + BANK_INSET,
+                                player.x + PLAYER_WIDTH - BANK_INSET)
+        if not on_bank:
+            player.over_river = True
+        return on_bank and player.over_river
+
+    # Tira o tiro da lista. Os tiros locais voltam para o pool; os remotos sao dos registros
+    def _remove_shot(self, shot_list, shot):
+        shot_list.remove(shot)
+        if shot_list is self.shots:
+            self.shot_pool.release(shot)
+
+    # Método para verificar colisões
+    def check_all_collisions(self):
+        arvores = self.background.tree_manager.arvores
+        tree_grid = self.tree_grid
+
+        if self.is_authority:
+            # ----- Host (ou singleplayer) processa colisões de todos os jogadores -----
+            players = [p for p in self.players if p.alive]
+            hazards = self._batch_player_hazards(players, self.boat_manager.boats)
+            for p in players:
+                on_bank = self._bank_hit(p)
+                if hazards is not None:
+                    if p.invincible <= 0 and (hazards[p.slot] or on_bank):
+                        self._hit_player(p)
+                    continue
+                if p.invincible <= 0:  # Verifica se o jogador não está invencível
+                    near_trees = self._nearby(tree_grid, arvores, p.hitbox)
+                    if check_tree_collision(p.x, p.y, near_trees, f"Jogador {p.slot + 1}") > 0:  # Verifica colisão com as árvores
+                        self._hit_player(p)
+                if p.invincible <= 0 and self._touches_any(
+                        p.hitbox, self._nearby(self.boat_grid, self.boat_manager.boats, p.hitbox)):
+                    self._hit_player(p)
+                if p.invincible <= 0 and on_bank:  # Margem do rio
+                    self._hit_player(p)
+
+        # ----- Cliente apenas toca som local e gerencia o timer do seu jogador -----
+        else:
+            p = self.player
+            on_bank = p is not None and self._bank_hit(p)
+            if p is not None and p.invincible <= 0:  # Verifica se o jogador não está invencível
+                hazards = self._batch_player_hazards([p], self.remote_boats)
+                if hazards is not None:
+                    hit = hazards[p.slot]
+                else:
+                    colisoes = check_tree_collision(  # Verifica colisão do jogador com as árvores
+                        p.x, p.y, self._nearby(tree_grid, arvores, p.hitbox), f"Jogador {p.slot + 1}"
+                    )
+                    hit = colisoes > 0 or self._touches_any(
+                        p.hitbox, self._nearby(self.boat_grid, self.remote_boats, p.hitbox)) is not None
+                if hit or on_bank:
+                    p.invincible = self.INVINCIBILITY_DURATION  # Ativa o timer de invencibilidade
+                    if not self.death_delay and not self.game_over and p.lives > 0:  # Se não está em game over e ainda tem vidas
+                        self._play(1, 2)  # Toca o som de colisão
+
+        ## ————— Colisão Tiro × Árvore (host destrói; ambos removem tiro no primeiro hit) —————
+        shot_lists = (self.shots, self.remote_shots)
+        hits = self._batch_shot_hits(shot_lists, arvores, aabb.TREE_INSET, consume=self.is_authority)
+        for shot_list in shot_lists:
+            for shot in shot_list.copy():
+                tree = self._shot_target(shot, hits, tree_grid, arvores)
+                if tree is not None:
+                    left, top, right, bottom = tree.hitbox
+                    # host marca a árvore como destruída
+                    if self.is_authority:
+                        tree.visible = False
+
+                        # Quem disparou ganha os pontos
+                        self._add_score(shot.owner, 2)
+                        # cria explosão no centro da árvore
+                        cx = (left + right) // 2 - 16 // 2
+                        cy = (top  + bottom) // 2 - 16 // 2
+                        self._explode(cx, cy, duration=8)
+
+                        self._play(2, 3) # Som de colisao de tiro
+                        if self.is_multiplayer:
+                            self.pending_sounds.append((2, 3)) # Envia para os clientes o som
+                    else:
+                        # Cliente: a pontuacao vem do host
+                        self._play(2, 3) # Som de colisao
+                        self.pending_sounds.append((2, 3)) # Envia para Host o som
+                    # qualquer um remove o tiro no primeiro contato
+                    self._remove_shot(shot_list, shot)
+                    continue
+
+                # se não colidiu e saiu da tela, também remove
+                if shot.is_off_screen():
+                    self._remove_shot(shot_list, shot)
+
+        ## ————— Colisão Tiro × Barco —————
+        # percorre cada lista de tiros
+        boats = self.boat_manager.boats if self.is_authority else self.remote_boats
+        hits = self._batch_shot_hits(shot_lists, boats, aabb.BOAT_INSET, consume=self.is_authority)
+        for shot_list in shot_lists:
+            for shot in shot_list.copy():
+                boat = self._shot_target(shot, hits, self.boat_grid, boats)
+                if boat is None:
+                    continue
+                b_left, b_top, b_right, b_bottom = boat.hitbox
+                # host é fonte da verdade: destrói o barco
+                if self.is_authority:
+                    boat.visible = False
+
+                    # Quem disparou ganha os pontos
+                    self._add_score(shot.owner, 4)
+                    # spawn de explosão no centro do barco
+                    cx = (b_left + b_right)//2 - 8   # metade de 16px
+                    cy = (b_top  + b_bottom)//2 - 8
+                    self._explode(cx, cy, duration=8)
+
+                    self._play(2, 4) # Som de colisao de tiro
+                    if self.is_multiplayer:
+                        self.pending_sounds.append((2, 4)) # Envia para os clientes o som
+                else:
+                    # Cliente: a pontuacao vem do host
+                    self._play(2, 4) # Som de colisao de tiro
+                    self.pending_sounds.append((2, 4)) # Envia para Host o som
+                # em qualquer caso, remove o tiro no primeiro hit
+                self._remove_shot(shot_list, shot)
+
+        # ————— Colisão Jogador × Bomba de Gasolina —————
+        if self.is_authority:
+            # Host (ou singleplayer): checa todos os jogadores contra o mesmo bomb_manager
+            for b in self.bomb_manager.bombs:
+                if not b.visible:
+                    continue
+                for p in self.players:
+                    if p.alive and self._touches_any(p.hitbox, (b,)):
+                        b.visible = False
+                        p.fuel = min(MAX_FUEL, p.fuel + 30)
+                        # O som toca na maquina de quem pegou a gasolina
+                        if p is self.player and not self.death_delay and not self.game_over:
+                            self._play(3, 5) # Som de pegar gasolina
+                            self.pending_sounds.append((3, 5)) # Envia para os clientes o som
+                        break  # já removido, passa pra próxima bomba
+
+        elif self.player is not None:
+            # Cliente: só desenha ou “esconde” visualmente a remote_bombs
+            p = self.player
+            b = self._touches_any(p.hitbox, self._nearby(self.bomb_grid, self.remote_bombs, p.hitbox))
+            if b is not None:
+                b.visible = False
+                if not self.death_delay and not self.game_over and p.lives > 0:
+                    self._play(3, 5) # Som de pegar gasolina
+                    self.pending_sounds.append((3, 5)) # Envia para Host o som
+
+        ## ————— Colisão Tiro × Bomba de Gasolina —————
+        if self.is_authority:
+            # host autoritário: só ele destrói bombas e gera explosão
+            bombs = self.bomb_manager.bombs
+            hits = self._batch_shot_hits(shot_lists, bombs, aabb.BOAT_INSET, consume=True)
+            for shot_list in shot_lists:
+                for shot in shot_list.copy():
+                    b = self._shot_target(shot, hits, self.bomb_grid, bombs)
+                    if b is None:
+                        continue
+                    # destrói bomba
+                    b.visible = False
+                    # remove o tiro
+                    self._remove_shot(shot_list, shot)
+                    # spawn de explosão no centro da bomba
+                    cx = b.x + b.width // 2 - 8
+                    cy = b.y + b.height // 2 - 8
+                    self._explode(cx, cy, duration=12)
+
+                    self._play(1, 2) # Som de colisao
+                    self.pending_sounds.append((1, 2)) # Envia para os clientes o som
+        else:
+            # cliente: só esconde visualmente a bomba que vier do host
+            hits = self._batch_shot_hits((self.shots,), self.remote_bombs, aabb.BOAT_INSET, consume=True)
+            for shot in self.shots.copy():
+                b = self._shot_target(shot, hits, self.bomb_grid, self.remote_bombs)
+                if b is None:
+                    continue
+                b.visible = False
+                self._remove_shot(self.shots, shot)
+
+                self._play(1, 2) # Som de colisao
+                self.pending_sounds.append((1, 2)) # Envia para Host o som
+
+        # ————— Perda de vida quando acaba o combustível —————
+        # apenas o host (ou singleplayer) aplica a penalidade
+        if self.is_authority:
+            for p in self.players:
+                if p.alive and p.fuel <= 0:
+                    p.lives = max(0, p.lives - 1)
+                    p.invincible = self.INVINCIBILITY_DURATION
+                    p.fuel = MAX_FUEL
+
+        self._check_deaths()
+
+    def _add_score(self, slot, points):
+        if 0 <= slot < len(self.players):
+            self.players[slot].score += points
+
+    # Explosao de morte dos jogadores e inicio do fim de jogo
+    def _check_deaths(self):
+        # Alguem morreu? (o host cria a explosao de todos os jogadores)
+        if self.is_authority:
+            for p in self.players:
+                if p.active and p.lives == 0 and not p.exploded:
+                    # marca que já acionou explosão
+                    p.exploded = True
+                    # centro do avião
+                    cx = p.x + PLAYER_WIDTH//2 - 8
+                    cy = p.y + PLAYER_HEIGHT//2 - 8
+                    self._explode(cx, cy, duration=30)
+                    self._emit(EVENT_DEATH, p.slot)
+
+                    self._play(1, 2) # Som de explosao
+                    self.pending_sounds.append((1, 2)) # Envia para os clientes o som
+
+        # Fim de jogo: o jogador local morreu e nao sobrou ninguem vivo (ou ninguem conectado)
+        if self.death_delay or self.game_over:
+            return
+        if self.player is not None and self.player.lives > 0:
+            return
+        if (not self.is_multiplayer or not self.peer_connected or
+                all(p.lives == 0 for p in self.players if p.active)):
+            self.death_delay = True
+            self.death_delay_timer = 2 * FPS   # 2 segundos de delay
+            self._emit(EVENT_DEATH_DELAY)
+
+    def update_shots(self):
+        """Atualiza posição e descarta tiros fora da tela — usado tanto em play quanto em pause."""
+        # locais (os que saem voltam para o pool)
+        for shot in self.shots:
+            shot.update()
+        alive = []
+        for shot in self.shots:
+            if shot.is_off_screen():
+                self.shot_pool.release(shot)
+            else:
+                alive.append(shot)
+        self.shots = alive
+
+        # remotos (pertencem aos registros, que os devolvem ao pool quando somem do snapshot)
+        for shot in self.remote_shots:
+            shot.update()
+        self.remote_shots = [s for s in self.remote_shots if not s.is_off_screen()]
+
+    # Monta o snapshot (estado local) enviado pela rede.
+    # Os sons e as explosoes acumulam desde o snapshot anterior, entao nada se perde quando o
+    # snapshot nao sai em todo tick (ver NETWORK_SEND_RATE)
+    def snapshot(self):
+        if self.is_host:
+            # Host eh autoritario: envia todos os jogadores e repassa os tiros dos clientes
+            players = [p.to_dict() for p in self.players if p.active]
+            shots = [shot.to_dict() for shot in self.shots] + [shot.to_dict() for shot in self.remote_shots]
+        else:
+            players = [self.player.to_dict()]
+            shots = [shot.to_dict() for shot in self.shots]
+        data = {
+            'type': 'game_update', # Tipo de mensagem
+            'player_type': 'host' if self.is_host else 'client',
+            'slot': self.local_slot or 0,  # Slot do remetente
+            'rio_centro': self.background.centro_rio_x,  # Posição do rio
+            'rio_largura': self.background.largura_rio,
+            'scroll': self.background.deslocamento,  # Deslocamento do cenario (base da compressao delta)
+            'seed': self.seed,  # Seed da partida
+            'players': players,
+            'shots': shots,
+            'explosions': [exp.to_dict() for exp in self.explosions] + [
+                dict(exp.to_dict(), timer=_LATE_EXPLOSION_FRAMES)
+                for exp in self._unsent_explosions if exp.is_dead()],
+            'sounds': self.pending_sounds,
+        }
+        if self.is_host:
+            # Árvores, barcos e bombas são do host: o cliente só os recebe (e pode tê-los interpolados)
+            data['arvores'] = self.background.tree_manager.get_tree_states()
+            data['boats'] = self.boat_manager.get_states()
+            data['bombs'] = self.bomb_manager.get_states()
+        else:
+            # Comandos de movimento que o host ainda nao confirmou (os mais novos)
+            pending = list(self.pending_inputs)[-MAX_INPUTS_PER_PACKET:]
+            data['inputs'] = [list(command) for command in pending]
+        self._clear_outbox()
+        return data
+
+    # Esvazia o que esperava o proximo snapshot (sons e explosoes ja enviados)
+    def _clear_outbox(self):
+        self.pending_sounds = []  # limpa a fila de sons
+        for exp in self._unsent_explosions:
+            exp.unsent = False
+            if exp.is_dead():
+                self.explosion_pool.release(exp)
+        self._unsent_explosions = []
+
+    # Checksum (CRC32) do estado da partida. No lockstep, as maquinas comparam o de um mesmo tick para
+    # detectar dessincronizacao. Os IDs de rede ficam de fora: cada maquina numera as suas entidades
+    def checksum(self):
+        background = self.background
+        crc = zlib.crc32(struct.pack("<Iddd", self.tick, background.deslocamento,
+                                     background.centro_rio_x, background.largura_rio))
+        for p in self.players:
+            if p.active:
+                crc = zlib.crc32(struct.pack("<BddBdiI", p.slot, p.x, p.y, p.lives, p.fuel,
+                                             p.invincible, p.score), crc)
+        for store in (background.tree_manager.store, self.boat_manager.store, self.bomb_manager.store):
+            for column in (store.x, store.y, store.visible, store.kind):
+                crc = zlib.crc32(column, crc)
+        for shot in self.shots:
+            crc = zlib.crc32(struct.pack("<ddB", shot.x, shot.y, shot.owner), crc)
+        for exp in self.explosions:
+            crc = zlib.crc32(struct.pack("<ddi", exp.x, exp.y, exp.timer), crc)
+        return crc
+
+    # Aplica um snapshot recebido. No host, 'slot' eh o slot do cliente que enviou.
+    # No cliente, 'reconcile' corrige a posicao prevista do aviao local (desligado quando o snapshot
+    # eh interpolado: a reconciliacao usa o snapshot mais novo, ver reconcile)
+    def apply_snapshot(self, data, slot=None, reconcile=True):
+        try:
+            if self.is_host:
+                self._apply_client_snapshot(data, data['slot'] if slot is None else slot)
+            else:
+                self._apply_host_snapshot(data)
+                if reconcile:
+                    self.reconcile(data)
+
+            # Toca os sons recebidos do outro lado
+            for channel, sound_id in data.get("sounds", []):
+                self._play(channel, sound_id)
+        except (KeyError, TypeError, IndexError):
+            # Captura exceções caso haja erro ao acessar chaves do dicionário ou tipos incorretos
+            print("Erro na sincronização dos dados")
+
+    # Host: posição, invencibilidade, tiros e explosões de um cliente
+    def _apply_client_snapshot(self, data, slot):
+        player = self.players[slot]
+        inputs = data.get('inputs')
+        for state in data.get('players', ()):
+            if state['id'] == slot:
+                # apenas posição e invencibilidade; vidas e gasolina são do host
+                if inputs is None:
+                    # cliente sem comandos de movimento: a posição vem pronta
+                    player.x = state['x']
+                    player.y = state['y']
+                player.invincible = state['invincible']
+        player.active = True
+
+        # Processa os comandos de movimento novos (os já processados chegam repetidos por redundância)
+        for seq, bits in inputs or ():
+            if seq > player.input_seq:
+                self.move_player(player, _input_from_bits(bits))
+                player.input_seq = seq
+
+        registries = self._peer_registries.get(slot)
+        if registries is None:
+            registries = self._peer_registries[slot] = (EntityRegistry(Shot, pool=self.shot_pool),
+                                                        EntityRegistry(Explosion, pool=self.explosion_pool))
+        shot_registry, explosion_registry = registries
+        high = slot << _SHOT_ID_SLOT_SHIFT
+        shots = shot_registry.apply([dict(shot, id=high | shot['id'], owner=slot) for shot in data.get('shots', ())])
+        explosions = explosion_registry.apply(data.get('explosions', ()))
+        self._peer_entities[slot] = (shots, explosions)
+        self._rebuild_peer_entities()
+
+    def _rebuild_peer_entities(self):
+        self.remote_shots = [shot for shots, _ in self._peer_entities.values() for shot in shots]
+        self.remote_explosions = [exp for _, explosions in self._peer_entities.values() for exp in explosions]
+
+    # Host: desativa os jogadores cujos clientes nao estao mais conectados
+    def sync_peers(self, slots):
+        for p in self.players:
+            if p.active and p is not self.player and p.slot not in slots:
+                p.active = False
+                p.input_seq = 0  # o proximo cliente deste slot recomeca a sequencia
+                for registry in self._peer_registries.pop(p.slot, ()):
+                    registry.clear()  # devolve os tiros e explosoes do cliente ao pool
+                if self._peer_entities.pop(p.slot, None) is not None:
+                    self._rebuild_peer_entities()
+
+    # Cliente: parte da posicao do host e reaplica os comandos que ele ainda nao processou
+    def reconcile(self, data):
+        player = self.player
+        if player is None or self.is_host:
+            return
+        state = next((s for s in data.get('players', ()) if s['id'] == player.slot), None)
+        if state is None:
+            return
+        acked = state.get('input_seq', 0)
+        while self.pending_inputs and self.pending_inputs[0][0] <= acked:
+            self.pending_inputs.popleft()
+
+        predicted_x, predicted_y = player.x, player.y
+        player.x, player.y = state['x'], state['y']
+        for _, bits in self.pending_inputs:
+            self.move_player(player, _input_from_bits(bits))
+        error = abs(player.x - predicted_x) + abs(player.y - predicted_y)
+        if error:
+            self.prediction_corrections += 1
+            self.prediction_error = error
+
+    # Cliente: estado autoritativo vindo do host
+    def _apply_host_snapshot(self, data):
+        seen = set()
+        for state in data.get('players', ()):
+            p = self.players[state['id']]
+            p.apply_dict(state, local=p is self.player)
+            seen.add(p.slot)
+        for p in self.players:
+            if p is not self.player:
+                p.active = p.slot in seen
+
+        # tiros de todos, menos os deste jogador (que já estão em self.shots)
+        local_slot = self.local_slot
+        self.remote_shots = self.remote_shot_registry.apply(
+            [shot for shot in data.get('shots', ()) if shot.get('owner', 0) != local_slot])
+        self.remote_explosions = self.remote_explosion_registry.apply(data.get('explosions', ()))
+        self.remote_boats = self.remote_boat_registry.apply(data.get('boats', ()))
+        self.remote_bombs = self.remote_bomb_registry.apply(data.get('bombs', ()))
+
+        # Clientes sincronizam posição e largura do rio
+        self.background.centro_rio_x = data['rio_centro']
+        self.background.target_centro_x = data['rio_centro']
+        if 'rio_largura' in data:
+            self.background.largura_rio    = data['rio_largura']
+            self.background.target_largura = data['rio_largura']
+
+        # Sincroniza seed aleatória se necessário
+        if 'seed' in data and data['seed'] != self.seed:
+            self.reseed(data['seed'])
+        # Sincroniza árvores
+        if 'arvores' in data:
+            self.background.tree_manager.set_tree_states(data['arvores'])
@@ -0,0 +1,69 @@
+### Grade uniforme (spatial hash) para as consultas de colisao. Responsavel por:
+### - Guardar as entidades de um tipo (arvores, barcos, bombas) nas celulas que a hitbox delas ocupa
+### - Devolver, para uma caixa, apenas as entidades das celulas que ela toca (candidatas)
+###
+### A grade eh reconstruida uma vez por tick (ver Simulation._update_world), depois que tudo se moveu.
+### As candidatas saem na mesma ordem da lista original, entao "a primeira que encosta" continua sendo
+### a mesma entidade de antes. O teste exato de intersecao continua com quem consulta
+
+from config import *    # Importa constantes e configuracoes do arquivo "config.py"
+
+
+class SpatialHash:
+    """Grade de celulas quadradas (cell_size px) indexadas por (coluna, linha)."""
+    def __init__(self, cell_size=COLLISION_CELL_SIZE):
+        self.cell_size = cell_size
+        self._cells = {}    # (coluna, linha) -> [(ordem de insercao, entidade), ...]
+        self._count = 0     # Entidades inseridas desde o ultimo clear
+
+    def clear(self):
+        self._cells.clear()
+        self._count = 0
+
+    def insert(self, entity, box):
+        """Insere a entidade em todas as celulas que a caixa (left, top, right, bottom) toca."""
+        entry = (self._count, entity)
+        self._count += 1
+        cells = self._cells
+        cols, rows = self._cell_range(box)
+        for col in cols:
+            for row in rows:
+                cell = cells.get((col, row))
+                if cell is None:
+                    cells[(col, row)] = [entry]
+                else:
+                    cell.append(entry)
+
+    def rebuild(self, entities):
+        """Recomeca a grade com as entidades visiveis da lista (pela hitbox de cada uma)."""
+        self.clear()
+        for entity in entities:
+            if entity.visible:
+                self.insert(entity, entity.hitbox)
+
+    def query(self, box):
+        """Entidades das celulas que a caixa toca, sem repeticao e na ordem em que foram inseridas."""
+        cells = self._cells
+        cols, rows = self._cell_range(box)
+        if len(cols) == 1 and len(rows) == 1:
+            # Caso comum (tiros, caixas menores que a celula): uma celula so, ja esta em ordem
+            cell = cells.get((cols[0], rows[0]))
+            return [entity for _, entity in cell] if cell else []
+
+        found = {}
+        for col in cols:
+            for row in rows:
+                cell = cells.get((col, row))
+                if cell:
+                    for index, entity in cell:
+                        found[index] = entity
+        return [found[index] for index in sorted(found)]
+
+    def _cell_range(self, box):
+        left, top, right, bottom = box
+        size = self.cell_size
+        return (range(int(left // size), int(right // size) + 1),
+                range(int(top // size), int(bottom // size) + 1))
+
+    def __len__(self):
+        return self._count
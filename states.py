@@ -6,12 +6,24 @@
 # Bibliotecas
 from time import sleep
 from time import sleep
+import time
+from collections import deque
 import pyxel            # Engine do jogo
 from config import *    # Importa constantes e configuracoes do arquivo "config.py"
 from entities import *  # Importa as classes de entidades do jogo (jogador, arvores, etc.)
-from map_generator import Background
+from simulation import *   # Nucleo da simulacao (sem pyxel)
+from interpolation import SnapshotBuffer  # Interpolacao dos snapshots do host no cliente
+from network import SendTimer  # Taxa de envio dos snapshots (NETWORK_SEND_RATE)
+from lockstep import Lockstep  # Multiplayer que troca so as entradas (LOCKSTEP)
+from timestep import FixedTimestep  # Ticks por tempo real, independente do ritmo dos frames (FIXED_TIMESTEP)
+from replay import ReplayRecorder, new_replay_path  # Gravacao das partidas (REPLAY_RECORD)
+from profiler import frame_profiler, FRAME_BUCKETS_MS  # Tempos por secao do frame (overlay do F3)
 import music
 
+# Teclas de controle do rio (ver Background.aplicar_comando)
+RIVER_KEYS = (("KEY_1", pyxel.KEY_1), ("KEY_2", pyxel.KEY_2), ("KEY_3", pyxel.KEY_3),
+              ("KEY_4", pyxel.KEY_4), ("KEY_5", pyxel.KEY_5))
+
 # Classe para o Menu Principal do jogo
 class MenuState:
     # Construtor
@@ -310,24 +322,24 @@ class WaitingForHostState:
 
     # Método chamado a cada frame para atualizar o estado
     def update(self):
-        d = self.game.network.data  # Obtém dados recebidos da rede
-
-            
-        # Verifica se recebeu um sinal de início de jogo do host
-        if isinstance(d, dict) and d.get('type') == 'game_start':
-            # Muda para o estado de jogo com os parâmetros recebidos
-            self.game.change_state(GameState(
-                self.game,
-                is_multiplayer=True,
-                is_host=False,
-                initial_seed=d.get('seed'),
-                initial_rio_centro=d.get('rio_centro'),
-                initial_rio_largura=d.get('rio_largura')
-            ))
-            return
+        # Verifica se recebeu um sinal de início de jogo do host (entre as mensagens que chegaram)
+        for message in self.game.network.drain():
+            d = message.payload
+            if isinstance(d, dict) and d.get('type') == 'game_start':
+                # Muda para o estado de jogo com os parâmetros recebidos
+                self.game.change_state(GameState(
+                    self.game,
+                    is_multiplayer=True,
+                    is_host=False,
+                    initial_seed=d.get('seed'),
+                    initial_rio_centro=d.get('rio_centro'),
+                    initial_rio_largura=d.get('rio_largura'),
+                    lockstep_slots=d.get('lockstep')  # Jogadores da partida em lockstep (None = snapshots)
+                ))
+                return
 
         # Se estiver conectado, envia um sinal de "heartbeat" para manter a conexão
-        if self.game.network.connected and len(d) == 1:
+        if self.game.network.connected:
             self.game.network.send({'type': 'heartbeat'})
 
         # Se pressionar ESC, cancela e volta ao menu
@@ -370,19 +382,18 @@ class HostGameState:
         # Mantém a conexão ativa enviando heartbeats
         if self.game.network.connected:
             self.game.network.send({'type': 'heartbeat'})
+        # Descarta os heartbeats dos clientes (a fila so interessa durante o jogo)
+        self.game.network.drain()
 
         # Se pressionar ENTER, inicia o jogo
         if pyxel.btnp(pyxel.KEY_RETURN):
+            # No lockstep, a partida fica com os jogadores conectados agora (host + clientes)
+            slots = [0] + sorted(self.game.network.peer_slots()) if LOCKSTEP else None
             # Cria o estado do jogo primeiro
-            game_state = GameState(self.game, is_multiplayer=True, is_host=True)
+            game_state = GameState(self.game, is_multiplayer=True, is_host=True, lockstep_slots=slots)
             
             # Prepara dados iniciais para sincronização
-            initial_data = {
-                'type': 'game_start',
-                'seed': game_state.background.tree_manager.random_seed,  # Semente aleatória
-                'rio_centro': game_state.background.centro_rio_x,  # Posição do rio
-                'rio_largura': game_state.background.largura_rio  # Largura do rio
-            }
+            initial_data = game_state.start_message()
             # Envia dados para o cliente
             self.game.network.send(initial_data)
             
@@ -435,39 +446,20 @@ class PauseMenuState:
             return
         
         gs = self.game.previous_state
-        if self.game.previous_state.is_multiplayer:    
-            if gs.invincible_timer_j1 > 0:
-                gs.invincible_timer_j1 -= 1
-            if gs.invincible_timer_j2 > 0:
-                gs.invincible_timer_j2 -= 1
-
-            # 1) mantém o scroll do rio
-            gs.background.update()
-
-            # 2) rede continua ativa em multiplayer
-            if gs.is_multiplayer:
-                gs.send_data()
-                gs.receive_data()
-
-            # 3) tiros continuam voando
-            gs.update_shots()
-
-            # 4) barcos continuam navegando (apenas UMA chamada)
-            gs.boat_manager.update()
-
-            # bombas de combustivle continuam caindo
-            gs.bomb_manager.update()
-            # 5) colisões continuam sendo testadas
-            gs.check_all_collisions()
-
-            # 6) explosões continuam animando
-            for exp in gs.explosions:
-                exp.update()
-            gs.explosions = [e for e in gs.explosions if not e.is_dead()]
-
-            for exp in gs.remote_explosions:
-                exp.update()
-            gs.remote_explosions = [e for e in gs.remote_explosions if not e.is_dead()]
+        if gs.is_multiplayer:
+            # o mundo continua andando em multiplayer, no mesmo ritmo de ticks do jogo
+            for _ in range(gs.frame_ticks()):
+                gs.remember_positions()
+                if gs.lockstep is not None:
+                    # lockstep: a partida não para; o jogador local segue sem entrada enquanto o menu está aberto
+                    gs.step_lockstep(TickInput(peer_connected=self.game.network.connected))
+                else:
+                    # rede, rio, tiros, barcos, bombas, colisões e explosões
+                    gs.receive_data()
+                    gs.handle_events(gs.sim.step_paused(TickInput(peer_connected=self.game.network.connected)))
+                    gs.send_data()
+        else:
+            gs.timestep.hold()  # o tempo em pause não vira ticks
 
         # 7) navegação do menu de pause
         if pyxel.btnp(pyxel.KEY_DOWN) or pyxel.btnp(pyxel.KEY_S):
@@ -480,6 +472,7 @@ class PauseMenuState:
             if self.selected == 0:  # Continuar
                 self.game.change_state(gs)
             else:  # Menu Principal
+                gs.close_replay()
                 if gs.is_multiplayer:
                     self.game.network.stop()
                 self.game.change_state(MenuState(self.game))
@@ -501,800 +494,224 @@ class PauseMenuState:
             pyxel.text(50, 60 + (i*20), opt, color)  # Desenha cada opção
 
 # Classe principal que gerencia o estado do jogo (singleplayer/multiplayer)
+# A logica da partida fica em simulation.Simulation; aqui ficam apenas o teclado, o audio,
+# a rede e o desenho (adaptador pyxel da simulacao)
 class GameState:
     # Método de inicialização
-    def __init__(self, game, is_multiplayer=False, is_host=False, initial_seed=None, initial_rio_centro=None , initial_rio_largura=None):
+    def __init__(self, game, is_multiplayer=False, is_host=False, initial_seed=None, initial_rio_centro=None , initial_rio_largura=None,
+                 lockstep_slots=None):
         self.game = game  # Referência para o objeto principal do jogo
         self.is_multiplayer = is_multiplayer  # Flag para modo multiplayer
         self.is_host = is_host  # Flag para identificar se é o host
-        
+
         # Toca a musica do jogo
         music.play_game_music()
 
-        # Fim de jogo
-        self.death_delay = False        # Verifica se estah aguardando para entrar no game over 
-        self.death_delay_timer = 0      # quantos frames faltam para o delay de morte acabar
-        self.game_over = False          # flag de fim de jogo
-        self.game_over_timer = 0        # temporizador em frames
-
-        # Fila de sons que a instancia vai enviar ao outro (cliente para servidor ou servidor para cliente)
-        self.pending_sounds = []  
-        
-        # Posicionamento inicial dos jogadores (host vs cliente)
-        if is_host:
-            # Host controla jogador 1 (esquerda)
-            self.player_x, self.player_y = 55, 130  
-            # Jogador 2 (cliente) começa à direita
-            self.player2_x, self.player2_y = 90, 130  
-        else:
-            # Cliente controla jogador 2 (direita)
-            self.player_x, self.player_y = 90, 130
-            # Jogador 1 (host) começa à esquerda
-            self.player2_x, self.player2_y = 55, 130  
-
-        # Inicializa o cenário de fundo
-        self.background = Background(is_host=is_host , is_multiplayer=is_multiplayer) 
-
-        # HUD
-        self.life_player1 = MAX_LIVES  # Vida do jogador 1 (host)
-        self.fuel_player1 = MAX_FUEL # Gasolina do jogador 1 (Host)
-        self.life_player2 = MAX_LIVES  # Vida do jogador 2 (cliente)
-        self.fuel_player2 = MAX_FUEL # Gasolina do jogador 2 (Cliente)
-        self.invincible_timer_j1 = 0  # Temporizador de invencibilidade do jogador 1
-        self.invincible_timer_j2 = 0  # Temporizador de invencibilidade do jogador 2
-        self.INVINCIBILITY_DURATION = 90  # Duração em frames (1.5s a 60FPS)
-        self.score_player1 = 0  # Pontuação do jogador 1
-        self.score_player2 = 0  # Pontuação do jogador 2
-
-        # Sincronização inicial do jogo (apenas multiplayer)
-        if initial_seed:
-            # Sincroniza a seed aleatória para árvores
-            self.background.tree_manager.random_seed = initial_seed
-            random.seed(initial_seed)
-            self.background.tree_manager.reset_arvores()
-        
-        if initial_rio_centro and not is_host:
-            # Sincroniza a posição do rio para clientes
-            self.background.centro_rio_x = initial_rio_centro
-            self.background.target_centro_x = initial_rio_centro
-        
-        if initial_rio_largura is not None and not is_host:
-            self.background.largura_rio     = initial_rio_largura
-            self.background.target_largura  = initial_rio_largura
-
-        if is_multiplayer and not is_host:  # Apenas clientes multiplayer não atualizam
-            self.background.tree_manager.update_arvores = lambda _: None  # Desabilita atualização de árvores para clientes
-
-        # lista de tiros locais e da outra tela
-        self.shots = []          # tiros deste jogador
-        self.remote_shots = []   # tiros vindos pela rede
-
-        self.explosions = []   # lista de Explosion ativos
-        self.remote_explosions = []  # explosões vindas pela rede
-
-        self.boat_manager = BoatManager(self.background)    # barcos locais (host gera)
-        self.remote_boats = []                             # barcos sincronizados via rede
-
-        # Bombas de gasolina (host gera; clientes sincronizam)
-        # Bombas: host gera, precisa também do boat_manager pra checar barcos
-        from entities import GasolineBombManager
-        self.bomb_manager = GasolineBombManager(self.background,
-                                                self.boat_manager,
-                                                max_bombs=5,
-                                                spawn_interval_s=1)        
-        self.remote_bombs = []
+        # Estado e regras da partida (sem pyxel)
+        self.sim = Simulation(is_multiplayer=is_multiplayer, is_host=is_host,
+                              local_slot=game.network.slot if is_multiplayer else None,
+                              initial_seed=initial_seed,
+                              initial_rio_centro=initial_rio_centro,
+                              initial_rio_largura=initial_rio_largura,
+                              lockstep_slots=lockstep_slots)
+
+        # Snapshots saem a NETWORK_SEND_RATE por segundo, independente do FPS
+        self.send_timer = SendTimer()
+
+        # Lockstep: em vez de snapshots, trocam-se as entradas de cada tick (ver lockstep.py)
+        self.lockstep = None
+        if is_multiplayer and lockstep_slots is not None:
+            self.lockstep = Lockstep(self.sim.local_slot, lockstep_slots, is_host)
+
+        # Cliente: renderiza o estado do host interpolado, um pouco atras do snapshot mais novo
+        self.interp = None
+        if is_multiplayer and not is_host and INTERP_DELAY > 0 and self.lockstep is None:
+            self.interp = SnapshotBuffer()
+
+        # Passo fixo: quantos ticks cada frame simula, e posições do tick anterior para interpolar o desenho
+        self.timestep = FixedTimestep()
+        self._prev_positions = {}       # slot -> (x, y) do jogador antes do último tick
+        self._held_presses = (False, ())  # Tiro e teclas do rio apertados em frames sem tick
+
+        # Replay: só as partidas movidas apenas pelas entradas (singleplayer e lockstep) podem ser refeitas
+        self.recorder = None
+        if REPLAY_RECORD and (not is_multiplayer or self.lockstep is not None):
+            self.recorder = ReplayRecorder(new_replay_path(self.sim.seed), self.sim,
+                                           initial_rio_centro, initial_rio_largura)
+
+    # Pacote 'game_start' que o host envia aos clientes para começarem a mesma partida
+    def start_message(self):
+        data = {
+            'type': 'game_start',
+            'seed': self.sim.seed,  # Semente aleatória
+            'rio_centro': self.sim.background.centro_rio_x,  # Posição do rio
+            'rio_largura': self.sim.background.largura_rio  # Largura do rio
+        }
+        if self.lockstep is not None:
+            data['lockstep'] = list(self.lockstep.slots)  # Jogadores da partida
+        return data
+
+    # Lê o teclado e monta a entrada do tick da simulação
+    def read_input(self):
+        player = PlayerInput(
+            left=pyxel.btn(pyxel.KEY_A),
+            right=pyxel.btn(pyxel.KEY_D),
+            up=pyxel.btn(pyxel.KEY_W),
+            down=pyxel.btn(pyxel.KEY_S),
+            fire=pyxel.btnp(pyxel.KEY_SPACE),
+        )
+        # Teclas de controle do rio (1 a 5)
+        river_keys = [name for name, key in RIVER_KEYS if pyxel.btnp(key)]
+        return TickInput(player, river_keys, self.game.network.connected)
+
+    # Traduz os eventos da simulação em sons e música
+    def handle_events(self, events):
+        for event in events:
+            if event[0] == EVENT_SOUND:
+                pyxel.play(event[1], event[2])
+            elif event[0] == EVENT_DEATH_DELAY:
+                music.stop_music() # Para a musica
     
     # Método para atualizar o estado do jogo a cada frame
     def update(self):
-        # Apenas atualiza a lógica do jogo se não estiver em pause
-        if not isinstance(self.game.current_state, PauseMenuState):
-            self.background.update()  # ← Movido para fora da verificação de pause
-
-        # Comunicação em rede (apenas multiplayer)
-        if self.is_multiplayer:
-            self.send_data()  # Envia dados do jogador local
-            self.receive_data()  # Recebe dados do outro jogador
-
-        # Se estiver em Game Over, apenas decrementa o timer
-        if self.game_over:
-            self.game_over_timer -= 1
-            if self.game_over_timer <= 0:
-                # volta ao menu principal
-                self.game.network.stop()  # Encerra a conexao
-                self.game.change_state(MenuState(self.game))
-            return
-        
-        # Se estiver no “delay de morte”, decrementa o seu timer,
-        # mas continuar rodando o jogo normalmente ateh acabar o timer:
-        if self.death_delay:
-            self.death_delay_timer -= 1
-            if self.death_delay_timer <= 0:
-                # passado o delay, o Game Over eh ativado
-                self.death_delay      = False
-                self.game_over        = True
-                self.game_over_timer  = 5 * FPS   # 5 segundos de tela preta
-                pyxel.play(0, 1) # Som de fim de jogo
-                
-
         # Lógica de pausa
-        if pyxel.btnp(pyxel.KEY_ESCAPE):
+        if not self.sim.game_over and pyxel.btnp(pyxel.KEY_ESCAPE):
             self.game.previous_state = self  # Salva estado atual
             self.game.change_state(PauseMenuState(self.game))  # Vai para menu de pause
             return  # Sai da atualização
 
-        # Controles do jogador (WASD)
-        if not self.is_multiplayer or (self.is_multiplayer):
-            if pyxel.btn(pyxel.KEY_A):
-                self.player_x -= PLAYER_SPEED  # Move para esquerda
-            if pyxel.btn(pyxel.KEY_D):
-                self.player_x += PLAYER_SPEED  # Move para direita
-            if pyxel.btn(pyxel.KEY_W):
-                self.player_y -= PLAYER_SPEED  # Move para cima
-            if pyxel.btn(pyxel.KEY_S):
-                self.player_y += PLAYER_SPEED  # Move para baixo
-            # Disparo: cria um tiro quando apertar SPACE
-            if pyxel.btnp(pyxel.KEY_SPACE) and (not self.death_delay and not self.game_over):
-                if (self.is_host or not self.is_multiplayer) and self.life_player1 > 0:
-                    # inicia no centro horizontal do avião, um pouco acima dele
-                    shot_x = self.player_x + PLAYER_WIDTH // 2 - 1
-                    shot_y = self.player_y
-                    self.shots.append(Shot(shot_x, shot_y))
-                    pyxel.play(0, 0) # Som de tiro
-                    self.pending_sounds.append((0, 0)) # Envia para Cliente/Servidor o som de tiro
-                elif not self.is_host and self.life_player2 > 0:
-                    # inicia no centro horizontal do avião, um pouco acima dele
-                    shot_x = self.player_x + PLAYER_WIDTH // 2 - 1
-                    shot_y = self.player_y
-                    self.shots.append(Shot(shot_x, shot_y))
-                    pyxel.play(0, 0) # Som de tiro
-                    self.pending_sounds.append((0, 0)) # Envia para Cliente/Servidor o som de tiro
-
-
-        # Limites da tela
-        self.player_x = max(0, min(self.player_x, SCREEN_WIDTH - PLAYER_WIDTH))
-
-        game_area_height = SCREEN_HEIGHT - HUD_HEIGHT
-        self.player_y = max(0, min(self.player_y, game_area_height - PLAYER_HEIGHT))
-
-        # ——— Consumo de gasolina (apenas no host ou singleplayer) ———
-        consumption = FUEL_CONSUMPTION_RATE / FPS
-        if self.is_host or not self.is_multiplayer:
-            # host autoritário: consome para jogador 1 e jogador 2
-            self.fuel_player1 = max(0, self.fuel_player1 - consumption)
-            self.fuel_player2 = max(0, self.fuel_player2 - consumption)
-
-        # Atualiza temporizadores de invencibilidade
-        if self.invincible_timer_j1 > 0:
-            self.invincible_timer_j1 -= 1 # Invencibilidade do jogador 1
-        if self.invincible_timer_j2 > 0:
-            self.invincible_timer_j2 -= 1 # Invencibilidade do jogador 2
-
-        self.update_shots()
-        
-        # local
-        for exp in self.explosions:
-            exp.update()
-        self.explosions = [e for e in self.explosions if not e.is_dead()]
-
-        # remota
-        for exp in self.remote_explosions:
-            exp.update()
-        self.remote_explosions = [
-            e for e in self.remote_explosions if not e.is_dead()
-        ]
-
-        # atualiza barcos (host gera; ambos movem)
-        self.boat_manager.update()
-        # recebe remote_boats já populada em receive_data
-        for b in self.remote_boats:
-            b.update()
-
-        
-        # --- Bombas de gasolina ---
-        if self.is_host or not self.is_multiplayer:
-            # host/singleplayer: gera, move e trata colisões
-            self.bomb_manager.update()
-        else:
-            # cliente: apenas move visualmente as bombas vindas do host
-            for b in self.remote_bombs:
-                b.update()
-
-
-        
-        # Verificação de colisões
-        self.check_all_collisions()
-
-    # Método para verificar colisões
-    def check_all_collisions(self):
-        if self.is_multiplayer:
-            # ----- Host processa colisões para os dois jogadores -----
-            if self.is_host:
-                # Jogador 1
-                if self.invincible_timer_j1 <= 0:  # Verifica se o jogador 1 não está invencível
-                    colisoes = check_tree_collision(  # Verifica colisão do jogador 1 com as árvores
-                        self.player_x, self.player_y,
-                        self.background.tree_manager.arvores,
-                        "Jogador 1"
-                    )
-                    if colisoes > 0:  # Se houve colisão
-                        self.life_player1 = max(0, self.life_player1 - 1)  # Reduz a vida do jogador 1
-                        self.invincible_timer_j1 = self.INVINCIBILITY_DURATION  # Ativa o timer de invencibilidade
-                        if not self.death_delay and not self.game_over and self.life_player1 > 0:  # Se não está em game over e ainda tem vidas
-                            pyxel.play(1, 2)  # Toca o som de colisão
-                            self.pending_sounds.append((1, 2))  # Adiciona o som na fila de sons pendentes
-
-                for boat in self.boat_manager.boats:  # Itera sobre os barcos
-                    if boat.visible and self.invincible_timer_j1 <= 0:  # Verifica se o barco está visível e o jogador 1 não está invencível
-                        left, top, right, bottom = boat.hitbox  # Obtém a hitbox do barco
-                        j_left = self.player_x  # Calcula a hitbox do jogador 1
-                        j_right = self.player_x + PLAYER_WIDTH
-                        j_top = self.player_y
-                        j_bottom = self.player_y + PLAYER_HEIGHT
-                        if (j_right > left and j_left < right and  # Verifica colisão entre o jogador 1 e o barco
-                            j_bottom > top and j_top < bottom):
-                            self.life_player1 = max(0, self.life_player1 - 1)  # Reduz a vida do jogador 1
-                            self.invincible_timer_j1 = self.INVINCIBILITY_DURATION  # Ativa o timer de invencibilidade
-                            if not self.death_delay and not self.game_over and self.life_player1 > 0:  # Se não está em game over e ainda tem vidas
-                                pyxel.play(1, 2)  # Toca o som de colisão
-                                self.pending_sounds.append((1, 2))  # Adiciona o som na fila de sons pendentes
-                            break  # Sai do loop
-
-                # Jogador 2 (posição recebida do cliente)
-                if self.invincible_timer_j2 <= 0:  # Verifica se o jogador 2 não está invencível
-                    colisoes2 = check_tree_collision(  # Verifica colisão do jogador 2 com as árvores
-                        self.player2_x, self.player2_y,
-                        self.background.tree_manager.arvores,
-                        "Jogador 2"
-                    )
-                    if colisoes2 > 0:  # Se houve colisão
-                        self.life_player2 = max(0, self.life_player2 - 1)  # Reduz a vida do jogador 2
-                        self.invincible_timer_j2 = self.INVINCIBILITY_DURATION  # Ativa o timer de invencibilidade
-                        if not self.death_delay and not self.game_over and self.life_player2 > 0:  # Se não está em game over e ainda tem vidas
-                            self.pending_sounds.append((1, 2))  # Adiciona o som na fila de sons pendentes
-
-                for boat in self.boat_manager.boats:  # Itera sobre os barcos
-                    if boat.visible and self.invincible_timer_j2 <= 0:  # Verifica se o barco está visível e o jogador 2 não está invencível
-                        left, top, right, bottom = boat.hitbox  # Obtém a hitbox do barco
-                        j_left = self.player2_x  # Calcula a hitbox do jogador 2
-                        j_right = self.player2_x + PLAYER_WIDTH
-                        j_top = self.player2_y
-                        j_bottom = self.player2_y + PLAYER_HEIGHT
-                        if (j_right > left and j_left < right and  # Verifica colisão entre o jogador 2 e o barco
-                            j_bottom > top and j_top < bottom):
-                            self.life_player2 = max(0, self.life_player2 - 1)  # Reduz a vida do jogador 2
-                            self.invincible_timer_j2 = self.INVINCIBILITY_DURATION  # Ativa o timer de invencibilidade
-                            if not self.death_delay and not self.game_over and self.life_player2 > 0:  # Se não está em game over e ainda tem vidas
-                                self.pending_sounds.append((1, 2))  # Adiciona o som na fila de sons pendentes
-                            break  # Sai do loop
-
-            # ----- Cliente apenas toca som local e gerencia timers -----
-            else:
-                if self.invincible_timer_j2 <= 0:  # Verifica se o jogador 2 não está invencível
-                    colisoes = check_tree_collision(  # Verifica colisão do jogador 2 com as árvores
-                        self.player_x, self.player_y,
-                        self.background.tree_manager.arvores,
-                        "Jogador 2"
-                    )
-                    if colisoes > 0:  # Se houve colisão
-                        self.invincible_timer_j2 = self.INVINCIBILITY_DURATION  # Ativa o timer de invencibilidade
-                        if not self.death_delay and not self.game_over and self.life_player2 > 0:  # Se não está em game over e ainda tem vidas
-                            pyxel.play(1, 2)  # Toca o som de colisão
-
-                for boat in self.remote_boats:  # Itera sobre os barcos remotos
-                    if boat.visible and self.invincible_timer_j2 <= 0:  # Verifica se o barco está visível e o jogador 2 não está invencível
-                        left, top, right, bottom = boat.hitbox  # Obtém a hitbox do barco
-                        j_left = self.player_x  # Calcula a hitbox do jogador 2
-                        j_right = self.player_x + PLAYER_WIDTH
-                        j_top = self.player_y
-                        j_bottom = self.player_y + PLAYER_HEIGHT
-                        if (j_right > left and j_left < right and  # Verifica colisão entre o jogador 2 e o barco
-                            j_bottom > top and j_top < bottom):
-                            self.invincible_timer_j2 = self.INVINCIBILITY_DURATION  # Ativa o timer de invencibilidade
-                            if not self.death_delay and not self.game_over and self.life_player2 > 0:  # Se não está em game over e ainda tem vidas
-                                pyxel.play(1, 2)  # Toca o som de colisão
-                            break  # Sai do loop
-
-        # ----- Modo singleplayer -----
-        else:
-            if self.invincible_timer_j1 <= 0:  # Verifica se o jogador 1 não está invencível
-                colisoes = check_tree_collision(  # Verifica colisão do jogador 1 com as árvores
-                    self.player_x, self.player_y,
-                    self.background.tree_manager.arvores,
-                    "Jogador 1"
-                )
-                if colisoes > 0:  # Se houve colisão
-                    self.life_player1 = max(0, self.life_player1 - 1)  # Reduz a vida do jogador 1
-                    self.invincible_timer_j1 = self.INVINCIBILITY_DURATION  # Ativa o timer de invencibilidade
-                    if self.life_player1 > 0:  # Se ainda tem vidas
-                        pyxel.play(1, 2)  # Toca o som de colisão
-
-            for boat in self.boat_manager.boats:  # Itera sobre os barcos
-                if boat.visible and self.invincible_timer_j1 <= 0:  # Verifica se o barco está visível e o jogador 1 não está invencível
-                    left, top, right, bottom = boat.hitbox  # Obtém a hitbox do barco
-                    j_left = self.player_x  # Calcula a hitbox do jogador 1
-                    j_right = self.player_x + PLAYER_WIDTH
-                    j_top = self.player_y
-                    j_bottom = self.player_y + PLAYER_HEIGHT
-                    if (j_right > left and j_left < right and  # Verifica colisão entre o jogador 1 e o barco
-                        j_bottom > top and j_top < bottom):
-                        self.life_player1 = max(0, self.life_player1 - 1)  # Reduz a vida do jogador 1
-                        self.invincible_timer_j1 = self.INVINCIBILITY_DURATION  # Ativa o timer de invencibilidade
-                        if self.life_player1 > 0:  # Se ainda tem vidas
-                            pyxel.play(1, 2)  # Toca o som de colisão
-                        break  # Sai do loop
-        
-        ## ————— Colisão Tiro × Árvore (host destrói; ambos removem tiro no primeiro hit) —————
-        for shot_list in (self.shots, self.remote_shots):
-            for shot in shot_list.copy():
-                hit = False
-
-                for tree in self.background.tree_manager.arvores:
-                    # ignora árvores já destruídas
-                    if not tree.visible:
-                        continue
-
-                    # calcula hitboxes
-                    left, top, right, bottom = tree.hitbox
-                    s_left = shot.x
-                    s_right = shot.x + shot.width
-                    s_top = shot.y
-                    s_bottom = shot.y + shot.height
-                    
-                    if (s_right > left and s_left < right and
-                        s_bottom > top and s_top < bottom):
-                        # host marca a árvore como destruída
-                        if (self.is_host or not self.is_multiplayer):
-                            tree.visible = False
-
-                            # Host destruiu uma arvore, aumenta a pontuacao
-                            self.score_player1 += 2
-                            # cria explosão no centro da árvore
-                            cx = (left + right) // 2 - 16 // 2
-                            cy = (top  + bottom) // 2 - 16 // 2
-                            self.explosions.append(
-                                Explosion(cx, cy, 16, 16, 16, 16, duration=8)
-                            )
-
-                            pyxel.play(2, 3) # Som de colisao de tiro
-                            if self.is_multiplayer:
-                                self.pending_sounds.append((2, 3)) # Envia para Cliente o som
-                        else:
-                            # Cliente destruiu uma arvore, aumenta a pontuacao
-                            self.score_player2 += 2
-                            pyxel.play(2, 3) # Som de colisao
-                            self.pending_sounds.append((2, 3)) # Envia para Host o som
-                        # qualquer um remove o tiro no primeiro contato
-                        shot_list.remove(shot)
-                        hit = True
-                        break
-
-                if hit:
-                    # já tratou esse tiro—vai para o próximo
-                    continue
-
-                # se não colidiu e saiu da tela, também remove
-                if shot.is_off_screen():
-                    shot_list.remove(shot)
-
-        ## ————— Colisão Tiro × Barco —————
-        # percorre cada lista de tiros
-        for shot_list in (self.shots, self.remote_shots):
-            for shot in shot_list.copy():
-                for boat in (self.boat_manager.boats if (self.is_host or not self.is_multiplayer) else self.remote_boats):
-                    # só colisão em barcos visíveis
-                    if not boat.visible:
-                        continue
-                    # hitbox do barco e do tiro
-                    b_left, b_top, b_right, b_bottom = boat.hitbox
-                    s_left = shot.x
-                    s_right = shot.x + shot.width
-                    s_top = shot.y
-                    s_bottom = shot.y + shot.height
-
-                    if (s_right > b_left and s_left < b_right and
-                        s_bottom > b_top   and s_top < b_bottom):
-                        # host é fonte da verdade: destrói o barco
-                        if (self.is_host or not self.is_multiplayer):
-                            boat.visible = False
-
-                            # Host destruiu um barco, aumenta a pontuacao
-                            self.score_player1 += 4
-                            # spawn de explosão no centro do barco
-                            cx = (b_left + b_right)//2 - 8   # metade de 16px
-                            cy = (b_top  + b_bottom)//2 - 8
-                            self.explosions.append(
-                                Explosion(cx, cy, 16, 16, 16, 16, duration=8)
-                            )
-
-                            pyxel.play(2, 4) # Som de colisao de tiro
-                            if self.is_multiplayer:
-                                self.pending_sounds.append((2, 4)) # Envia para Cliente o som
-                        else:
-                            # Cliente destruiu um barco, aumenta a pontuacao
-                            self.score_player2 += 4
-                            pyxel.play(2, 4) # Som de colisao de tiro
-                            self.pending_sounds.append((2, 4)) # Envia para Cliente o som
-                        # em qualquer caso, remove o tiro no primeiro hit
-                        shot_list.remove(shot)
-                        break
-
-        
-                    
-        # ————— Colisão Jogador × Bomba de Gasolina —————
-        if self.is_host or not self.is_multiplayer:
-            # Host (ou singleplayer): checa ambos jogadores contra o mesmo bomb_manager
-            for b in self.bomb_manager.bombs:
-                if not b.visible:
-                    continue
+        # Comunicação em rede (apenas multiplayer): recebe uma vez por frame, antes dos ticks. O que chegou
+        # é aplicado antes de simular, e um frame com vários ticks não drena a fila nem amostra o buffer de
+        # interpolação de novo a cada tick
+        if self.is_multiplayer and self.lockstep is None:
+            with frame_profiler.section("rede.receber"):
+                self.receive_data()  # Recebe dados do outro jogador
+
+        # Passo fixo: o frame simula quantos ticks o tempo real pedir (zero, um ou mais)
+        for tick_input in self._tick_inputs(self.read_input(), self.frame_ticks()):
+            self.remember_positions()
+            if self.lockstep is not None:
+                # Lockstep: troca as entradas e simula o tick quando as de todos chegaram
+                self.step_lockstep(tick_input)
+                continue
+
+            # Simula e envia o estado resultante
+            with frame_profiler.section("simulacao"):
+                events = self.sim.step(tick_input)
+            self.handle_events(events)
+
+            if self.is_multiplayer:
+                with frame_profiler.section("rede.enviar"):
+                    self.send_data()  # Envia dados do jogador local
+
+        # Fim da tela de Game Over: volta ao menu principal
+        if self.sim.finished:
+            self.close_replay()
+            self.game.network.stop()  # Encerra a conexao
+            self.game.change_state(MenuState(self.game))
 
-                left, top, right, bottom = b.hitbox
-
-                # jogador 1 (host)
-                if (self.player_x + PLAYER_WIDTH > left and
-                    self.player_x < right and
-                    self.player_y + PLAYER_HEIGHT > top and
-                    self.player_y < bottom):
-                    b.visible = False
-                    self.fuel_player1 = min(MAX_FUEL, self.fuel_player1 + 30)
-                    if not self.death_delay and not self.game_over and self.life_player1 > 0:
-                        pyxel.play(3, 5) # Som de pegar gasolina
-                        self.pending_sounds.append((3, 5)) # Envia para Cliente o som
-
-                    continue  # já removido, passa pra próxima bomba
-
-                # jogador 2 (cliente) — só faz se tivermos posição dele
-                if hasattr(self, 'player2_x'):
-                    if (self.player2_x + PLAYER_WIDTH > left and
-                        self.player2_x < right and
-                        self.player2_y + PLAYER_HEIGHT > top and
-                        self.player2_y < bottom):
-                        b.visible = False
-                        self.fuel_player2 = min(MAX_FUEL, self.fuel_player2 + 30)
+    # Fecha o arquivo de replay da partida (fim de jogo ou volta ao menu pelo pause)
+    def close_replay(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            print(f"Replay salvo em {self.recorder.path} ({self.recorder.ticks} ticks, {self.recorder.bytes} bytes)")
+            self.recorder = None
+
+    # Ticks a simular neste frame (um por frame sem o passo fixo)
+    def frame_ticks(self):
+        return self.timestep.advance() if FIXED_TIMESTEP else 1
+
+    # Entradas dos ticks do frame. Os apertos de tecla (tiro, rio) valem uma vez só, no primeiro tick,
+    # ou no próximo frame que tiver tick, se este não tiver nenhum
+    def _tick_inputs(self, tick_input, ticks):
+        held_fire, held_keys = self._held_presses
+        fire = tick_input.player.fire or held_fire
+        keys = held_keys + tuple(key for key in tick_input.river_keys if key not in held_keys)
+        if ticks == 0:
+            self._held_presses = (fire, keys)
+            return []
+        self._held_presses = (False, ())
+        first = tick_input._replace(player=tick_input.player._replace(fire=fire), river_keys=keys)
+        rest = tick_input._replace(player=tick_input.player._replace(fire=False), river_keys=())
+        return [first] + [rest] * (ticks - 1)
+
+    # Guarda as posições dos jogadores antes de um tick (o desenho interpola entre elas e as do tick)
+    def remember_positions(self):
+        self._prev_positions = {p.slot: (p.x, p.y) for p in self.sim.players if p.active}
+
+    # Posição de desenho de um jogador, 'lag' tick atrás da posição atual
+    def _draw_position(self, p, lag):
+        prev = self._prev_positions.get(p.slot)
+        if prev is None or not lag:
+            return p.x, p.y
+        return round(p.x - (p.x - prev[0]) * lag), round(p.y - (p.y - prev[1]) * lag)
 
-        else:
-            # Cliente: só desenha ou “esconde” visualmente a remote_bombs
-            for b in self.remote_bombs:
-                if not b.visible:
-                    continue
-                left, top, right, bottom = b.hitbox
-                if (self.player_x + PLAYER_WIDTH > left and
-                    self.player_x < right and
-                    self.player_y + PLAYER_HEIGHT > top and
-                    self.player_y < bottom):
-                    b.visible = False
-                    
-                    if not self.death_delay and not self.game_over and self.life_player2 > 0:
-                        pyxel.play(3, 5) # Som de pegar gasolina
-                        self.pending_sounds.append((3, 5)) # Envia para Host o som
-
-                    break
-
-        ## ————— Colisão Tiro × Bomba de Gasolina —————
-        if self.is_host or not self.is_multiplayer:
-            # host autoritário: só ele destrói bombas e gera explosão
-            for shot_list in (self.shots,self.remote_shots):
-                for shot in shot_list.copy():
-                    for b in self.bomb_manager.bombs:
-                        if not b.visible:
-                            continue
-                        # hitbox do tiro vs bomba
-                        left, top, right, bottom = b.hitbox
-                        s_left, s_right = shot.x, shot.x + shot.width
-                        s_top, s_bottom = shot.y, shot.y + shot.height
-                        if (s_right > left and s_left < right and
-                            s_bottom > top and s_top < bottom):
-                            # destrói bomba
-                            b.visible = False
-                            # remove o tiro
-                            shot_list.remove(shot)
-                            # spawn de explosão no centro da bomba
-                            cx = b.x + b.width // 2 - 8
-                            cy = b.y + b.height // 2 - 8
-                            self.explosions.append(
-                                Explosion(cx, cy, 16, 16, 16, 16, duration=12)
-                            )
-
-                            pyxel.play(1, 2) # Som de colisao
-                            self.pending_sounds.append((1, 2)) # Envia para Cliente o som
-
-                            break
-        else:
-            # cliente: só esconde visualmente a bomba que vier do host
-            for shot_list in (self.shots,):
-                for shot in shot_list.copy():
-                    for b in self.remote_bombs:
-                        if not b.visible:
-                            continue
-                        left, top, right, bottom = b.hitbox
-                        s_left, s_right = shot.x, shot.x + shot.width
-                        s_top, s_bottom = shot.y, shot.y + shot.height
-                        if (s_right > left and s_left < right and
-                            s_bottom > top and s_top < bottom):
-                            b.visible = False
-                            shot_list.remove(shot)
-
-                            pyxel.play(1, 2) # Som de colisao
-                            self.pending_sounds.append((1, 2)) # Envia para Host o som
-                            
-                            break
-                        
-        # Jogador 1 morreu?
-        if self.life_player1 == 0 and not getattr(self, "_exploded_j1", False) and (self.is_host or not self.is_multiplayer):
-            # marca que já acionou explosão
-            self._exploded_j1 = True
-            # centro do avião 1
-
-            cx = self.player_x + PLAYER_WIDTH//2 - 8
-            cy = self.player_y + PLAYER_HEIGHT//2 - 8
-            self.explosions.append(
-                Explosion(cx, cy, 16, 16, 16, 16, duration=30)
-            )
-
-            pyxel.play(1, 2) # Som de explosao
-            self.pending_sounds.append((1, 2)) # Envia para Cliente o som
-
-        # Jogador 2 morreu?
-        if self.is_multiplayer and self.life_player2 == 0 and not getattr(self, "_exploded_j2", False):
-            self._exploded_j2 = True
-            # posição do avião 2 depende se host ou client
-            px, py = (self.player2_x, self.player2_y) if self.is_host else (self.player_x, self.player_y)
-            cx = px + PLAYER_WIDTH//2 - 8
-            cy = py + PLAYER_HEIGHT//2 - 8
-            self.explosions.append(
-                Explosion(cx, cy, 16, 16, 16, 16, duration=30)
-            )
-
-            pyxel.play(1, 2) # Som de explosao
-            self.pending_sounds.append((1, 2)) # Envia para Cliente o som
-
-        # ————— Perda de vida quando acaba o combustível —————
-        # apenas o host (ou singleplayer) aplica a penalidade
-        if self.is_host or not self.is_multiplayer:
-            # — jogador 1 sem gasolina
-            if self.fuel_player1 <= 0:
-                self.life_player1 = max(0, self.life_player1 - 1)
-                self.invincible_timer_j1 = self.INVINCIBILITY_DURATION
-                self.fuel_player1 = MAX_FUEL
-
-            # — jogador 2 sem gasolina (só faz sentido em multiplayer)
-            if self.is_multiplayer and self.fuel_player2 <= 0:
-                self.life_player2 = max(0, self.life_player2 - 1)
-                self.invincible_timer_j2 = self.INVINCIBILITY_DURATION
-                self.fuel_player2 = MAX_FUEL
-
-
-        # Jogador 1 morreu?
-        if self.life_player1 == 0 and not getattr(self, "_exploded_j1", False) and (self.is_host or not self.is_multiplayer):
-            # marca que já acionou explosão
-            self._exploded_j1 = True
-            # centro do avião 1
-
-            cx = self.player_x + PLAYER_WIDTH//2 - 8
-            cy = self.player_y + PLAYER_HEIGHT//2 - 8
-            self.explosions.append(
-                Explosion(cx, cy, 16, 16, 16, 16, duration=30)
-            )
-
-            pyxel.play(1, 2) # Som de explosao
-            self.pending_sounds.append((1, 2)) # Envia para Cliente o som
-
-        # Jogador 2 morreu?
-        if self.is_multiplayer and self.life_player2 == 0 and not getattr(self, "_exploded_j2", False):
-            self._exploded_j2 = True
-            # posição do avião 2 depende se host ou client
-            px, py = (self.player2_x, self.player2_y) if self.is_host else (self.player_x, self.player_y)
-            cx = px + PLAYER_WIDTH//2 - 8
-            cy = py + PLAYER_HEIGHT//2 - 8
-            self.explosions.append(
-                Explosion(cx, cy, 16, 16, 16, 16, duration=30)
-            )
-
-            pyxel.play(1, 2) # Som de explosao
-            self.pending_sounds.append((1, 2)) # Envia para Cliente o som
-
-        # Fim de jogo:
-        # Condição SINGLEPLAYER
-        if not self.is_multiplayer and self.life_player1 == 0 and not self.death_delay:
-            self.death_delay = True
-            self.death_delay_timer = 2 * FPS   # 2 segundos de delay
-            music.stop_music() # Para a musica
-
-        # Condição MULTIPLAYER
-        elif self.is_multiplayer and self.life_player1 == 0 and (not self.game.network.connected or self.life_player2 == 0) and not self.death_delay:
-            self.death_delay = True
-            self.death_delay_timer = 2 * FPS    # 2 segundos de delay
-            music.stop_music() # Para a musica
-
-       
-
-    def update_shots(self):
-        """Atualiza posição e descarta tiros fora da tela — usado tanto em play quanto em pause."""
-        # locais
-        for shot in self.shots:
-            shot.update()
-        self.shots = [s for s in self.shots if not s.is_off_screen()]
-
-        # remotos
-        for shot in self.remote_shots:
-            shot.update()
-        self.remote_shots = [s for s in self.remote_shots if not s.is_off_screen()]
-        
     # Método para enviar dados pela rede
     def send_data(self):
-        if self.is_multiplayer and self.game.network.connected:
-            if self.is_host:
-                data = {
-                    'player': [self.player_x, self.player_y],  # Posição atual
-                    'rio_centro': self.background.centro_rio_x,  # Posição do rio
-                    'rio_largura': self.background.largura_rio,       # ← NOVO
-                    'seed': self.background.tree_manager.random_seed,  # Seed aleatória
-                    'invincible': self.invincible_timer_j1 if self.is_host else self.invincible_timer_j2,  # Timer de invencibilidade
-                    'type': 'game_update', # Tipo de mensagem
-                    'arvores': self.background.tree_manager.get_tree_states() , # Adicione esta linha
-                    'shots': [shot.to_dict() for shot in self.shots],
-                    'explosions': [exp.to_dict() for exp in self.explosions],
-                    'boats': self.boat_manager.get_states(),
-                    'player_type': 'host',
-                    'bombs': self.bomb_manager.get_states(),
-                    'player_x': self.player_x,
-                    'player_y': self.player_y,
-                    'fuel_player1': self.fuel_player1,
-                    'fuel_player2': self.fuel_player2,
-                    'lives_player1': self.life_player1,
-                    'lives_player2': self.life_player2,
-                    "sounds": self.pending_sounds
-                }
-            else:
-                data = {
-                    'player': [self.player_x, self.player_y],  # Posição atual
-                    'rio_centro': self.background.centro_rio_x,  # Posição do rio
-                    'rio_largura': self.background.largura_rio,       # ← NOVO
-                    'seed': self.background.tree_manager.random_seed,  # Seed aleatória
-                    'invincible': self.invincible_timer_j1 if self.is_host else self.invincible_timer_j2,  # Timer de invencibilidade
-                    'type': 'game_update', # Tipo de mensagem
-                    'arvores': self.background.tree_manager.get_tree_states() , # Adicione esta linha
-                    'shots': [shot.to_dict() for shot in self.shots],
-                    'explosions': [exp.to_dict() for exp in self.explosions],
-                    'boats': self.boat_manager.get_states(),
-                    'player_type': 'client',
-                    'bombs': self.bomb_manager.get_states(),
-                    'player_x': self.player_x,
-                    'player_y': self.player_y,
-                    "sounds": self.pending_sounds
-                }
-
-            self.pending_sounds = []  # limpa a fila de sons
-                                
-            self.game.network.send(data)  # Envia os dados
+        if self.is_multiplayer and self.game.network.connected and self.send_timer.due():
+            self.game.network.send(self.sim.snapshot())  # Envia os dados (e os eventos acumulados desde o ultimo envio)
 
     # Método para receber dados da rede
     def receive_data(self):
-        # Define a função receive_data como método da classe (self é a referência ao objeto)
-        
-        if self.is_multiplayer and isinstance(self.game.network.data, dict):
-            # Verifica se o jogo está no modo multiplayer E se os dados recebidos da rede são um dicionário
-            
-            data = self.game.network.data
-            # Armazena os dados recebidos da rede na variável local 'data' para facilitar acesso
-            if (len(data) > 1): # ignora heartbeat
-                try:
-                    # Inicia um bloco try para capturar possíveis erros no processamento dos dados
-                    
-                    # Atualiza posição do outro jogador
-                    self.player2_x, self.player2_y = data['player']
-                    # Extrai as coordenadas x e y do outro jogador do dicionário de dados
-                    ## tanto host quanto cliente atualizam os remote_shots
-                    if 'shots' in data:
-                        self.remote_shots = [Shot.from_dict(d) for d in data['shots']]
-
-                    if 'explosions' in data:
-                            # reconstrói explosões que vieram do outro lado
-                            self.remote_explosions = [
-                                Explosion.from_dict(d) for d in data['explosions']
-                            ]
-
-                    # Atualiza barcos remotos (apenas cliente recebe)
-                    if 'boats' in data and not self.is_host:
-                        # cliente reconstrói lista de barcos
-                        self.remote_boats = [Boat.from_dict(d) for d in data['boats']]
-
-
-                     # Sincroniza bombas
-                    if 'bombs' in data and not self.is_host:
-                        from entities import GasolineBomb
-                        self.remote_bombs = [
-                            GasolineBomb.from_dict(d) for d in data['bombs']
-                        ]
-                    # Sincroniza temporizador de invencibilidade
-                    if self.is_host:   
-                        # Pega gasolina  se o host recebe um pacote do cliente
-                        if data.get('player_type') == 'client':
-                            # apenas posição e invencibilidade do jogador 2
-                            self.player2_x = data['player_x']
-                            self.player2_y = data['player_y']
-                            self.invincible_timer_j2 = data.get('invincible_j2', self.invincible_timer_j2)
-                            
-                            # Toca os sons recebidos pelo Cliente
-                            for channel, sound_id in data.get("sounds", []): 
-                                pyxel.play(channel, sound_id)
-                            # NÃO sobrescreva fuel nem lives aqui!
-                        else:  # cliente
-                            if data.get('player_type') == 'host':
-                                # posição e invincibility do jogador 1
-                                self.player2_x = data['player_x']
-                                self.player2_y = data['player_y']
-                                self.invincible_timer_j1 = data.get('invincible_j1', self.invincible_timer_j1)
-                                self.invincible_timer_j2 = data.get('invincible_j2', self.invincible_timer_j2)
-                                # agora fuel e lives de ambos
-                                self.fuel_player1  = data.get('fuel_player1',  self.fuel_player1)
-                                self.fuel_player2  = data.get('fuel_player2',  self.fuel_player2)
-                                self.life_player1  = data.get('lives_player1', self.life_player1)
-                                self.life_player2  = data.get('lives_player2', self.life_player2)
-                                # cenário, barcos, bombas, etc.
-                                self.background.centro_rio_x = data['rio_centro']
-                                self.background.target_centro_x = data['rio_centro']
-                                self.background.largura_rio    = data['rio_largura']
-                                self.background.target_largura = data['rio_largura']
-                                self.background.tree_manager.set_tree_states(data['arvores'])
-                                self.remote_shots      = [Shot.from_dict(d) for d in data['shots']]
-                                self.remote_explosions = [Explosion.from_dict(d) for d in data['explosions']]
-                                self.remote_boats      = [Boat.from_dict(d) for d in data['boats']]
-                                self.remote_bombs      = [GasolineBomb.from_dict(d) for d in data['bombs']]
-
-                                # Toca os sons recebidos pelo Host
-                                for channel, sound_id in data.get("sounds", []): 
-                                    pyxel.play(channel, sound_id)
-                        # Verifica se esta instância é o host (jogador 1)
-                        self.invincible_timer_j2 = data.get('invincible', 0)
-                        # Host recebe o timer de invencibilidade do cliente (jogador 2)
-                        # Usa .get() para evitar KeyError, retornando 0 se 'invincible' não existir
-                    else:
-                        # Pega gasolina  se o cliente recebe um pacote do host
-                        # Cliente recebe do host
-                        if data.get('player_type') == 'host':
-                            # atualiza os combustíveis
-                            self.fuel_player1 = data.get('fuel_player1', self.fuel_player1)
-                            self.fuel_player2 = data.get('fuel_player2', self.fuel_player2)
-                            # agora também atualiza a vida do jogador 2
-                            self.life_player1 = data.get('lives_player1', self.life_player1)
-                            self.life_player2 = data.get('lives_player2', self.life_player2)
-                        # Caso contrário (se for o cliente)
-                        self.invincible_timer_j1 = data.get('invincible', 0)
-                        # Cliente recebe o timer de invencibilidade do host (jogador 1)
-                        
-                    # Clientes sincronizam posição do rio
-                    if not self.is_host:
-                        # Verifica se NÃO é o host (ou seja, é o cliente)
-                        self.background.centro_rio_x = data['rio_centro']
-                        # Atualiza a posição central atual do rio no background
-                        self.background.target_centro_x = data['rio_centro']
-                        # Atualiza também a posição alvo (target) do rio para sincronizar a animação
-                    
-                    if not self.is_host and 'rio_largura' in data:
-                        self.background.largura_rio    = data['rio_largura']
-                        self.background.target_largura = data['rio_largura']
-                        
-                    # Sincroniza seed aleatória se necessário
-                    if 'seed' in data and data['seed'] != self.background.tree_manager.random_seed:
-                        # Verifica se existe uma seed nos dados E se é diferente da seed atual
-                        self.background.tree_manager.random_seed = data['seed']
-                        # Atualiza a seed aleatória no gerenciador de árvores
-                        random.seed(data['seed'])
-                        # Define a seed global do módulo random para manter consistência
-                        self.background.tree_manager.reset_arvores()
-                        # Reinicia as árvores com a nova seed para sincronizar a geração aleatória
-                    # Sincroniza árvores
-                    if 'arvores' in data and not self.is_host:
-                        self.background.tree_manager.set_tree_states(data['arvores'])
-                except (KeyError, TypeError):
-                    # Captura exceções caso haja erro ao acessar chaves do dicionário ou tipos incorretos
-                    print("Erro na sincronização dos dados")
-                    # Imprime mensagem de erro (poderia ser tratado de forma mais robusta em produção)
+        if not self.is_multiplayer:
+            return
+        network = self.game.network
+        # Tudo o que chegou desde o ultimo frame (no maximo um snapshot por sessao, a menos que
+        # o cliente interpole: o buffer quer todos)
+        for message in network.drain(coalesce=self.interp is None):
+            data = message.payload
+            # ignora heartbeat e o 'game_start' que ainda pode estar chegando
+            if isinstance(data, dict) and data.get('type') == 'game_update':
+                if self.interp is not None and message.timestamp is not None:
+                    # o aviao local eh corrigido pelo snapshot mais novo; o resto eh interpolado
+                    self.sim.reconcile(data)
+                    self.interp.push(message.timestamp, data, message.recv_time)
+                else:
+                    self.sim.apply_snapshot(data, message.slot if self.is_host else None)
+        if self.interp is not None:
+            data = self.interp.sample(time.time())
+            if data is not None:
+                self.sim.apply_snapshot(data, reconcile=False)
+        if self.is_host:
+            # quem saiu deixa a partida
+            self.sim.sync_peers(network.peer_slots())
+
+    # Um frame do lockstep: recebe as entradas dos outros, agenda a local, simula e envia as entradas
+    def step_lockstep(self, tick_input):
+        network = self.game.network
+        lockstep = self.lockstep
+        with frame_profiler.section("rede.receber"):
+            for message in network.drain():
+                data = message.payload
+                if isinstance(data, dict) and data.get('type') == 'lockstep':
+                    lockstep.receive(message.slot, data)
+
+        peers = network.peer_slots() & set(lockstep.slots)
+        if self.is_host:
+            # quem saiu da partida segue com entrada neutra (o host decide e repassa a todos)
+            for slot in lockstep.slots:
+                if slot != lockstep.local_slot and slot not in peers:
+                    lockstep.drop(slot)
+
+        lockstep.add_local(tick_input)
+        with frame_profiler.section("simulacao"):
+            events = lockstep.step(self.sim, tick_input.peer_connected)
+        if events is not None:
+            self.handle_events(events)
+
+        if network.connected:
+            with frame_profiler.section("rede.enviar"):
+                for slot in peers:
+                    if self.is_host and slot not in lockstep.heard:
+                        network.send_to(slot, self.start_message())  # o 'game_start' pode ter se perdido
+                    network.send_to(slot, lockstep.message(slot))
 
     # Método para desenhar o jogo
     def draw(self):
+        sim = self.sim
+
         # Se o jogo acabou
-        if self.game_over:
+        if sim.game_over:
             # pinta tudo de preto
             pyxel.cls(0)
             # escreve no centro
@@ -1311,100 +728,85 @@ class GameState:
         sep_y = SCREEN_HEIGHT - HUD_HEIGHT # Posicao em 'Y' = Separador eh igual a altura da tela menos a altura da HUD
         pyxel.clip(0, 0, SCREEN_WIDTH, sep_y) # Define o clip para a área de jogo
 
-        self.background.draw()                                # Desenha o cenário de fundo
+        # Passo fixo: desenha entre os dois últimos ticks, 'lag' tick atrás do estado atual (0 a 1).
+        # O cenário, os barcos e as bombas descem juntos com o scroll; tiros e jogadores têm velocidade própria
+        lag = 1 - self.timestep.alpha if FIXED_TIMESTEP else 0
+        pyxel.camera(0, round(lag * sim.background.velocidade_scroll))
+
+        with frame_profiler.section("desenho.rio"):
+            sim.background.draw()                            # Desenha o cenário de fundo
 
         # desenha barcos locais e remotos
-        self.boat_manager.draw()
-        for b in self.remote_boats:
+        sim.boat_manager.draw()
+        for b in sim.remote_boats:
             b.draw()
 
        # Bombas: cliente só desenha remote_bombs
-        if self.is_host or not self.is_multiplayer:
-            self.bomb_manager.draw()
+        if sim.is_host or not sim.is_multiplayer:
+            sim.bomb_manager.draw()
         else:
-            for b in self.remote_bombs:
+            for b in sim.remote_bombs:
                 b.draw()
 
-        # desenha tiros locais
-        for shot in self.shots:
-            shot.draw()
-        # desenha tiros vindos pela rede
-        for shot in self.remote_shots:
-            shot.draw()
+        # desenha tiros locais e os vindos pela rede
+        for shot_list in (sim.shots, sim.remote_shots):
+            for shot in shot_list:
+                pyxel.camera(0, round(lag * shot.vy))
+                shot.draw()
+        pyxel.camera()
 
         # desenha explosões locais
-        for exp in self.explosions:
+        for exp in sim.explosions:
             exp.draw()
         # desenha explosões vindas pela rede
-        for exp in self.remote_explosions:
+        for exp in sim.remote_explosions:
             exp.draw()
 
-        # Lógica de piscar durante invencibilidade
-        should_draw_j1 = (self.invincible_timer_j1 // 5) % 2 == 0 if self.invincible_timer_j1 > 0 else True  # Define se o jogador 1 deve piscar (quando invencível)
-        should_draw_j2 = (self.invincible_timer_j2 // 5) % 2 == 0 if self.invincible_timer_j2 > 0 else True  # Define se o jogador 2 deve piscar (quando invencível)
-
-        if self.is_multiplayer:
-            if self.life_player1 > 0:
-                # Renderização do jogador 1
-                if should_draw_j1:             # Verifica se é multiplayer E se deve desenhar o jogador 1
-                    if self.is_host:                                  # Se for o host (jogador 1)
-                        pyxel.blt(self.player_x, self.player_y, 0, 32, 0, PLAYER_WIDTH, PLAYER_HEIGHT, colkey=0)  # Desenha o avião (host)
-                    else:                                              # Se for o cliente
-                        pyxel.blt(self.player2_x, self.player2_y, 0, 32, 0, PLAYER_WIDTH, PLAYER_HEIGHT, colkey=0)  # Desenha o avião do host na posição recebida
-                
-            if self.game.network.connected and self.life_player2 > 0:
-                # Renderização do jogador 2 (helicóptero)
-                if should_draw_j2:
-                    # Animação da hélice (alterna entre dois frames a cada 5 frames)
-                    helicopter_frame = (pyxel.frame_count // 5) % 2
-                    
-                    # Coordenadas dos frames na imagem (48,0) e (0,16)
-                    u = 48 if helicopter_frame == 0 else 0
-                    v = 0 if helicopter_frame == 0 else 16
-
-                    if self.is_host:
-                        pyxel.blt(
-                            self.player2_x, self.player2_y,
-                            0,            # Banco de imagens
-                            u, v,         # Coordenadas do frame
-                            PLAYER_WIDTH, PLAYER_HEIGHT,
-                            colkey=0
-                        )
-                    else:
-                        pyxel.blt(
-                            self.player_x, self.player_y,
-                            0,            # Banco de imagens
-                            u, v,         # Coordenadas do frame
-                            PLAYER_WIDTH, PLAYER_HEIGHT,
-                            colkey=0
-                        )
+        # Jogadores ativos e vivos (o host/singleplayer eh o avião, os outros são helicópteros)
+        for p in sim.players:
+            if not p.alive:
+                continue
+            # Lógica de piscar durante invencibilidade
+            if p.invincible > 0 and (p.invincible // 5) % 2 != 0:
+                continue
+            x, y = self._draw_position(p, lag)
+            if p.slot == 0:
+                pyxel.blt(x, y, 0, 32, 0, PLAYER_WIDTH, PLAYER_HEIGHT, colkey=0)  # Desenha o avião
+            else:
+                # Animação da hélice (alterna entre dois frames a cada 5 frames)
+                helicopter_frame = (pyxel.frame_count // 5) % 2
+
+                # Coordenadas dos frames na imagem (48,0) e (0,16)
+                u = 48 if helicopter_frame == 0 else 0
+                v = 0 if helicopter_frame == 0 else 16
+                pyxel.blt(
+                    x, y,
+                    0,            # Banco de imagens
+                    u, v,         # Coordenadas do frame
+                    PLAYER_WIDTH, PLAYER_HEIGHT,
+                    colkey=0
+                )
 
-            
+        if sim.is_multiplayer:
             # Status da conexão
             if self.game.network.connected:                        # Verifica se há conexão de rede
-                pyxel.text(10, 10, "Multiplayer - Conectado", 0)   # Mostra status "Conectado"
+                pyxel.text(10, 10, f"Multiplayer - Conectado ({len(sim.active_players)})", 0)   # Mostra status "Conectado"
             else:                                                  # Se não estiver conectado
                 pyxel.text(10, 10, "Multiplayer - Desconectado", 0)  # Mostra status "Desconectado"
-
-        # Modo singleplayer
-        else:
-            # Se não for multiplayer E deve desenhar o jogador e jogador tem vida maior que zero
-            if should_draw_j1 and self.life_player1 > 0:         
-                pyxel.blt(self.player_x, self.player_y, 0, 32, 0, PLAYER_WIDTH, PLAYER_HEIGHT, colkey=0)  # Desenha o jogador único
+            if self.lockstep is not None and self.lockstep.desyncs:
+                pyxel.text(10, 18, f"Dessincronizado (tick {self.lockstep.desync_tick})", COLOR_ERROR)
 
         # Desativa o clip (volta ao desenho em tela cheia)
         pyxel.clip()
         pyxel.line(0, sep_y, SCREEN_WIDTH, sep_y, COLOR_HUD_LINE) # Desenha a linha horizontal da hud
-        if self.is_multiplayer:
-           # Logica para as duas barras de combustivel (jogador 1 e 2):
-
-            # Calcula largura das barras: (largura_total - (3*padding)) / 2
-            # De forma que caiba duas barras + 3 *paddings (de espaco entre elas):
-            bar_w = (SCREEN_WIDTH - 3 * PADDING) // 2
+        if sim.is_multiplayer:
+            # Uma coluna por jogador na partida: barra de combustivel, coracoes e pontuacao
+            players = sim.active_players
+            n = max(1, len(players))
 
-            # Posicoes X das duas barras:
-            x1 = PADDING # Barra esquerda
-            x2 = (PADDING * 2) + bar_w # Barra direita ((padding * 2) + largura da primeira barra)
+            # Calcula largura das barras: (largura_total - ((n + 1) * padding)) / n
+            # De forma que caibam n barras + (n + 1) paddings (de espaco entre elas):
+            bar_w = (SCREEN_WIDTH - (n + 1) * PADDING) // n
 
             # Posicao Y inicial das barras (2px abaixo do separador da HUD)
             y_bar = sep_y + 2
@@ -1412,75 +814,57 @@ class GameState:
             y_heart = y_bar + FUEL_BAR_H + 2 # Posicao Y dos coracoes
             # Centraliza coracao abaixo da barra
             total_heart_w = MAX_LIVES * HEART_SIZE + (MAX_LIVES - 1) * HEART_GAP # Largura total dos coracoes
-            
-            # Desenha HUD do jogador 1 se ele estiver vivo
-            if self.life_player1 > 0:
-                # Barra de combustivel - Jogador 1
-                # desenha barra do jogador 1
-                pyxel.rectb(x1, y_bar, bar_w, FUEL_BAR_H, COLOR_FUEL_BORDER) # Desenha borda da barra
-                filled1 = int((self.fuel_player1 / MAX_FUEL) * (bar_w - 2)) # Calcula o nivel de preenchimento da barra
-                pyxel.rect(x1 + 1, y_bar + 1, filled1, FUEL_BAR_H - 2, COLOR_FUEL) # Preenche proporcionalmente a barra de gasolina
-
-                # Coracao - Jogador 1
-                start_x1 = x1 + (bar_w - total_heart_w) // 2 # Calcula posicao inicial para centralizar
 
-                # Desenha cada coracao (cheio ou vazio)
-                for i in range(MAX_LIVES):
-                    cx = start_x1 + i * (HEART_SIZE + HEART_GAP) # Posicao X do coracao atual
-
-                    if self.life_player1 > i:
-                        pyxel.blt(cx, y_heart, 0, 0, 32, HEART_SIZE, HEART_SIZE, colkey=0)  # Desenha coracao cheio
-                    else:
-                        pyxel.blt(cx, y_heart, 0, 8, 32, HEART_SIZE, HEART_SIZE, colkey=0)  # Desenha coracao vazio
-                
-                # Pontuação jogador 1
-                pyxel.text(
-                    x1,                     # x centralizado
-                    y_bar + FUEL_BAR_H + HEART_SIZE + 4,   # 1px abaixo dos corações
-                    f"Score P1: {self.score_player1}",
-                    COLOR_TEXT
-                )
-
-            # Desenha HUD do jogador 2 se ele estiver vivo e o jogo conectado
-            if self.game.network.connected and self.life_player2 > 0:
-
-                # Barra de combustivel - Jogador 2 
-                pyxel.rectb(x2, y_bar, bar_w, FUEL_BAR_H, COLOR_FUEL_BORDER) # Desenha borda da barra
-                filled2 = int((self.fuel_player2 / MAX_FUEL) * (bar_w - 2)) # Calcula o nivel de preenchimento da barra
-                pyxel.rect(x2 + 1, y_bar + 1, filled2, FUEL_BAR_H - 2, COLOR_FUEL) # Preenche proporcionalmente a barra de gasolina
+            for column, p in enumerate(players):
+                # Desenha HUD do jogador apenas se ele estiver vivo
+                if p.lives <= 0:
+                    continue
+                x = PADDING + column * (bar_w + PADDING) # Posicao X da coluna do jogador
 
+                # Barra de combustivel
+                pyxel.rectb(x, y_bar, bar_w, FUEL_BAR_H, COLOR_FUEL_BORDER) # Desenha borda da barra
+                filled = int((p.fuel / MAX_FUEL) * (bar_w - 2)) # Calcula o nivel de preenchimento da barra
+                pyxel.rect(x + 1, y_bar + 1, filled, FUEL_BAR_H - 2, COLOR_FUEL) # Preenche proporcionalmente a barra de gasolina
 
-                # Coracao - Jogador 2 (ja foi calculado a largura total dos coracoes)
-                start_x2 = x2 + (bar_w - total_heart_w) // 2 # Calcula posicao inicial para centralizar
+                if total_heart_w <= bar_w:
+                    # Coracoes centralizados abaixo da barra
+                    start_x = x + (bar_w - total_heart_w) // 2 # Calcula posicao inicial para centralizar
 
-                # Desenha cada coracao (cheio ou vazio)
-                for i in range(MAX_LIVES):
-                    cx = start_x2 + i * (HEART_SIZE + HEART_GAP) # Posicao X do coracao atual
+                    # Desenha cada coracao (cheio ou vazio)
+                    for i in range(MAX_LIVES):
+                        cx = start_x + i * (HEART_SIZE + HEART_GAP) # Posicao X do coracao atual
 
-                    if self.life_player2 > i:
-                        pyxel.blt(cx, y_heart, 0, 0, 32, HEART_SIZE, HEART_SIZE, colkey=0)  # Desenha coracao cheio
-                    else:
-                        pyxel.blt(cx, y_heart, 0, 8, 32, HEART_SIZE, HEART_SIZE, colkey=0)  # Desenha coracao vazio
+                        if p.lives > i:
+                            pyxel.blt(cx, y_heart, 0, 0, 32, HEART_SIZE, HEART_SIZE, colkey=0)  # Desenha coracao cheio
+                        else:
+                            pyxel.blt(cx, y_heart, 0, 8, 32, HEART_SIZE, HEART_SIZE, colkey=0)  # Desenha coracao vazio
+                    label = f"Score P{p.slot + 1}: {p.score}" if bar_w >= 60 else f"P{p.slot + 1}:{p.score}"
+                else:
+                    # Coluna estreita (muitos jogadores): um coracao e a quantidade de vidas
+                    pyxel.blt(x, y_heart, 0, 0, 32, HEART_SIZE, HEART_SIZE, colkey=0)
+                    pyxel.text(x + HEART_SIZE + 1, y_heart + 1, str(p.lives), COLOR_TEXT)
+                    label = str(p.score)
 
-                # Pontuação jogador 2
+                # Pontuação do jogador
                 pyxel.text(
-                    x2,                     # x centralizado
+                    x,
                     y_bar + FUEL_BAR_H + HEART_SIZE + 4,   # 1px abaixo dos corações
-                    f"Score P2: {self.score_player2}",
+                    label,
                     COLOR_TEXT
                 )
 
         # HUD para modo singleplayer
         else:
+            p = sim.player
             # HUD centralizada
             cx = (SCREEN_WIDTH - FUEL_BAR_W) // 2 # Centraliza caoracao em 'X' na horizontal
             y_bar = sep_y + 2 # Posicao Y inicial das barras de gasolina (2px abaixo do separador da HUD)
 
             # Desenha HUD do jogador 1 se ele estiver vivo
-            if self.life_player1 > 0:
+            if p.lives > 0:
                 # Desenha uma unica barra de combustivel:
                 pyxel.rectb(cx, y_bar, FUEL_BAR_W, FUEL_BAR_H, COLOR_FUEL_BORDER) # Desenha borda da barra
-                filled = int((self.fuel_player1 / MAX_FUEL) * (FUEL_BAR_W - 2)) # Calcula o nivel de preenchimento da barra
+                filled = int((p.fuel / MAX_FUEL) * (FUEL_BAR_W - 2)) # Calcula o nivel de preenchimento da barra
                 pyxel.rect(cx+1, y_bar+1, filled, FUEL_BAR_H-2, COLOR_FUEL) # Preenche proporcionalmente a barra de gasolina
 
                 # Coracoes
@@ -1490,7 +874,7 @@ class GameState:
                 # Desenha cada coracao (cheio ou vazio)
                 for i in range(MAX_LIVES): 
                     xh = start_x + i*(HEART_SIZE + HEART_GAP) # Posicao X do coracao atual
-                    if self.life_player1 > i:
+                    if p.lives > i:
                         pyxel.blt(xh, y_heart, 0, 0, 32, HEART_SIZE, HEART_SIZE, colkey=0)  # Desenha coracao cheio
                     else:
                         pyxel.blt(xh, y_heart, 0, 8, 32, HEART_SIZE, HEART_SIZE, colkey=0)  # Desenha coracao vazio
@@ -1499,26 +883,119 @@ class GameState:
                 pyxel.text(
                     cx,                     # x centralizado
                     y_bar + FUEL_BAR_H + HEART_SIZE + 4,   # 1px abaixo dos corações
-                    f"Score: {self.score_player1}",
+                    f"Score: {p.score}",
                     COLOR_TEXT
                 )
 
         # # Debug: mostra posições
-        # if self.is_host:                                       # Se for o host
-        #     pyxel.text(10, 20, f"Host: {self.player_x},{self.player_y}", 7)  # Mostra posição do host
-        #     pyxel.text(10, 30, f"Cliente: {self.player2_x},{self.player2_y}", 7)  # Mostra posição do cliente
-        # else:                                                  # Se for o cliente
-        #     pyxel.text(10, 20, f"Host: {self.player2_x},{self.player2_y}", 7)  # Mostra posição do host
-        #     pyxel.text(10, 30, f"Cliente: {self.player_x},{self.player_y}", 7)  # Mostra posição do cliente        
+        # for p in sim.active_players:
+        #     pyxel.text(10, 20 + 10 * p.slot, f"P{p.slot + 1}: {p.x},{p.y}", 7)  # Mostra posição de cada jogador
 
         # # Debug: hitbox das árvores
-        # for arvore in self.background.tree_manager.arvores:    # Itera por todas as árvores
+        # for arvore in sim.background.tree_manager.arvores:    # Itera por todas as árvores
         #     arv_left, arv_top, arv_right, arv_bottom = arvore.hitbox  # Obtém coordenadas da hitbox
         #     pyxel.rectb(arv_left, arv_top, arv_right - arv_left, arv_bottom - arv_top, 8)  # Desenha retângulo da hitbox
         # # debug: hitbox dos barcos
-        # for b in self.boat_manager.boats:
+        # for b in sim.boat_manager.boats:
         #     bar_left, bar_top, bar_right, bar_bottom = b.hitbox  # Obtém coordenadas da hitbox
         #     pyxel.rectb(bar_left, bar_top, bar_right - bar_left, bar_bottom - bar_top, 8)  # Desenha retângulo da hitbox
-        # # # Debug: hitbox do jogador 1
-        # pyxel.rectb(self.player_x, self.player_y, PLAYER_WIDTH, PLAYER_HEIGHT, 8)  # Desenha retângulo da hitbox do jogador 1
+        # # # Debug: hitbox do jogador local
+        # pyxel.rectb(sim.player.x, sim.player.y, PLAYER_WIDTH, PLAYER_HEIGHT, 8)  # Desenha retângulo da hitbox do jogador
 
+
+# Overlay do profiler (F3, ver profiler.py): tempos por seção do frame, histograma dos tempos de frame,
+# entidades da partida e tráfego de rede. Desenhado pelo Game.draw por cima de qualquer estado
+class ProfilerOverlay:
+    # Ordem das seções na tela (as que ainda não rodaram ficam de fora)
+    SECTIONS = ("update", "simulacao", "rede.receber", "rede.enviar", "rede.delta", "rede.codificar",
+                "rede.decodificar", "draw", "desenho.rio")
+
+    def __init__(self, game):
+        self.game = game
+        self.visible = False
+        self._traffic = deque(maxlen=PROFILER_WINDOW)  # (horário, bytes enviados, bytes recebidos) por frame
+        self.set_visible(PROFILER_OVERLAY)
+
+    def set_visible(self, visible):
+        self.visible = visible
+        frame_profiler.set_enabled(visible)  # Escondido, os ganchos não medem nada
+        self._traffic.clear()
+
+    def toggle(self):
+        self.set_visible(not self.visible)
+
+    # Chamado a cada frame pelo Game.update: guarda os contadores de tráfego para as taxas
+    def update(self):
+        if self.visible:
+            _, sent, _, received = self.game.network.traffic()
+            self._traffic.append((time.perf_counter(), sent, received))
+
+    # (kB/s recebidos, kB/s enviados) na janela
+    def _rates(self):
+        if len(self._traffic) < 2:
+            return 0.0, 0.0
+        (t0, sent0, recv0), (t1, sent1, recv1) = self._traffic[0], self._traffic[-1]
+        dt = max(t1 - t0, 1e-6)
+        return (recv1 - recv0) / dt / 1024, (sent1 - sent0) / dt / 1024
+
+    # Simulação da partida em andamento (também atrás do menu de pause), ou None
+    def _simulation(self):
+        state = self.game.current_state
+        if isinstance(state, PauseMenuState):
+            state = self.game.previous_state
+        return state.sim if isinstance(state, GameState) else None
+
+    def draw(self):
+        if not self.visible:
+            return
+        lines = []  # (texto, cor)
+        frame_times = frame_profiler.frame_times
+        if frame_times:
+            avg = sum(frame_times) / len(frame_times) * 1e3
+            worst = max(frame_times) * 1e3
+            lines.append((f"FRAME {avg:5.1f} max {worst:5.1f} ms", COLOR_ERROR if worst >= FRAME_BUCKETS_MS[0] else COLOR_SUCCESS))
+        lines.append(("secao            media   max ms", COLOR_TEXT_HIGHLIGHT))
+        stats = frame_profiler.stats()
+        for name in self.SECTIONS:
+            if name in stats:
+                avg, worst, _ = stats[name]
+                lines.append((f"{name:<16}{avg:6.2f}{worst:6.2f}", COLOR_TEXT))
+
+        # Histograma: uma barra por faixa de tempo de frame
+        counts = frame_profiler.histogram()
+        total = max(1, sum(counts))
+        labels = [f"<{ms}" for ms in FRAME_BUCKETS_MS] + [f">={FRAME_BUCKETS_MS[-1]}"]
+        bars_y = 2 + len(lines) * 7
+
+        sim = self._simulation()
+        tail = []
+        if sim is not None:
+            tail.append((f"arv {len(sim.background.tree_manager.arvores)} "
+                         f"barc {len(sim.boat_manager.boats) + len(sim.remote_boats)} "
+                         f"bomb {len(sim.bomb_manager.bombs) + len(sim.remote_bombs)}", COLOR_TEXT))
+            tail.append((f"tiros {len(sim.shots) + len(sim.remote_shots)} "
+                         f"expl {len(sim.explosions) + len(sim.remote_explosions)} "
+                         f"jog {len(sim.active_players)}", COLOR_TEXT))
+        received, sent = self._rates()
+        tail.append((f"rede in {received:5.1f} out {sent:5.1f} kB/s", COLOR_TEXT))
+        connections = self.game.network.connection_stats()
+        if connections:
+            # Pior conexão (maior RTT): é ela que limita a taxa de envio
+            worst = max(connections.values(), key=lambda c: c['srtt_ms'] or 0.0)
+            rtt = "-" if worst['srtt_ms'] is None else f"{worst['srtt_ms']:.1f}"
+            tail.append((f"rtt {rtt} ms jit {worst['jitter_ms']:.1f} perda {worst['loss_rate']:.1%}", COLOR_TEXT))
+
+        height = 4 + (len(lines) + len(labels) + len(tail)) * 7
+        pyxel.rect(0, 0, SCREEN_WIDTH, height, COLOR_BG)
+        pyxel.rectb(0, 0, SCREEN_WIDTH, height, COLOR_HUD_LINE)
+        for i, (text, color) in enumerate(lines):
+            pyxel.text(3, 2 + i * 7, text, color)
+        for i, (label, count) in enumerate(zip(labels, counts)):
+            y = bars_y + i * 7
+            pyxel.text(3, y, f"{label:>4}", COLOR_TEXT)
+            pyxel.rect(22, y, max(1, round(count / total * 110)) if count else 0, 5,
+                       COLOR_SUCCESS if i == 0 else COLOR_ERROR)
+            pyxel.text(136, y, f"{count:>4}", COLOR_TEXT)
+        tail_y = bars_y + len(labels) * 7
+        for i, (text, color) in enumerate(tail):
+            pyxel.text(3, tail_y + i * 7, text, color)
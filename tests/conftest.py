@@ -0,0 +1,13 @@
+### Configuracao dos testes (pytest)
+### Permite importar os modulos do jogo a partir da pasta "tests", como nos benchmarks
+###
+### Para executar:
+### python -m pytest -q tests
+### OU
+### make test
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")  # Sem placa de som (so importa o pyxel, sem janela)
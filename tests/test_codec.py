@@ -0,0 +1,125 @@
+### Testes do codec de rede (codec.py): ida e volta nos formatos binario e JSON
+
+import pytest
+
+import codec
+from codec import encode_packet, decode_packet, WIRE_BINARY, WIRE_JSON
+
+
+def snapshot():
+    """Snapshot do host com todos os blocos e valores exatos em float32 (rio_centro, rio_largura, fuel)."""
+    return {
+        'type': 'game_update',
+        'player_type': 'host',
+        'slot': 0,
+        'scroll': 1234,
+        'rio_centro': 80.5,
+        'rio_largura': 45.0,
+        'seed': 987654321,
+        'arvores': [{'id': 1, 'x': 10, 'y': -16, 'visible': True, 'sprite_type': 2}],
+        'shots': [{'id': 2, 'x': 60, 'y': 100, 'vy': -4, 'owner': 1}],
+        'explosions': [{'id': 3, 'x': 70, 'y': 50, 'tile_u': 16, 'tile_v': 16, 'width': 16, 'height': 16,
+                        'timer': 5}],
+        'boats': [{'id': 4, 'x': 90, 'y': 20, 'vy': 1, 'visible': True}],
+        'bombs': [{'id': 5, 'x': 40, 'y': 30, 'vy': 1, 'visible': False}],
+        'sounds': [[1, 2], [0, 3]],
+        'players': [{'id': 0, 'x': 55, 'y': 130, 'lives': 3, 'fuel': 0.75, 'invincible': 0, 'score': 120,
+                     'input_seq': 0},
+                    {'id': 1, 'x': 90, 'y': 130, 'lives': 2, 'fuel': 1.0, 'invincible': 30, 'score': 40,
+                     'input_seq': 17}],
+        'inputs': [[16, 3], [17, 1]],
+    }
+
+
+def game_data(payload, seq=7, ack=3):
+    return {'type': 'game_data', 'seq': seq, 'ack': ack, 'timestamp': 1700000000.25, 'payload': payload}
+
+
+@pytest.mark.parametrize("wire_format", [WIRE_BINARY, WIRE_JSON])
+def test_snapshot_round_trip(wire_format):
+    packet = game_data(snapshot())
+    raw = encode_packet(packet, wire_format)
+    assert decode_packet(raw) == packet
+    if wire_format == WIRE_BINARY:
+        assert raw[0] == codec.CODEC_MAGIC
+
+
+def test_binary_matches_json():
+    packet = game_data(snapshot())
+    assert decode_packet(encode_packet(packet, WIRE_BINARY)) == decode_packet(encode_packet(packet, WIRE_JSON))
+
+
+def test_client_snapshot_round_trip():
+    payload = snapshot()
+    payload.update(player_type='client', slot=1, arvores=[], boats=[], bombs=[])
+    payload['players'] = payload['players'][1:]
+    assert decode_packet(encode_packet(game_data(payload), WIRE_BINARY))['payload'] == payload
+
+
+def test_empty_blocks_come_back_as_empty_lists():
+    payload = snapshot()
+    for key in ('arvores', 'shots', 'explosions', 'boats', 'bombs', 'sounds', 'players', 'inputs'):
+        payload[key] = []
+    assert decode_packet(encode_packet(game_data(payload), WIRE_BINARY))['payload'] == payload
+
+
+@pytest.mark.parametrize("seq, ack", [(0, 0), (1, None), (None, None), (0xFFFFFFFE, 2**31 - 1)])
+def test_header_sequences(seq, ack):
+    packet = decode_packet(encode_packet(game_data(snapshot(), seq, ack), WIRE_BINARY))
+    assert (packet['seq'], packet['ack']) == (seq, ack)
+
+
+def test_delta_round_trip():
+    changes = {
+        'fields': {'scroll': 1240, 'sounds': [[1, 2]], 'player_type': 'client'},
+        'entities': {'boats': [[4], [{'id': 9, 'x': 12, 'y': -16, 'vy': 1, 'visible': True}]],
+                     'players': [[], [{'id': 1, 'x': 91}]],
+                     'shots': [None, [{'id': 2, 'x': 60, 'y': 96, 'vy': -4, 'owner': 1}]]},
+    }
+    packet = {'type': 'game_data', 'seq': 0, 'ack': 5, 'timestamp': 2.5, 'base': 0, 'delta': changes}
+    assert decode_packet(encode_packet(packet, WIRE_BINARY)) == packet
+
+
+def test_lockstep_round_trip_and_tick_wrap():
+    payload = {'type': 'lockstep', 'ack': 65535 + 4, 'inputs': [[1, 65534, [1, 2, 0x13]], [2, 3, []]],
+               'hashes': [[65536 + 30, 0xDEADBEEF]]}
+    raw = encode_packet(game_data(payload), WIRE_BINARY)
+    assert raw[0] == codec.CODEC_LOCKSTEP
+    decoded = decode_packet(raw)
+    # Sem o cabecalho comum; os ticks voltam com os 16 bits de baixo (Lockstep.receive completa)
+    assert decoded == {'type': 'game_data', 'payload': {
+        'type': 'lockstep', 'ack': 3, 'inputs': [[1, 65534, [1, 2, 0x13]], [2, 3, []]],
+        'hashes': [[30, 0xDEADBEEF]]}}
+
+
+def test_control_packets_use_json():
+    for packet in ({'type': 'handshake'}, {'type': 'heartbeat'}, {'type': 'game_start'}):
+        raw = encode_packet(packet, WIRE_BINARY)
+        assert raw[:1] == b"{"
+        assert decode_packet(raw) == packet
+
+
+def test_other_version_is_rejected():
+    raw = bytearray(encode_packet(game_data(snapshot()), WIRE_BINARY))
+    raw[1] = codec.CODEC_VERSION + 1
+    with pytest.raises(ValueError):
+        decode_packet(bytes(raw))
+
+
+def test_whole_floats_are_packed_as_integers():
+    payload = snapshot()
+    payload['boats'][0]['x'] = 90.0
+    payload['arvores'][0]['y'] = -16.0
+    decoded = decode_packet(encode_packet(game_data(payload), WIRE_BINARY))['payload']
+    assert decoded['boats'][0]['x'] == 90 and decoded['arvores'][0]['y'] == -16
+
+
+def test_fractional_floats_are_rejected():
+    payload = snapshot()
+    payload['boats'][0]['x'] = 90.5
+    with pytest.raises(ValueError, match="'x'"):
+        encode_packet(game_data(payload), WIRE_BINARY)
+    changes = {'entities': {'boats': [[], [{'id': 4, 'x': 89.25}]]}}
+    with pytest.raises(ValueError, match="'x'"):
+        encode_packet({'type': 'game_data', 'seq': 1, 'ack': None, 'timestamp': 0.0, 'base': 0, 'delta': changes},
+                      WIRE_BINARY)
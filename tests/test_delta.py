@@ -0,0 +1,125 @@
+### Testes da compressao delta (delta.py): o snapshot reconstruido (base + delta) eh igual ao original,
+### com snapshots de uma partida de verdade (host com 2 jogadores)
+
+import copy
+import random
+
+import pytest
+
+import codec
+import delta
+from simulation import Simulation, PlayerInput, TickInput
+from config import *
+
+
+def random_input(rng):
+    return TickInput(PlayerInput(left=rng.random() < 0.4, right=rng.random() < 0.4, up=rng.random() < 0.2,
+                                 down=rng.random() < 0.2, fire=rng.random() < 0.3))
+
+
+@pytest.fixture(scope="module")
+def snapshots():
+    """Snapshots do host a cada tick, com os jogadores sempre vivos e o rio mudando de largura."""
+    rng = random.Random(2)
+    host = Simulation(is_multiplayer=True, is_host=True, initial_seed=2024)
+    client = Simulation(is_multiplayer=True, initial_seed=2024, local_slot=1)
+    result = []
+    for tick in range(240):
+        for p in host.players:
+            p.lives = MAX_LIVES
+        host.background.animating_to_center = tick % 120 < 40
+        client.step(random_input(rng))
+        host.apply_snapshot(client.snapshot(), 1)
+        host.step(random_input(rng))
+        result.append(copy.deepcopy(host.snapshot()))
+    return result
+
+
+def test_apply_rebuilds_current(snapshots):
+    for i in range(1, len(snapshots)):
+        base, current = snapshots[i - 1], snapshots[i]
+        assert delta.apply_delta(base, delta.diff_snapshot(base, current)) == current
+
+
+@pytest.mark.parametrize("distance", [2, 5, SNAPSHOT_HISTORY_SIZE])
+def test_apply_from_older_base(snapshots, distance):
+    # Confirmacoes perdidas: a base eh um snapshot de varios ticks atras
+    for i in range(distance, len(snapshots), 7):
+        base, current = snapshots[i - distance], snapshots[i]
+        assert delta.apply_delta(base, delta.diff_snapshot(base, current)) == current
+
+
+def test_apply_does_not_modify_base(snapshots):
+    base = copy.deepcopy(snapshots[10])
+    delta.apply_delta(snapshots[10], delta.diff_snapshot(snapshots[10], snapshots[50]))
+    assert snapshots[10] == base
+
+
+def test_identical_snapshot_gives_empty_delta(snapshots):
+    assert delta.diff_snapshot(snapshots[30], snapshots[30]) == {}
+
+
+def test_scrolling_entities_stay_out_of_the_delta(snapshots):
+    # Entre dois ticks sem entidades novas, as arvores so acompanham o scroll
+    base, current = snapshots[1], snapshots[2]
+    assert current['arvores'] and 'arvores' not in delta.diff_snapshot(base, current).get('entities', {})
+
+
+class Link:
+    """Os dois lados de uma conexao, como nas sessoes do NetworkManager: o remetente manda um delta contra
+    o ultimo snapshot confirmado (ou um keyframe) e o destinatario reconstroi pelo seu historico."""
+    def __init__(self):
+        self.sent_history = delta.SnapshotHistory(SNAPSHOT_HISTORY_SIZE)
+        self.recv_history = delta.SnapshotHistory(SNAPSHOT_HISTORY_SIZE)
+        self.seq = 0
+        self.peer_ack = None    # Ultimo snapshot confirmado pelo destinatario (None = pede keyframe)
+        self.keyframes = 0
+
+    def send(self, snapshot):
+        self.seq += 1
+        packet = {'type': 'game_data', 'seq': self.seq, 'ack': None, 'timestamp': 0.0}
+        base = self.sent_history.get(self.peer_ack)
+        self.sent_history.put(self.seq, snapshot)
+        if base is None:
+            self.keyframes += 1
+            packet['payload'] = snapshot
+        else:
+            packet['base'] = self.peer_ack
+            packet['delta'] = delta.diff_snapshot(base, snapshot)
+        return codec.encode_packet(packet, codec.WIRE_BINARY)
+
+    def receive(self, raw):
+        packet = codec.decode_packet(raw)
+        if 'delta' in packet:
+            base = self.recv_history.get(packet['base'])
+            assert base is not None
+            payload = delta.apply_delta(base, packet['delta'])
+        else:
+            payload = packet['payload']
+        self.recv_history.put(packet['seq'], payload)
+        return packet['seq'], payload
+
+
+def test_link_matches_keyframes(snapshots):
+    link = Link()
+    lost_acks = range(40, 40 + SNAPSHOT_HISTORY_SIZE + 5)
+    keyframe_ticks = []
+    for tick, snapshot in enumerate(snapshots):
+        keyframes = link.keyframes
+        seq, received = link.receive(link.send(snapshot))
+        if link.keyframes != keyframes:
+            keyframe_ticks.append(tick)
+        # O que chega eh igual ao snapshot completo (keyframe) do mesmo tick, depois do codec
+        full = {'type': 'game_data', 'seq': seq, 'ack': None, 'timestamp': 0.0, 'payload': snapshot}
+        assert received == codec.decode_packet(codec.encode_packet(full, codec.WIRE_BINARY))['payload']
+
+        if tick in lost_acks:
+            continue    # Confirmacoes perdidas: a base envelhece ate sair do historico (volta o keyframe)
+        # No tick 150 o destinatario pede um keyframe (recebeu um delta cuja base nao tinha)
+        link.peer_ack = None if tick == 150 else seq
+
+    # Keyframes: o primeiro, o pedido e, da perda das confirmacoes ate a primeira que chega, os envios
+    # em que a base (o tick anterior a perda) ja tinha saido do historico; o resto foi delta
+    expired = list(range(lost_acks[0] + SNAPSHOT_HISTORY_SIZE, lost_acks[-1] + 2))
+    assert expired
+    assert keyframe_ticks == [0] + expired + [151]
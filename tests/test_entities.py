@@ -0,0 +1,108 @@
+### Testes das entidades (entities.py): o EntityRegistry aplica cada lista recebida pela rede no lugar
+### e o EntityPool reaproveita tiros e explosoes
+
+from entities import EntityRegistry, EntityPool, Tree, Shot, allocation_count, reset_allocation_count
+
+
+def tree(net_id, x, y=0, visible=True):
+    return {'id': net_id, 'x': x, 'y': y, 'visible': visible, 'sprite_type': 0}
+
+
+def test_registry_creates_updates_and_destroys():
+    registry = EntityRegistry(Tree)
+    first = registry.apply([tree(1, 10), tree(2, 20)])
+    a, b = first
+    assert (a.net_id, a.x, b.net_id, b.x) == (1, 10, 2, 20)
+
+    # Mesmas entidades: atualizadas no lugar, sem refazer a lista
+    assert registry.apply([tree(1, 11), tree(2, 21, visible=False)]) is first
+    assert (a.x, b.x, b.visible) == (11, 21, False)
+
+    # A entidade 1 sumiu e a 3 entrou
+    items = registry.apply([tree(2, 22), tree(3, 30)])
+    assert items[0] is b and b.x == 22
+    assert (items[1].net_id, items[1].x) == (3, 30)
+    assert set(registry.by_id) == {2, 3}
+    assert (registry.created, registry.updated, registry.destroyed) == (3, 3, 1)
+
+
+def test_registry_follows_the_new_order():
+    registry = EntityRegistry(Tree)
+    a, b = registry.apply([tree(1, 10), tree(2, 20)])
+    assert registry.apply([tree(2, 20), tree(1, 10)]) == [b, a]
+    assert (registry.created, registry.destroyed) == (2, 0)
+
+
+def test_registry_does_not_allocate_in_steady_state():
+    registry = EntityRegistry(Tree)
+    states = [tree(net_id, net_id * 10) for net_id in range(1, 21)]
+    registry.apply(states)
+    reset_allocation_count()
+    for y in range(60):
+        registry.apply([dict(state, y=y) for state in states])
+    assert allocation_count() == 0
+
+
+def test_registry_clear():
+    registry = EntityRegistry(Tree)
+    registry.apply([tree(1, 10)])
+    registry.clear()
+    assert registry.by_id == {} and registry.items == []
+    assert registry.apply([tree(1, 10)])[0].net_id == 1
+    assert registry.created == 2
+
+
+def test_pool_reuses_released_entities():
+    pool = EntityPool(Shot, size=2)
+    a = pool.acquire(10, 20)
+    b = pool.acquire(30, 40, owner=1)
+    assert (pool.misses, pool.hits, pool.in_use, pool.peak) == (2, 0, 2, 2)
+
+    pool.release(a)
+    c = pool.acquire(50, 60, vy=-4, owner=2)
+    # A mesma entidade, reiniciada com os novos argumentos (e um novo ID)
+    assert c is a and (c.x, c.y, c.vy, c.owner) == (50, 60, -4, 2) and c.net_id != b.net_id
+    assert (pool.misses, pool.hits, pool.in_use, pool.peak) == (2, 1, 2, 2)
+    assert pool.hit_rate == 1 / 3
+
+
+def test_pool_keeps_at_most_size_free():
+    pool = EntityPool(Shot, size=2)
+    shots = [pool.acquire(0, 0) for _ in range(5)]
+    for shot in shots:
+        pool.release(shot)
+    assert pool.stats() == {'hits': 0, 'misses': 5, 'hit_rate': 0.0, 'in_use': 0, 'peak': 5, 'free': 2,
+                            'double_releases': 0}
+
+
+def test_pool_ignores_a_second_release():
+    pool = EntityPool(Shot, size=4)
+    a = pool.acquire(10, 20)
+    b = pool.acquire(30, 40)
+    pool.release(a)
+    pool.release(a)
+    assert (pool.in_use, len(pool.free), pool.double_releases) == (1, 1, 1)
+    # Sem a protecao, 'a' sairia duas vezes do pool
+    c, d = pool.acquire(0, 0), pool.acquire(0, 0)
+    assert c is a and d is not a and d is not b
+
+    # Depois de sair do pool, 'a' pode ser devolvida de novo normalmente
+    pool.release(c)
+    assert (pool.in_use, len(pool.free), pool.double_releases) == (2, 1, 1)
+
+
+def test_registry_returns_destroyed_entities_to_the_pool():
+    pool = EntityPool(Shot, size=8)
+    registry = EntityRegistry(Shot, pool=pool)
+    states = [{'id': net_id, 'x': 0, 'y': 100, 'vy': -2, 'owner': 1} for net_id in (1, 2, 3)]
+    registry.apply(states)
+    reset_allocation_count()
+    for net_id in range(4, 40):
+        # Um tiro sai e outro entra a cada snapshot. O novo eh criado antes de o antigo ser devolvido,
+        # entao so o primeiro precisa ser alocado; os seguintes vem do pool
+        states = states[1:] + [{'id': net_id, 'x': 0, 'y': 100, 'vy': -2, 'owner': 1}]
+        registry.apply(states)
+    assert allocation_count() == 1
+    assert (pool.misses, pool.hits, pool.in_use, pool.peak) == (4, 35, 3, 4)
+    registry.clear()
+    assert pool.in_use == 0
@@ -0,0 +1,79 @@
+### Testes do armazenamento em colunas (entity_store.py): a remocao troca a removida pela ultima linha
+### e as entidades (handles) continuam lendo as proprias colunas depois de remove e compact
+
+import pytest
+
+import entity_store
+from entity_store import EntityStore, StoredEntity
+from entities import EntityRegistry, Tree
+
+
+@pytest.fixture(params=["numpy", "python"])
+def engine(request, monkeypatch):
+    """Roda o teste com as operacoes em lote do NumPy e com o caminho em Python puro."""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(entity_store, "np", None)
+    return request.param
+
+
+def fill(store, count):
+    return [StoredEntity(net_id, net_id * 10, net_id * 20, vy=net_id, visible=net_id % 3 != 0, kind=net_id % 2,
+                         store=store) for net_id in range(1, count + 1)]
+
+
+def check(store, entities):
+    """Cada entidade viva aponta para a propria linha, com os proprios valores."""
+    assert store.handles == entities
+    for index, entity in enumerate(entities):
+        net_id = entity.net_id
+        assert entity._index == index
+        assert (entity.x, entity.y, entity.vy, entity.visible) == (net_id * 10, net_id * 20, net_id, net_id % 3 != 0)
+        assert store.kind[index] == net_id % 2
+
+
+def test_remove_moves_the_last_row(engine):
+    store = EntityStore()
+    a, b, c, d = fill(store, 4)
+    store.remove(b)
+    assert b._index == -1
+    check(store, [a, d, c])
+    store.remove(c)     # A ultima: nada a trocar
+    check(store, [a, d])
+    assert len(store) == 2
+
+
+def test_compact_keeps_handles_valid(engine):
+    store = EntityStore()
+    entities = fill(store, 10)
+    store.compact(100)  # Remove y > 100 (as entidades 6 a 10)
+    assert all(entity._index == -1 for entity in entities[5:])
+    assert sorted(entity.net_id for entity in store.handles) == [1, 2, 3, 4, 5]
+    check(store, list(store.handles))
+
+    store.compact(100, drop_hidden=True)    # Remove a invisivel (3)
+    assert entities[2]._index == -1
+    assert sorted(entity.net_id for entity in store.handles) == [1, 2, 4, 5]
+    check(store, list(store.handles))
+
+
+def test_advance_and_shift(engine):
+    store = EntityStore()
+    a, b = fill(store, 2)
+    store.advance()
+    assert (a.y, b.y) == (21, 42)
+    store.shift(3)
+    assert (a.y, b.y) == (24, 45)
+
+
+def test_registry_destroys_through_the_store():
+    store = EntityStore()
+    registry = EntityRegistry(Tree, store)
+    states = [{'id': net_id, 'x': net_id, 'y': 0, 'visible': True, 'sprite_type': 1} for net_id in (1, 2, 3)]
+    first, _, third = registry.apply(states)
+    registry.apply([states[0], dict(states[2], x=30)])
+    assert store.handles == [first, third]
+    assert (first.x, third.x, third.sprite_type) == (1, 30, 1)
+    registry.clear()
+    assert len(store) == 0 and third._index == -1
@@ -0,0 +1,40 @@
+### Testes do buffer de interpolacao do cliente (interpolation.py): o estado interpolado entra na simulacao
+### do cliente, e o snapshot que o cliente envia de volta ao host precisa continuar cabendo no codec binario
+
+import codec
+from benchmarks.bench_players import Link
+from interpolation import SnapshotBuffer
+from simulation import Simulation, PlayerInput, TickInput
+
+
+def test_interpolated_state_still_encodes_on_the_client():
+    host = Simulation(is_multiplayer=True, is_host=True, initial_seed=7)
+    client = Simulation(is_multiplayer=True, initial_seed=7, local_slot=1)
+    host.players[1].active = True
+    downlink = Link()
+    buffer = SnapshotBuffer(delay=0.0)
+
+    for _ in range(60):
+        host.step()
+    old = downlink.transmit(host.snapshot())
+    host.step()
+    host.step()
+    new = downlink.transmit(host.snapshot())
+    buffer.push(1.0, old, 1.0)
+    buffer.push(2.0, new, 2.0)
+    # as arvores andaram entre os dois snapshots: no meio do caminho as posicoes nao sao inteiras
+    assert [t['y'] for t in old['arvores']] != [t['y'] for t in new['arvores']]
+
+    sample = buffer.sample(1.3)
+    assert buffer.interpolated == 1
+    for key in ('arvores', 'boats', 'bombs', 'players'):
+        for item in sample[key]:
+            assert isinstance(item['x'], int) and isinstance(item['y'], int)
+
+    client.apply_snapshot(sample, reconcile=False)
+    client.step(TickInput(PlayerInput(right=True)))
+    snapshot = client.snapshot()
+    # arvores, barcos e bombas sao do host: o cliente nao os devolve
+    assert not {'arvores', 'boats', 'bombs'} & snapshot.keys()
+    packet = {'type': 'game_data', 'seq': 1, 'ack': None, 'timestamp': 0.0, 'payload': snapshot}
+    assert codec.decode_packet(codec.encode_packet(packet, codec.WIRE_BINARY))['payload']['players']
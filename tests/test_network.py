@@ -0,0 +1,201 @@
+### Testes das partes da rede (network.py) que funcionam sem o jogo: a fila de recebimento,
+### as estatisticas de cada conexao, a rede ruim simulada (com seed fixa) e os erros de envio
+
+import socket
+
+import pytest
+
+import network
+from network import (ReceiveQueue, InboundMessage, ConnectionStats, ImpairedSocket, Impairment,
+                     IMPAIRMENT_SCENARIOS)
+
+
+def update(slot, seq, sounds=()):
+    return InboundMessage(slot, seq, {'type': 'game_update', 'scroll': seq, 'sounds': [list(s) for s in sounds]})
+
+
+def test_full_queue_drops_the_oldest():
+    queue = ReceiveQueue(size=4)
+    for seq in range(6):
+        queue.put(InboundMessage(1, seq, {'type': 'heartbeat'}))
+    assert queue.dropped == 2
+    assert [message.seq for message in queue.drain()] == [2, 3, 4, 5]
+    assert queue.drain() == []
+
+
+def test_snapshots_of_a_slot_are_coalesced():
+    queue = ReceiveQueue()
+    queue.put(update(1, 1, [(0, 1)]))
+    queue.put(update(2, 1))
+    queue.put(update(1, 2, [(1, 2)]))
+    queue.put(update(1, 3, [(2, 3)]))
+    messages = queue.drain()
+    # Fica o mais novo de cada slot, com os sons dos descartados antes dos seus
+    assert [(message.slot, message.seq) for message in messages] == [(2, 1), (1, 3)]
+    assert messages[1].payload['sounds'] == [[0, 1], [1, 2], [2, 3]]
+    assert queue.coalesced == 2
+
+
+def test_coalescing_does_not_touch_the_received_snapshot():
+    # O snapshot recebido tambem eh a base dos proximos deltas: os sons vao em uma copia
+    queue = ReceiveQueue()
+    queue.put(update(1, 1, [(0, 1)]))
+    latest = update(1, 2, [(1, 2)])
+    payload = latest.payload
+    queue.put(latest)
+    assert queue.drain()[0].payload['sounds'] == [[0, 1], [1, 2]]
+    assert payload['sounds'] == [[1, 2]]
+
+
+def test_game_start_is_never_coalesced():
+    queue = ReceiveQueue()
+    queue.put(update(1, 1))
+    queue.put(InboundMessage(1, None, {'type': 'game_start'}))
+    queue.put(update(1, 2))
+    assert [message.payload['type'] for message in queue.drain()] == ['game_start', 'game_update']
+
+    for message in (update(1, 3), InboundMessage(1, None, {'type': 'game_start'}), update(1, 4)):
+        queue.put(message)
+    assert [message.seq for message in queue.drain(coalesce=False)] == [3, None, 4]
+
+
+def receive(stats, seqs, timestamp=None):
+    """Entrega as sequencias como o NetworkManager: atrasado eh o que nao passa da ultima aceita."""
+    last = None
+    for seq in seqs:
+        late = last is not None and seq <= last
+        stats.on_game_packet(seq, timestamp, late)
+        if not late:
+            last = seq
+
+
+def test_gaps_count_as_lost():
+    stats = ConnectionStats()
+    receive(stats, [1, 2, 3, 5, 6, 9, 10])
+    assert (stats.lost, stats.late, stats.in_order) == (3, 0, 7)
+    assert stats.as_dict()['loss_rate'] == 0.3
+
+
+def test_reordered_packets_count_as_late_not_lost():
+    stats = ConnectionStats()
+    receive(stats, [1, 2, 4, 3, 5, 7, 6, 8])
+    assert (stats.lost, stats.late, stats.in_order) == (0, 2, 6)
+
+    # Duplicado conta como atrasado; a perda nunca fica negativa
+    stats = ConnectionStats()
+    receive(stats, [1, 2, 2, 3])
+    assert (stats.lost, stats.late) == (0, 1)
+
+
+def test_loss_counts_from_the_first_packet_of_each_connection():
+    stats = ConnectionStats()
+    receive(stats, [100, 101, 103])
+    assert stats.lost == 1
+    stats.reset_sequence()  # Conexao refeita: as sequencias recomecam
+    receive(stats, [1, 2, 3])
+    assert (stats.lost, stats.in_order) == (0, 3)
+
+
+def test_rtt_is_smoothed_like_tcp():
+    stats = ConnectionStats()
+    stats.on_rtt(0.100)
+    assert (stats.srtt, stats.rtt_var) == (0.100, 0.050)
+    stats.on_rtt(0.200)
+    assert stats.srtt == pytest.approx(0.875 * 0.100 + 0.125 * 0.200)
+    assert stats.rtt_var == pytest.approx(0.75 * 0.050 + 0.25 * 0.100)
+    assert (stats.rtt, stats.rtt_min, stats.rtt_max, stats.rtt_samples) == (0.200, 0.100, 0.200, 2)
+    assert stats.as_dict()['rtt_ms'] == pytest.approx(200)
+
+
+def test_jitter_follows_the_transit_variation(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(network.time, "time", lambda: now[0])
+    stats = ConnectionStats()
+    # Um pacote a cada 50 ms, com o transito alternando entre 20 e 30 ms
+    for i in range(40):
+        sent = 1000.0 + i * 0.050
+        now[0] = sent + (0.020 if i % 2 == 0 else 0.030)
+        stats.on_game_packet(i + 1, sent, False)
+    # Estimador do RTP: anda 1/16 da diferenca a cada pacote, em direcao aos 10 ms de variacao
+    assert stats.jitter == pytest.approx(0.010 * (1 - (15 / 16) ** 39))
+    assert stats.lost == 0
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_impairment_rates_follow_the_scenario():
+    phases = ((60, Impairment(delay=10, jitter=5, loss=0.2, duplicate=0.1, reorder=0.1)),)
+    impaired = ImpairedSocket(None, phases, directions=("recv",), seed=42)
+    sent = 20000
+    deliveries = [impaired._schedule() for _ in range(sent)]
+    arrived = sum(len(due) for due in deliveries)
+    stats = impaired.stats()
+    assert stats['dropped'] == sum(1 for due in deliveries if not due)
+    assert arrived == sent - stats['dropped'] + stats['duplicated']
+    assert stats['dropped'] / sent == pytest.approx(0.2, abs=0.01)
+    assert stats['duplicated'] / (sent - stats['dropped']) == pytest.approx(0.1, abs=0.01)
+    assert stats['reordered'] / arrived == pytest.approx(0.1, abs=0.01)
+
+    # Mesma seed, mesmos sorteios
+    again = ImpairedSocket(None, phases, directions=("recv",), seed=42)
+    for _ in range(sent):
+        again._schedule()
+    assert again.stats() == stats
+
+
+def test_scenario_phases_advance_and_repeat(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(network.time, "monotonic", clock)
+    impaired = ImpairedSocket(None, 'degradando', directions=("recv",), seed=1)
+    phases = [impairment for _, impairment in IMPAIRMENT_SCENARIOS['degradando']]
+    seen = []
+    for elapsed in (0, 7.9, 8.1, 16.1, 24.1, 32.1):
+        clock.now = 100.0 + elapsed
+        seen.append(impaired.conditions())
+    # Quatro fases de 8 s; depois dos 32 s o ciclo recomeca
+    assert seen == [phases[0], phases[0], phases[1], phases[2], phases[3], phases[0]]
+
+
+def test_impaired_sends_arrive_as_scheduled():
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.settimeout(2.0)
+    sender = ImpairedSocket(socket.socket(socket.AF_INET, socket.SOCK_DGRAM),
+                            ((60, Impairment(loss=0.3, duplicate=0.2)),), directions=("send",), seed=7)
+    try:
+        for i in range(200):
+            sender.sendto(bytes([i]), receiver.getsockname())
+        stats = sender.stats()
+        expected = 200 - stats['dropped'] + stats['duplicated']
+        received = [receiver.recvfrom(16)[0] for _ in range(expected)]
+        receiver.settimeout(0.1)
+        with pytest.raises(socket.timeout):
+            receiver.recvfrom(16)
+    finally:
+        sender.close()
+        receiver.close()
+    assert 0 < stats['dropped'] < 200 and stats['duplicated'] > 0
+    assert len(set(received)) == 200 - stats['dropped']
+
+
+def test_codec_errors_are_not_swallowed_as_send_errors():
+    manager = network.NetworkManager(0, wire_format="binary", impairment=None)
+    manager.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    addr = ("127.0.0.1", 9)
+    player = {'id': 0, 'x': 10.5, 'y': 20, 'lives': 3, 'fuel': 100.0, 'invincible': 0, 'score': 0, 'input_seq': 0}
+    snapshot = {'type': 'game_update', 'players': [player]}
+    try:
+        with pytest.raises(ValueError):
+            manager._send({'type': 'game_data', 'seq': 1, 'ack': None, 'timestamp': 0.0, 'payload': snapshot}, addr)
+        assert manager.send_errors == 0 and manager.packets_sent == 0
+    finally:
+        manager.sock.close()
+    # Ja um erro do socket continua contado e ignorado (o proximo envio tenta de novo)
+    manager._send({'type': 'heartbeat'}, addr)
+    assert manager.send_errors == 1
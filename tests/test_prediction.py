@@ -0,0 +1,71 @@
+### Testes da predicao do aviao local no cliente (simulation.py): o host processa cada comando uma vez
+### e o cliente, ao receber o snapshot, descarta os confirmados e reaplica os outros.
+### Host e cliente trocam snapshots pelo mesmo caminho do benchmark de jogadores (delta + codec, sem socket)
+
+from benchmarks.bench_players import Link
+from simulation import Simulation, PlayerInput, TickInput
+from config import *
+
+RIGHT = TickInput(PlayerInput(right=True))
+DOWN = TickInput(PlayerInput(down=True))
+
+
+def start():
+    host = Simulation(is_multiplayer=True, is_host=True, initial_seed=7)
+    client = Simulation(is_multiplayer=True, initial_seed=7, local_slot=1)
+    return host, client, Link(), Link()
+
+
+def test_host_acks_and_client_trims_pending_inputs():
+    host, client, uplink, downlink = start()
+    for _ in range(5):
+        client.step(RIGHT)
+    host.apply_snapshot(uplink.transmit(client.snapshot()), 1)
+    host.step()
+    assert host.players[1].input_seq == 5
+
+    for _ in range(3):
+        client.step(DOWN)
+    client.apply_snapshot(downlink.transmit(host.snapshot()))
+    assert [seq for seq, _ in client.pending_inputs] == [6, 7, 8]
+
+
+def test_client_replays_unacked_inputs():
+    host, client, uplink, downlink = start()
+    x, y = client.player.x, client.player.y
+    for _ in range(5):
+        client.step(RIGHT)
+    host.apply_snapshot(uplink.transmit(client.snapshot()), 1)
+    host.step()
+    for _ in range(3):
+        client.step(DOWN)
+
+    # O host concorda com a predicao: nada muda
+    client.apply_snapshot(downlink.transmit(host.snapshot()))
+    assert (client.player.x, client.player.y) == (x + 5 * PLAYER_SPEED, y + 3 * PLAYER_SPEED)
+    assert client.prediction_corrections == 0
+
+    # O host empurrou o aviao: o cliente parte da posicao do host e reaplica os 3 comandos pendentes
+    host.players[1].x -= 4
+    client.apply_snapshot(downlink.transmit(host.snapshot()))
+    assert (client.player.x, client.player.y) == (x + 5 * PLAYER_SPEED - 4, y + 3 * PLAYER_SPEED)
+    assert (client.prediction_corrections, client.prediction_error) == (1, 4)
+
+
+def test_host_skips_repeated_inputs():
+    host, client, uplink, _ = start()
+    x = host.players[1].x
+    for _ in range(5):
+        client.step(RIGHT)
+    first = client.snapshot()
+    # Os mesmos comandos chegam de novo (redundancia contra perdas): o host move o aviao uma vez so
+    host.apply_snapshot(uplink.transmit(first), 1)
+    host.apply_snapshot(uplink.transmit(first), 1)
+    assert (host.players[1].x, host.players[1].input_seq) == (x + 5 * PLAYER_SPEED, 5)
+
+    # O proximo snapshot repete os comandos 1-5 e traz o 6-7: so os novos sao processados
+    for _ in range(2):
+        client.step(RIGHT)
+    assert [seq for seq, _ in client.snapshot()['inputs']] == list(range(1, 8))
+    host.apply_snapshot(uplink.transmit(client.snapshot()), 1)
+    assert (host.players[1].x, host.players[1].input_seq) == (x + 7 * PLAYER_SPEED, 7)
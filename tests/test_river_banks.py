@@ -0,0 +1,97 @@
+### Testes da colisao com as margens do rio: a tabela de margens (map_generator.BankTable) bate com as
+### margens linha a linha, o aviao sobre a margem perde vida e os barcos ficam dentro da agua
+
+import math
+import random
+
+import pytest
+
+import map_generator
+from entities import Boat
+from simulation import Simulation, PlayerInput, TickInput
+from config import *
+
+
+@pytest.fixture(params=["numpy", "python"])
+def engine(request, monkeypatch):
+    """Roda o teste com a tabela montada pelo NumPy e pelo caminho em Python puro."""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(map_generator, "np", None)
+    return request.param
+
+
+def river_ticks(sim, ticks, seed):
+    """Avanca a simulacao com o rio fazendo curvas e mudando de largura."""
+    rng = random.Random(seed)
+    for tick in range(ticks):
+        keys = (rng.choice(("KEY_1", "KEY_2", "KEY_3", "KEY_4")),) if tick % 40 == 0 else ()
+        sim.step(TickInput(PlayerInput(), river_keys=keys))
+        yield tick
+
+
+def expected_water(background, top, height):
+    margens = [background.obter_margens_rio(y) for y in range(top, top + height)]
+    return max(esq for esq, _ in margens), min(dir for _, dir in margens)
+
+
+@pytest.mark.parametrize("height", [PLAYER_HEIGHT - 2 * BANK_INSET, Boat.height - 2])
+def test_table_matches_row_margins(engine, height):
+    sim = Simulation(initial_seed=5)
+    background = sim.background
+    table = background.obter_tabela_margens(height)
+    for tick in river_ticks(sim, 300, 5):
+        if tick % 25 != 24:
+            continue
+        for top in range(SCREEN_HEIGHT - height + 1):
+            assert table.water(top) == expected_water(background, top, height)
+        # Fora da tela: as linhas da borda mais proxima
+        assert table.water(-10) == table.water(0)
+        assert table.water(SCREEN_HEIGHT) == table.water(SCREEN_HEIGHT - height)
+
+
+def test_plane_over_the_bank_takes_a_hit():
+    sim = Simulation(initial_seed=5)
+    p = sim.player
+    p.x = int(sim.background.centro_rio_x) - PLAYER_WIDTH // 2   # No meio do rio
+    sim.step()
+    assert p.over_river and not sim._bank_hit(p)
+
+    # Aviao com metade da caixa em cima da margem esquerda
+    esq, _ = sim.background.obter_tabela_margens(PLAYER_HEIGHT - 2 * BANK_INSET).water(p.y + BANK_INSET)
+    p.x = int(esq) - PLAYER_WIDTH // 2
+    p.invincible = 0
+    lives = p.lives
+    assert sim._bank_hit(p)
+    sim.check_all_collisions()
+    assert p.lives == lives - 1
+
+
+def test_bank_only_counts_after_entering_the_river():
+    sim = Simulation(initial_seed=5)
+    p = sim.player
+    # O ponto de nascimento fica em cima da margem: ainda nao esteve sobre a agua, nao perde vida
+    p.x = 0
+    assert not sim._bank_hit(p) and not p.over_river
+
+
+def test_boats_stay_in_the_water(engine):
+    sim = Simulation(initial_seed=11)
+    table = sim.background.obter_tabela_margens(Boat.height - 2)
+    checked = 0
+    previous = set()
+    for _ in river_ticks(sim, 900, 11):
+        for p in sim.players:
+            p.lives = MAX_LIVES
+        # Os barcos que nasceram neste tick so sao ajustados no proximo
+        boats = [b for b in sim.boat_manager.boats if b.net_id in previous]
+        previous = {b.net_id for b in sim.boat_manager.boats}
+        for b in boats:
+            esq, dir = table.water(b.y + 1)
+            # hitbox do barco (1 px para dentro) entre as margens das suas linhas, em pixels inteiros
+            menor, maior = math.ceil(esq) - 1, math.floor(dir) - b.width + 1
+            if menor <= maior:
+                assert menor <= b.x <= maior and float(b.x).is_integer()
+                checked += 1
+    assert checked > 100
@@ -0,0 +1,78 @@
+### Testes do passo fixo (timestep.py) com um relogio falso: ticks por frame, limite de recuperacao e alpha
+
+from timestep import FixedTimestep
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def timestep(max_ticks=4, slack=0.25):
+    # 4 ticks por segundo: os tempos (multiplos de 1/4 s) sao exatos em float
+    clock = Clock()
+    return FixedTimestep(tick_rate=4, max_ticks=max_ticks, slack=slack, clock=clock), clock
+
+
+def test_one_tick_per_frame_at_the_tick_rate():
+    steps, clock = timestep()
+    assert steps.advance() == 1     # O primeiro frame ja simula um tick
+    # Variacao entre frames menor que a folga: continua um tick por frame
+    for elapsed in (0.25, 0.25 + 1 / 32, 0.25 - 1 / 32, 0.25, 0.25):
+        clock.now += elapsed
+        assert steps.advance() == 1
+    assert steps.stats()['histogram'] == {1: 6}
+
+
+def test_late_frame_catches_up():
+    steps, clock = timestep()
+    steps.advance()
+    clock.now += 0.5
+    assert steps.advance() == 2
+    assert steps.advance() == 0     # Nenhum tempo passou
+    assert (steps.frames, steps.ticks, steps.ticks_per_frame) == (3, 3, 0)
+
+
+def test_catch_up_is_limited_and_the_rest_dropped():
+    steps, clock = timestep(max_ticks=4)
+    steps.advance()
+    clock.now += 2.5                # 10 ticks de engasgo
+    assert steps.advance() == 4
+    assert steps.dropped_ticks == 6
+    assert steps.alpha == 0.0       # O resto do tempo foi descartado, nao fica para o proximo frame
+    clock.now += 0.25
+    assert steps.advance() == 1
+    assert steps.stats()['dropped_ticks'] == 6
+
+
+def test_alpha_is_the_fraction_of_the_next_tick():
+    steps, clock = timestep(slack=0.0)
+    steps.advance()
+    assert steps.alpha == 0.0
+    clock.now += 0.375              # Um tick e meio
+    assert steps.advance() == 1
+    assert steps.alpha == 0.5
+    clock.now += 0.0625
+    assert steps.advance() == 0
+    assert steps.alpha == 0.75
+
+
+def test_alpha_is_clamped_when_the_frame_comes_early():
+    steps, clock = timestep(slack=0.25)
+    steps.advance()
+    clock.now += 0.25 - 1 / 32      # Um pouco antes do tick: a folga adianta o tick e o acumulador fica negativo
+    assert steps.advance() == 1
+    assert steps.alpha == 0.0
+
+
+def test_hold_discards_the_paused_time():
+    steps, clock = timestep()
+    steps.advance()
+    clock.now += 10.0
+    steps.hold()
+    clock.now += 0.25
+    assert steps.advance() == 1
+    assert steps.dropped_ticks == 0
@@ -0,0 +1,74 @@
+### Passo fixo (fixed timestep) da simulacao. Responsavel por:
+### - Acumular o tempo real entre os frames do pyxel e dizer quantos ticks de 1/tick_rate simular em cada um
+### - Limitar a recuperacao depois de um engasgo (MAX_TICKS_PER_FRAME): o tempo que passar disso eh descartado
+### - Informar quanto do proximo tick ja passou (alpha), para o desenho interpolar entre os dois ultimos ticks
+###
+### Assim a velocidade do jogo (pixels, gasolina e timers por tick) nao depende do ritmo dos frames: um frame
+### atrasado vira dois ticks no frame seguinte, e o host e o cliente andam no mesmo ritmo do relogio.
+### Uma pequena folga (TIMESTEP_SLACK) absorve a variacao normal entre frames, para um jogo rodando no FPS
+### certo simular exatamente um tick por frame em vez de alternar entre zero e dois
+
+import time
+from collections import Counter
+from config import *    # Importa constantes e configuracoes do arquivo "config.py"
+
+
+class FixedTimestep:
+    """Acumulador de tempo real -> ticks de tamanho fixo, com contadores de ticks por frame e descartados."""
+    def __init__(self, tick_rate=FPS, max_ticks=MAX_TICKS_PER_FRAME, slack=TIMESTEP_SLACK, clock=time.perf_counter):
+        self.dt = 1.0 / tick_rate       # Duracao de um tick (s)
+        self.max_ticks = max_ticks      # Ticks simulados no maximo por frame
+        self.slack = slack * self.dt    # Folga para a variacao entre frames (s)
+        self.clock = clock
+        self._last = None               # Horario do ultimo advance (None = ainda nao comecou)
+        self._accumulator = 0.0         # Tempo real ainda nao simulado (s)
+
+        # Contadores
+        self.frames = 0                 # Frames (chamadas de advance)
+        self.ticks = 0                  # Ticks simulados
+        self.ticks_per_frame = 0        # Ticks do ultimo frame
+        self.dropped_ticks = 0          # Ticks descartados pelo limite de recuperacao
+        self.histogram = Counter()      # Ticks por frame -> quantidade de frames
+
+    def advance(self):
+        """Chamado uma vez por frame. Retorna quantos ticks simular agora."""
+        now = self.clock()
+        if self._last is None:
+            self._accumulator = self.dt  # O primeiro frame ja simula um tick
+        else:
+            self._accumulator += now - self._last
+        self._last = now
+
+        ticks = int((self._accumulator + self.slack) / self.dt)
+        if ticks > self.max_ticks:
+            self.dropped_ticks += ticks - self.max_ticks
+            ticks = self.max_ticks
+            self._accumulator = 0.0     # Nao tenta recuperar o resto
+        else:
+            self._accumulator -= ticks * self.dt
+
+        self.frames += 1
+        self.ticks += ticks
+        self.ticks_per_frame = ticks
+        self.histogram[ticks] += 1
+        return ticks
+
+    @property
+    def alpha(self):
+        """Fracao (0 a 1) do proximo tick que ja passou."""
+        return min(max(self._accumulator / self.dt, 0.0), 1.0)
+
+    def hold(self):
+        """Jogo parado (pause no singleplayer): o tempo ate o proximo advance nao vira ticks."""
+        self._last = self.clock()
+        self._accumulator = 0.0
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'ticks': self.ticks,
+            'ticks_per_frame': self.ticks / self.frames if self.frames else 0.0,
+            'last_ticks_per_frame': self.ticks_per_frame,
+            'dropped_ticks': self.dropped_ticks,
+            'histogram': dict(self.histogram),
+        }